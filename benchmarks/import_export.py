@@ -0,0 +1,204 @@
+#!/usr/bin/env python2.7
+# encoding: utf-8
+'''
+Created on Oct 18, 2026
+
+Times the import and export stages, and the command line interface end to
+end, on a synthetic form, optionally comparing against a saved baseline.
+
+Each stage runs in a fresh process so that its peak memory use (the
+process's maximum resident set size) isn't inflated by the stages before
+it, and is timed as the best of several repetitions.
+
+Usage (from the repository root)::
+
+    python benchmarks/import_export.py --variables 50000 --save-baseline baseline.json
+    # ... change the code ...
+    python benchmarks/import_export.py --variables 50000 --baseline baseline.json
+
+The second run exits with a non-zero status if any stage got slower (or
+used more memory) than the baseline by more than the tolerance.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+# Run against the working tree rather than any installed copy.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from odk_to_spss_syntax.variable_metadata import VariableMetadata
+import odk_to_spss_syntax.main
+
+import synthetic_form
+
+
+STAGES= ('import_json', '_import', 'export_spss_syntax', 'cli')
+DEFAULT_REPEAT= 3
+DEFAULT_TOLERANCE= 0.2
+
+
+def _max_rss_mib():
+    '''The process's peak resident set size so far (reported in KiB on Linux).'''
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+
+
+def _setup_stage(stage, form_parameters, temp_dir):
+    '''
+    Prepare the input of a stage.
+
+    :returns: The function to time, and the number of variables it processes.
+    :rtype: tuple(callable, int)
+    '''
+
+    form_dict= synthetic_form.make_form_dict(**form_parameters)
+    variable_count= sum(1 for _var_metadata in VariableMetadata.iter_import(form_dict))
+    if stage == '_import':
+        return (lambda: VariableMetadata._import(form_dict)), variable_count
+    return _setup_json_stage(stage, json.dumps(form_dict), temp_dir), variable_count
+
+
+def _setup_json_stage(stage, json_text, temp_dir):
+    '''Like :py:func:`_setup_stage`, for the stages that start from the form's text.'''
+    if stage == 'import_json':
+        return lambda: VariableMetadata.import_json(json_text)
+    if stage == 'export_spss_syntax':
+        variable_metadata_list= VariableMetadata.import_json(json_text)
+        return lambda: VariableMetadata.export_spss_syntax(variable_metadata_list)
+
+    form_path= os.path.join(temp_dir, 'form.json')
+    syntax_path= os.path.join(temp_dir, 'syntax.sps')
+    with open(form_path, 'wb') as form_file:
+        form_file.write(json_text)
+    return lambda: odk_to_spss_syntax.main.main([form_path, syntax_path])
+
+
+def _run_stage(stage, form_parameters, repeat, result_queue):
+    '''Child process body: time one stage and report its results.'''
+    temp_dir= tempfile.mkdtemp()
+    try:
+        stage_function, variable_count= _setup_stage(stage, form_parameters, temp_dir)
+        setup_rss= _max_rss_mib()
+        best_seconds= None
+        for _repetition in range(repeat):
+            start_time= time.time()
+            stage_function()
+            seconds= time.time() - start_time
+            if best_seconds == None or seconds < best_seconds:
+                best_seconds= seconds
+        peak_rss= _max_rss_mib()
+    finally:
+        shutil.rmtree(temp_dir)
+
+    result_queue.put({'seconds': best_seconds, 'variables': variable_count
+                      , 'variables_per_second': variable_count / max(best_seconds, 1e-9)
+                      , 'peak_mib': peak_rss, 'stage_mib': peak_rss - setup_rss})
+
+
+def run_benchmarks(form_parameters, stages=STAGES, repeat=DEFAULT_REPEAT):
+    '''
+    :param dict form_parameters: Keyword arguments for :py:func:`synthetic_form.make_form_dict`.
+    :param stages: The stages to run, from :py:data:`STAGES`.
+    :param int repeat: The number of times to time each stage.
+    :returns: Each stage's best time in seconds, throughput, peak memory and memory added by the stage itself (in MiB).
+    :rtype: dict(str, dict)
+    '''
+
+    results= dict()
+    for stage in stages:
+        result_queue= multiprocessing.Queue()
+        process= multiprocessing.Process(target=_run_stage, args=(stage, form_parameters, repeat, result_queue))
+        process.start()
+        results[stage]= result_queue.get()
+        process.join()
+    return results
+
+
+def compare_to_baseline(results, baseline_results, tolerance=DEFAULT_TOLERANCE):
+    '''
+    :returns: A description of each measurement that is worse than the baseline's by more than ``tolerance`` (a proportion).
+    :rtype: list(str)
+    '''
+
+    regressions= list()
+    for stage, result in sorted(results.iteritems()):
+        baseline_result= baseline_results.get(stage)
+        if baseline_result == None:
+            continue
+        for measurement in ('seconds', 'peak_mib'):
+            if result[measurement] > baseline_result[measurement] * (1 + tolerance):
+                regressions.append('%s: %s went from %.3f to %.3f (+%.0f%%).'
+                                   % (stage, measurement, baseline_result[measurement], result[measurement]
+                                      , 100. * (result[measurement] / baseline_result[measurement] - 1)))
+    return regressions
+
+
+def format_results(results, baseline_results=None):
+    '''A table of the results, with the change from any baseline.'''
+    lines= ['%-20s %10s %14s %10s %10s %10s' % ('stage', 'seconds', 'variables/s', 'peak MiB', 'stage MiB'
+                                                 , 'vs. base')]
+    for stage in STAGES:
+        result= results.get(stage)
+        if result == None:
+            continue
+        change= ''
+        if baseline_results != None and stage in baseline_results:
+            change= '%+.0f%%' % (100. * (result['seconds'] / baseline_results[stage]['seconds'] - 1))
+        lines.append('%-20s %10.3f %14.0f %10.1f %10.1f %10s' % (stage, result['seconds'], result['variables_per_second']
+                                                                 , result['peak_mib'], result['stage_mib'], change))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser= argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    synthetic_form.add_parameter_arguments(parser)
+    parser.add_argument('--stages', default=','.join(STAGES)
+                        , help='Comma-separated stages to run, from: %s [default: all].' % ', '.join(STAGES))
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT
+                        , help='The number of times to time each stage [default: %(default)d].')
+    parser.add_argument('--save-baseline', metavar='FILE', help='Save the results to this file.')
+    parser.add_argument('--baseline', metavar='FILE', help='Compare the results against those saved in this file.')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE
+                        , help='The proportion by which a measurement may exceed the baseline [default: %(default)s].')
+    args= parser.parse_args(argv)
+
+    stages= [stage for stage in args.stages.split(',') if stage]
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error('Unknown stage "%s".' % stage)
+
+    form_parameters= synthetic_form.form_parameters(args)
+    baseline_results= None
+    if args.baseline:
+        with open(args.baseline, 'r') as baseline_file:
+            baseline= json.load(baseline_file)
+        if baseline['parameters'] != form_parameters:
+            sys.stderr.write('Warning: the baseline was measured on a differently generated form.\n')
+        baseline_results= baseline['results']
+
+    results= run_benchmarks(form_parameters, stages, args.repeat)
+    print(format_results(results, baseline_results))
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump({'parameters': form_parameters, 'results': results}, baseline_file, indent=2, sort_keys=True)
+
+    if baseline_results != None:
+        regressions= compare_to_baseline(results, baseline_results, args.tolerance)
+        for regression in regressions:
+            sys.stderr.write('Regression: ' + regression + '\n')
+        if len(regressions) != 0:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
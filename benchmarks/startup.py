@@ -0,0 +1,165 @@
+#!/usr/bin/env python2.7
+# encoding: utf-8
+'''
+Created on Oct 18, 2026
+
+Times cold starts of the package and its command line interface, each in a
+fresh interpreter, and checks them against a fixed budget.
+
+Each measurement is the best of several runs less the best start up time of
+a bare interpreter, so that the budgets bound what the package itself adds
+and hold across machines. The modules each start up loads are listed too,
+since a new eager import is the usual cause of a regression.
+
+Usage (from the repository root)::
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --budget convert=30 --repeat 20
+
+Exits with a non-zero status if any measurement exceeds its budget.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import synthetic_form
+
+
+REPOSITORY_DIR= os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES= ('import', 'version', 'convert')
+DEFAULT_REPEAT= 10
+# The time each stage may add to a bare interpreter's start up, in milliseconds.
+DEFAULT_BUDGETS_MS= {'import': 15., 'version': 15., 'convert': 30.}
+# The form converted by the "convert" stage: a single small form.
+SMALL_FORM_PARAMETERS= {'variables': 50, 'choice_lists': 5}
+
+# Each stage's script, run with the form and syntax paths as arguments. The
+#   last line of its output lists the package's and the standard library's
+#   modules it loaded.
+_LIST_MODULES= 'sys.stdout.write("\\n" + " ".join(sorted(name for name, module in sys.modules.items() if module)))'
+_STAGE_SCRIPTS= {'bare': 'import sys\n' + _LIST_MODULES
+                 , 'import': 'import sys\nimport odk_to_spss_syntax\n' + _LIST_MODULES
+                 , 'version': 'import sys\nfrom odk_to_spss_syntax.main import main\nmain(["--version"])\n'
+                              + _LIST_MODULES
+                 , 'convert': 'import sys\nfrom odk_to_spss_syntax.main import main\nmain(sys.argv[1:])\n'
+                              + _LIST_MODULES}
+
+
+def _run_script(script, argv):
+    '''
+    :returns: The time a fresh interpreter took to run a stage's script, in seconds, and the modules it loaded.
+    :rtype: tuple(float, list(str))
+    '''
+
+    start_time= time.time()
+    output= subprocess.check_output([sys.executable, '-c', script] + argv, cwd=REPOSITORY_DIR
+                                    , stderr=open(os.devnull, 'w'))
+    seconds= time.time() - start_time
+    return seconds, output.rsplit('\n', 1)[-1].split()
+
+
+def run_benchmarks(stages=STAGES, repeat=DEFAULT_REPEAT):
+    '''
+    :param stages: The stages to run, from :py:data:`STAGES`.
+    :param int repeat: The number of times to run each stage.
+    :returns: Each stage's best time over a bare interpreter's, in milliseconds, and the modules it loaded that a bare interpreter doesn't.
+    :rtype: dict(str, dict)
+    '''
+
+    temp_dir= tempfile.mkdtemp()
+    try:
+        form_path= os.path.join(temp_dir, 'form.json')
+        with open(form_path, 'wb') as form_file:
+            json.dump(synthetic_form.make_form_dict(**SMALL_FORM_PARAMETERS), form_file)
+        argv= [form_path, os.path.join(temp_dir, 'syntax.sps')]
+
+        best_seconds= dict()
+        loaded_modules= dict()
+        # Interleave the stages' runs so that they share any slow spells.
+        for _repetition in range(repeat):
+            for stage in ('bare',) + tuple(stages):
+                seconds, loaded_modules[stage]= _run_script(_STAGE_SCRIPTS[stage], argv)
+                best_seconds[stage]= min(seconds, best_seconds.get(stage, seconds))
+    finally:
+        shutil.rmtree(temp_dir)
+
+    bare_modules= set(loaded_modules['bare'])
+    return dict((stage, {'ms': 1000. * (best_seconds[stage] - best_seconds['bare'])
+                         , 'modules': [module for module in loaded_modules[stage] if module not in bare_modules]})
+                for stage in stages)
+
+
+def over_budget(results, budgets_ms=DEFAULT_BUDGETS_MS):
+    '''
+    :returns: A description of each stage that took longer than its budget.
+    :rtype: list(str)
+    '''
+
+    return ['%s: %.1f ms over a bare interpreter, against a budget of %.1f ms.'
+            % (stage, result['ms'], budgets_ms[stage])
+            for stage, result in sorted(results.iteritems())
+            if stage in budgets_ms and result['ms'] > budgets_ms[stage]]
+
+
+def format_results(results, budgets_ms=DEFAULT_BUDGETS_MS):
+    '''A table of the results against their budgets, with the modules each loaded.'''
+    lines= ['%-10s %10s %10s  %s' % ('stage', 'ms', 'budget', 'modules loaded')]
+    for stage in STAGES:
+        result= results.get(stage)
+        if result == None:
+            continue
+        lines.append('%-10s %10.1f %10.1f  %s' % (stage, result['ms'], budgets_ms.get(stage, float('inf'))
+                                                  , ' '.join(result['modules'])))
+    return '\n'.join(lines)
+
+
+def _parse_budget(budget_text):
+    stage, _equals, milliseconds= budget_text.partition('=')
+    if stage not in STAGES:
+        raise argparse.ArgumentTypeError('Unknown stage "%s".' % stage)
+    try:
+        return stage, float(milliseconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError('Expected STAGE=MILLISECONDS, not "%s".' % budget_text)
+
+
+def main(argv=None):
+    parser= argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    parser.add_argument('--stages', default=','.join(STAGES)
+                        , help='Comma-separated stages to run, from: %s [default: all].' % ', '.join(STAGES))
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT
+                        , help='The number of times to run each stage [default: %(default)d].')
+    parser.add_argument('--budget', type=_parse_budget, action='append', default=[], metavar='STAGE=MILLISECONDS'
+                        , help='Override a stage\'s budget [defaults: %s].'
+                        % ', '.join('%s=%g' % stage_budget for stage_budget in sorted(DEFAULT_BUDGETS_MS.iteritems())))
+    args= parser.parse_args(argv)
+
+    stages= [stage for stage in args.stages.split(',') if stage]
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error('Unknown stage "%s".' % stage)
+    budgets_ms= dict(DEFAULT_BUDGETS_MS)
+    budgets_ms.update(args.budget)
+
+    results= run_benchmarks(stages, args.repeat)
+    print(format_results(results, budgets_ms))
+
+    failures= over_budget(results, budgets_ms)
+    for failure in failures:
+        sys.stderr.write('Over budget: ' + failure + '\n')
+    if len(failures) != 0:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
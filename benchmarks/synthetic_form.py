@@ -0,0 +1,136 @@
+#!/usr/bin/env python2.7
+# encoding: utf-8
+'''
+Created on Oct 18, 2026
+
+Generates synthetic JSON-formatted ODK forms of any size and shape for the
+benchmarks.
+
+Usage (from the repository root)::
+
+    python benchmarks/synthetic_form.py --variables 100000 --depth 3 > big_form.json
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import argparse
+import json
+import random
+import sys
+
+
+# Text to draw non-ASCII labels from: accented Latin, Greek, Cyrillic and CJK.
+UNICODE_WORDS= [u'Numéro', u'enquêteur', u'année', u'Ελληνικά', u'ερώτηση', u'Русский', u'вопрос'
+                , u'中文', u'问题', u'日本語']
+ASCII_WORDS= [u'Name', u'of', u'the', u'household', u'member', u'age', u'district', u'date', u'visit'
+              , u'number', u'health', u'facility', u'what', u'is', u'your']
+
+# Parameters and defaults of :py:func:`make_form_dict`.
+DEFAULT_PARAMETERS= {'variables': 10000, 'depth': 1, 'group_size': 10, 'select_share': 0.5
+                     , 'choice_lists': 20, 'choices': 5, 'label_length': 40, 'unicode_share': 0.1
+                     , 'calculates': 0, 'seed': 0}
+
+
+def _make_label(rng, prefix, label_length, unicode_share):
+    '''A label of about ``label_length`` characters, non-ASCII with probability ``unicode_share``.'''
+    if rng.random() < unicode_share:
+        words= UNICODE_WORDS
+    else:
+        words= ASCII_WORDS
+    label_words= [prefix]
+    label_size= len(prefix)
+    while label_size < label_length:
+        word= rng.choice(words)
+        label_words.append(word)
+        label_size+= len(word) + 1
+    return u' '.join(label_words)[:max(label_length, len(prefix))]
+
+
+def make_form_dict(variables=DEFAULT_PARAMETERS['variables'], depth=DEFAULT_PARAMETERS['depth']
+                   , group_size=DEFAULT_PARAMETERS['group_size'], select_share=DEFAULT_PARAMETERS['select_share']
+                   , choice_lists=DEFAULT_PARAMETERS['choice_lists'], choices=DEFAULT_PARAMETERS['choices']
+                   , label_length=DEFAULT_PARAMETERS['label_length']
+                   , unicode_share=DEFAULT_PARAMETERS['unicode_share']
+                   , calculates=DEFAULT_PARAMETERS['calculates'], seed=DEFAULT_PARAMETERS['seed']):
+    '''
+    Generate a pyxform-style form dictionary. The same parameters always
+    produce the same form.
+
+    :param int variables: The number of questions.
+    :param int depth: The number of nested groups around each block of questions (``0`` for a flat form).
+    :param int group_size: The number of questions in each block.
+    :param float select_share: The proportion of questions that are "select one" questions.
+    :param int choice_lists: The number of distinct choice lists the "select one" questions cycle through.
+    :param int choices: The number of choices in each list.
+    :param int label_length: The approximate length of every label, in characters.
+    :param float unicode_share: The proportion of labels containing non-ASCII text.
+    :param int calculates: The number of "calculate" questions, spread evenly through the form.
+    :param int seed: The seed of the random number generator.
+    :rtype: dict
+    '''
+
+    rng= random.Random(seed)
+
+    choice_list_dicts= list()
+    for list_number in range(choice_lists):
+        choice_list_dicts.append([{'name': unicode(choice_number)
+                                   , 'label': _make_label(rng, u'C%d.%d' % (list_number, choice_number)
+                                                          , label_length, unicode_share)}
+                                  for choice_number in range(1, choices + 1)])
+
+    calculate_interval= None
+    if calculates > 0:
+        calculate_interval= max(1, variables // calculates)
+
+    form_vars= list()
+    calculate_count= 0
+    select_count= 0
+    for var_number in range(variables):
+        var_name= u'v%d' % var_number
+        var_label= _make_label(rng, var_name.upper(), label_length, unicode_share)
+        if (calculate_interval != None and calculate_count < calculates
+            and var_number % calculate_interval == calculate_interval - 1):
+            calculate_count+= 1
+            form_vars.append({'type': 'calculate', 'name': var_name
+                              , 'bind': {'calculate': u"concat('%s_id:', uuid())" % var_name}})
+        elif rng.random() < select_share:
+            form_vars.append({'type': 'select one', 'name': var_name, 'label': var_label
+                              , 'children': choice_list_dicts[select_count % len(choice_list_dicts)]})
+            select_count+= 1
+        else:
+            form_vars.append({'type': 'text', 'name': var_name, 'label': var_label})
+
+    children= list()
+    for block_start in range(0, len(form_vars), group_size):
+        block= form_vars[block_start:block_start + group_size]
+        for level in range(depth, 0, -1):
+            block= [{'type': 'group', 'name': u'g%d_%d' % (block_start, level), 'label': u'Group', 'children': block}]
+        children.extend(block)
+
+    return {'type': 'survey', 'name': 'synthetic', 'id_string': 'synthetic', 'default_language': 'default'
+            , 'children': children}
+
+
+def add_parameter_arguments(parser):
+    '''Add an option for each parameter of :py:func:`make_form_dict` to an argument parser.'''
+    for parameter, default in sorted(DEFAULT_PARAMETERS.iteritems()):
+        parser.add_argument('--' + parameter.replace('_', '-'), type=type(default), default=default
+                            , help='[default: %(default)s]')
+
+
+def form_parameters(args):
+    '''The :py:func:`make_form_dict` keyword arguments from parsed command line options.'''
+    return dict((parameter, getattr(args, parameter)) for parameter in DEFAULT_PARAMETERS)
+
+
+def main(argv=None):
+    parser= argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    add_parameter_arguments(parser)
+    args= parser.parse_args(argv)
+
+    json.dump(make_form_dict(**form_parameters(args)), sys.stdout)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python2.7
+# encoding: utf-8
+'''
+Created on Oct 18, 2026
+
+Measures the memory taken up by imported variable metadata on a generated
+form in which many "select one" questions share a few choice lists, with
+and without :py:class:`ValueMapping` interning.
+
+Usage (from the repository root)::
+
+    python benchmarks/value_mapping_memory.py [--questions 50000]
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import argparse
+import gc
+import os
+import sys
+
+# Run against the working tree rather than any installed copy.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from odk_to_spss_syntax.variable_metadata import VariableMetadata
+
+
+def make_choice_lists():
+    '''A handful of choice lists of the kinds that recur throughout real forms.'''
+    yes_no= [(u'0', u'No'), (u'1', u'Yes')]
+    likert= [(unicode(i), label) for i, label in enumerate([u'Strongly disagree', u'Disagree', u'Neutral'
+                                                             , u'Agree', u'Strongly agree'], 1)]
+    districts= [(unicode(i), u'District number %d' % i) for i in range(1, 101)]
+    return [yes_no, likert, districts]
+
+
+def make_form_dict(question_count):
+    '''Generate a form whose "select one" questions cycle through the shared choice lists.'''
+    choice_lists= make_choice_lists()
+    children= list()
+    for i in range(question_count):
+        choices= choice_lists[i % len(choice_lists)]
+        children.append({'type': 'select one', 'name': u'q%d' % i, 'label': u'Question %d' % i
+                         , 'children': [{'name': name, 'label': label} for name, label in choices]})
+    return {'type': 'survey', 'name': 'benchmark', 'children': children}
+
+
+def deep_size(root):
+    '''Total size of every distinct object reachable from ``root``.'''
+    seen_ids= set()
+    pending= [root]
+    total_size= 0
+    while len(pending) != 0:
+        obj= pending.pop()
+        if id(obj) in seen_ids:
+            continue
+        seen_ids.add(id(obj))
+        total_size+= sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            pending.extend(obj.iterkeys())
+            pending.extend(obj.itervalues())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            pending.extend(obj)
+    return total_size
+
+
+def import_uninterned(form_dict):
+    '''Import the way the package did before interning: a fresh dict per question.'''
+    variable_metadata_list= list()
+    for form_var in form_dict['children']:
+        value_mappings= dict((mapping['name'].encode('utf-8'), mapping['label'].encode('utf-8'))
+                             for mapping in form_var['children'])
+        variable_metadata_list.append(VariableMetadata(form_var['name'].encode('utf-8')
+                                                       , form_var['label'].encode('utf-8'), value_mappings))
+    return variable_metadata_list
+
+
+def main(argv=None):
+    parser= argparse.ArgumentParser(description=__doc__.split('\n')[3])
+    parser.add_argument('--questions', type=int, default=50000, help='The number of questions to generate.')
+    args= parser.parse_args(argv)
+
+    form_dict= make_form_dict(args.questions)
+
+    uninterned_size= deep_size(import_uninterned(form_dict))
+    gc.collect()
+    interned_size= deep_size(list(VariableMetadata.iter_import(form_dict)))
+
+    print('Questions:           %d' % args.questions)
+    print('Without interning:   %.1f MiB' % (uninterned_size / 1048576.))
+    print('With interning:      %.1f MiB' % (interned_size / 1048576.))
+    print('Reduction:           %.1f%%' % (100. * (uninterned_size - interned_size) / uninterned_size))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
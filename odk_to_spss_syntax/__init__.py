@@ -16,6 +16,7 @@ odk_to_spss_syntax is a Python package for extracting metadata about the questio
 
 from main import from_json
 from main import from_dicts
+from profiling import ConversionMetrics, add_metrics_callback, remove_metrics_callback
 
 
 __version__= '0.1'
@@ -0,0 +1,193 @@
+'''
+Created on Oct 18, 2026
+
+Converts whole directories of forms at once, spreading the work over a pool
+of processes.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+from collections import namedtuple
+import multiprocessing
+import os
+import traceback
+
+from cache import SyntaxCache
+from main import to_file_from_form_file
+
+
+__all__= ['FORM_FILE_EXTENSIONS', 'BatchResult', 'find_form_files', 'syntax_file_paths', 'convert_form_file'
+          , 'convert_directory']
+
+# Form file extensions and the corresponding form formats.
+FORM_FILE_FORMATS= {'.json': 'json', '.xml': 'xml', '.xlsx': 'xls', '.xls': 'xls'}
+FORM_FILE_EXTENSIONS= tuple(sorted(FORM_FILE_FORMATS))
+SYNTAX_FILE_EXTENSION= '.sps'
+
+
+class BatchResult(namedtuple('_BatchResult', 'form_path, syntax_path, error, cache_hit')):
+    '''
+    The outcome of converting a single form as part of a batch.
+
+    :param str form_path: The path of the form file.
+    :param str syntax_path: The path of the syntax file that was (or would have been) written.
+    :param str error: A description of the failure, or ``None`` if the conversion succeeded.
+    :param bool cache_hit: Whether the syntax came from the cache, or ``None`` if no cache was used.
+    '''
+
+
+def find_form_files(in_dir):
+    '''
+    Recursively discover the form files in a directory.
+
+    :param str in_dir: The directory to search.
+    :returns: The paths of the form files found, relative to ``in_dir``, in sorted order.
+    :rtype: list(str)
+    '''
+
+    form_paths= list()
+    for dir_path, dir_names, file_names in os.walk(in_dir):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if os.path.splitext(file_name)[1].lower() in FORM_FILE_EXTENSIONS:
+                form_path= os.path.join(dir_path, file_name)
+                form_paths.append(os.path.relpath(form_path, in_dir))
+
+    return form_paths
+
+
+def syntax_file_paths(form_paths):
+    '''
+    Name the syntax file of each form file after it, with a ".sps" 
+    extension in place of the form's own (e.g. "form.sps" for 
+    "form.json"). Forms whose names only differ by extension (e.g. 
+    "form.json" and "form.xml") keep it instead (e.g. "form.json.sps" and 
+    "form.xml.sps"), so that no two forms write the same syntax file.
+
+    :param form_paths: The paths of the form files.
+    :type form_paths: list(str)
+    :returns: The path of each form's syntax file, in the same order.
+    :rtype: list(str)
+    :raises ValueError: If two forms' syntax files would still share a path.
+    '''
+
+    syntax_paths= [os.path.splitext(form_path)[0] + SYNTAX_FILE_EXTENSION for form_path in form_paths]
+    # Compare paths regardless of case, in case the file system does.
+    path_counts= dict()
+    for syntax_path in syntax_paths:
+        path_counts[syntax_path.lower()]= path_counts.get(syntax_path.lower(), 0) + 1
+    syntax_paths= [form_path + SYNTAX_FILE_EXTENSION if path_counts[syntax_path.lower()] > 1 else syntax_path
+                   for form_path, syntax_path in zip(form_paths, syntax_paths)]
+
+    form_paths_by_syntax_path= dict()
+    for form_path, syntax_path in zip(form_paths, syntax_paths):
+        other_form_path= form_paths_by_syntax_path.setdefault(syntax_path.lower(), form_path)
+        if other_form_path != form_path:
+            raise ValueError('The forms "%s" and "%s" would both be converted to "%s".'
+                             % (other_form_path, form_path, syntax_path))
+    return syntax_paths
+
+
+def convert_form_file(form_path, syntax_path, stream=False, cache=None, **import_options):
+    '''
+    Convert a single form file to an SPSS syntax file, telling the form's
+    format by its file extension.
+
+    :param str form_path: The path of the form file.
+    :param str syntax_path: The path of the syntax file to write.
+    :param bool stream: Whether to read the form incrementally.
+    :param cache: If supplied, reuse previously generated syntax for an unchanged form.
+    :type cache: :py:class:`SyntaxCache`
+    :param import_options: Keyword arguments for the import methods of :py:class:`VariableMetadata`.
+    '''
+
+    form_format= FORM_FILE_FORMATS[os.path.splitext(form_path)[1].lower()]
+    with open(form_path, 'rb') as form_file:
+        with open(syntax_path, 'wb') as syntax_file:
+            to_file_from_form_file(form_file, syntax_file, form_format, stream, cache, **import_options)
+
+
+def _convert_form_file_job(job):
+    '''
+    Pool worker wrapper around :py:func:`convert_form_file` that reports
+    failures instead of raising them, so one bad form can't abort the batch.
+    '''
+
+    form_path, syntax_path, stream, cache_args, import_options= job
+    if cache_args == None:
+        cache= None
+    else:
+        cache= SyntaxCache(*cache_args)
+
+    try:
+        syntax_dir= os.path.dirname(syntax_path)
+        if syntax_dir and not os.path.isdir(syntax_dir):
+            try:
+                os.makedirs(syntax_dir)
+            except OSError:
+                # Another worker may have created it in the meantime.
+                if not os.path.isdir(syntax_dir):
+                    raise
+        convert_form_file(form_path, syntax_path, stream, cache, **import_options)
+    except Exception:
+        # Don't leave a partially-written syntax file behind.
+        if os.path.exists(syntax_path):
+            os.remove(syntax_path)
+        return BatchResult(form_path, syntax_path, traceback.format_exc().strip(), None)
+
+    if cache == None:
+        cache_hit= None
+    else:
+        cache_hit= (cache.hits != 0)
+    return BatchResult(form_path, syntax_path, None, cache_hit)
+
+
+def convert_directory(in_dir, out_dir, jobs=None, stream=False, cache=None, **import_options):
+    '''
+    Convert every form file found under ``in_dir`` to a syntax file of the
+    same relative path (with a ".sps" extension, as by
+    :py:func:`syntax_file_paths`) under ``out_dir``.
+
+    :param str in_dir: The directory containing the form files.
+    :param str out_dir: The directory in which to write the syntax files.
+    :param int jobs: The number of worker processes to use. Defaults to the number of CPUs; with ``1`` the forms are converted in this process.
+    :param bool stream: Whether to read each form incrementally.
+    :param cache: If supplied, reuse previously generated syntax for unchanged forms. Its hit and miss counters are updated with the totals from all workers.
+    :type cache: :py:class:`SyntaxCache`
+    :param import_options: Keyword arguments for the import methods of :py:class:`VariableMetadata`.
+    :returns: The outcome for each form, in the order of :py:func:`find_form_files`.
+    :rtype: list(:py:class:`BatchResult`)
+    :raises ValueError: If two forms would be converted to the same syntax file.
+    '''
+
+    if cache == None:
+        cache_args= None
+    else:
+        cache_args= (cache.cache_dir, cache.max_size)
+
+    job_list= list()
+    relative_form_paths= find_form_files(in_dir)
+    for relative_form_path, relative_syntax_path in zip(relative_form_paths, syntax_file_paths(relative_form_paths)):
+        job_list.append((os.path.join(in_dir, relative_form_path)
+                         , os.path.join(out_dir, relative_syntax_path), stream, cache_args
+                         , import_options))
+
+    if jobs == None:
+        jobs= multiprocessing.cpu_count()
+    if jobs <= 1 or len(job_list) <= 1:
+        results= [_convert_form_file_job(job) for job in job_list]
+    else:
+        pool= multiprocessing.Pool(min(jobs, len(job_list)))
+        try:
+            # Forms vary a lot in size, so hand them out a few at a time.
+            chunk_size= max(1, len(job_list) // (jobs * 8))
+            results= pool.map(_convert_form_file_job, job_list, chunk_size)
+        finally:
+            pool.close()
+            pool.join()
+
+    if cache != None:
+        cache.hits+= len([result for result in results if result.cache_hit == True])
+        cache.misses+= len([result for result in results if result.cache_hit == False])
+
+    return results
@@ -0,0 +1,219 @@
+'''
+Created on Oct 18, 2026
+
+An on-disk, content-addressed cache of generated SPSS syntax, so unchanged
+forms needn't be parsed and exported again.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import os
+# "hashlib", "shutil" and "tempfile" are imported where they're used, so
+#   that the command line can offer the cache's options without loading them.
+
+
+__all__= ['DEFAULT_MAX_SIZE', 'SyntaxCache']
+
+DEFAULT_MAX_SIZE= 256 * 1024 * 1024
+ENTRY_EXTENSION= '.sps'
+_HASH_CHUNK_SIZE= 64 * 1024
+
+
+class SyntaxCache(object):
+    '''
+    A directory of generated syntax files named by a hash of the form text,
+    the package version and any export options. The directory is kept under
+    a size bound by evicting the least recently used entries (as recorded by
+    the entries' modification times, which are refreshed on every hit), so it
+    may safely be shared between processes.
+
+    :param str cache_dir: The directory in which to store entries; created if necessary.
+    :param int max_size: The maximum total size of the entries, in bytes.
+    '''
+
+    def __init__(self, cache_dir, max_size=DEFAULT_MAX_SIZE):
+        self.cache_dir= cache_dir
+        self.max_size= max_size
+        self.hits= 0
+        self.misses= 0
+        # Running estimate of the total entry size, computed on first use.
+        self._total_size= None
+
+    @staticmethod
+    def _hash_prefix(options):
+        '''Start a hash that covers everything but the form text itself.'''
+        import hashlib
+        from odk_to_spss_syntax import __version__
+
+        form_hash= hashlib.sha256()
+        form_hash.update('odk_to_spss_syntax ' + __version__ + '\0')
+        if options:
+            form_hash.update(repr(sorted(options.items())))
+        form_hash.update('\0')
+        return form_hash
+
+    def key(self, form_text, options=None):
+        '''
+        Compute the cache key for a form.
+
+        :param str form_text: The text of the form.
+        :param dict options: Any options that affect the generated syntax.
+        :rtype: str
+        '''
+
+        if isinstance(form_text, unicode):
+            form_text= form_text.encode('utf-8')
+        form_hash= self._hash_prefix(options)
+        form_hash.update(form_text)
+        return form_hash.hexdigest()
+
+    def file_key(self, form_file, options=None):
+        '''
+        Like :py:meth:`key`, but hash the form a chunk at a time from a
+        file-like object, which is then rewound.
+
+        :param form_file: A readable, seekable file-like object containing the form.
+        :param dict options: Any options that affect the generated syntax.
+        :rtype: str
+        '''
+
+        form_hash= self._hash_prefix(options)
+        for chunk in iter(lambda: form_file.read(_HASH_CHUNK_SIZE), ''):
+            if isinstance(chunk, unicode):
+                chunk= chunk.encode('utf-8')
+            form_hash.update(chunk)
+        form_file.seek(0)
+        return form_hash.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ENTRY_EXTENSION)
+
+    def open(self, key):
+        '''
+        Look up an entry, counting the hit or miss.
+
+        :param str key: A key from :py:meth:`key` or :py:meth:`file_key`.
+        :returns: The entry opened for reading, or ``None`` if there is none.
+        :rtype: file
+        '''
+
+        entry_path= self._entry_path(key)
+        try:
+            entry_file= open(entry_path, 'rb')
+            # Mark the entry as recently used.
+            os.utime(entry_path, None)
+        except (IOError, OSError):
+            # Absent, or evicted by another process in the meantime.
+            self.misses+= 1
+            return None
+
+        self.hits+= 1
+        return entry_file
+
+    def get(self, key):
+        '''
+        Like :py:meth:`open`, but return the entry's contents.
+
+        :param str key: A key from :py:meth:`key` or :py:meth:`file_key`.
+        :returns: The cached syntax text, or ``None`` if there is none.
+        :rtype: str
+        '''
+
+        entry_file= self.open(key)
+        if entry_file == None:
+            return None
+        with entry_file:
+            return entry_file.read()
+
+    def put(self, key, syntax_text):
+        '''
+        Store generated syntax, evicting old entries if the cache has grown
+        too large.
+
+        :param str key: A key from :py:meth:`key` or :py:meth:`file_key`.
+        :param str syntax_text: The syntax to store.
+        '''
+
+        if isinstance(syntax_text, unicode):
+            syntax_text= syntax_text.encode('utf-8')
+        self._store(key, lambda entry_file: entry_file.write(syntax_text))
+
+    def put_file(self, key, syntax_file):
+        '''
+        Like :py:meth:`put`, but copy the syntax from a file-like object.
+
+        :param str key: A key from :py:meth:`key` or :py:meth:`file_key`.
+        :param syntax_file: A readable file-like object positioned at the start of the syntax.
+        '''
+
+        import shutil
+        self._store(key, lambda entry_file: shutil.copyfileobj(syntax_file, entry_file))
+
+    def _store(self, key, write_entry):
+        import tempfile
+
+        entry_path= self._entry_path(key)
+        entry_dir= os.path.dirname(entry_path)
+        if not os.path.isdir(entry_dir):
+            try:
+                os.makedirs(entry_dir)
+            except OSError:
+                # Another process may have created it in the meantime.
+                if not os.path.isdir(entry_dir):
+                    raise
+
+        # Write to a temporary file and rename it into place so that readers
+        #   never see a partial entry.
+        temp_fd, temp_path= tempfile.mkstemp(dir=entry_dir, suffix='.tmp')
+        try:
+            with os.fdopen(temp_fd, 'wb') as entry_file:
+                write_entry(entry_file)
+            os.rename(temp_path, entry_path)
+        except:
+            os.remove(temp_path)
+            raise
+
+        if self._total_size == None:
+            self._total_size= self._scan_size()
+        else:
+            self._total_size+= os.path.getsize(entry_path)
+        if self._total_size > self.max_size:
+            self._evict()
+
+    def _iter_entries(self):
+        '''Yield ``(modification time, size, path)`` for every entry.'''
+        for dir_path, _dir_names, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                if not file_name.endswith(ENTRY_EXTENSION):
+                    continue
+                entry_path= os.path.join(dir_path, file_name)
+                try:
+                    entry_stat= os.stat(entry_path)
+                except OSError:
+                    continue
+                yield entry_stat.st_mtime, entry_stat.st_size, entry_path
+
+    def _scan_size(self):
+        return sum(entry_size for _mtime, entry_size, _path in self._iter_entries())
+
+    def _evict(self):
+        '''Remove the least recently used entries until the cache fits its bound.'''
+        entries= sorted(self._iter_entries())
+        self._total_size= sum(entry_size for _mtime, entry_size, _path in entries)
+        for _mtime, entry_size, entry_path in entries:
+            if self._total_size <= self.max_size:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                # Already evicted by another process.
+                pass
+            self._total_size-= entry_size
+
+    def stats_message(self):
+        '''
+        :returns: A one-line summary of the cache hits and misses.
+        :rtype: str
+        '''
+
+        return 'Syntax cache: %d hits, %d misses.' % (self.hits, self.misses)
@@ -0,0 +1,216 @@
+'''
+Created on Oct 18, 2026
+
+Applies a form's value labels to a CSV export of its submissions (e.g. from
+ODK Briefcase or Aggregate), so that the data can be labelled without SPSS.
+The export is streamed a row at a time, each select question's codes looked
+up in a table prepared once per choice list, so memory use doesn't grow
+with the size of the export.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import csv
+
+from spss_labels import spss_variable_name
+from label_modes import LABEL_MODES, DEFAULT_LABEL_MODE
+
+
+__all__= ['LABEL_MODES', 'LabellingReport', 'column_names', 'match_columns', 'label_csv']
+
+# Suffix of the label columns added in "append" mode.
+LABEL_COLUMN_SUFFIX= '_label'
+# Separators between the group and question names of a column header.
+COLUMN_GROUP_SEPARATORS= ('/', '-')
+# The number of invalid codes to keep as examples in a report.
+MAX_INVALID_EXAMPLES= 100
+
+
+class LabellingReport(object):
+    '''
+    What labelling a CSV export found.
+
+    :ivar int rows: The number of data rows read.
+    :ivar dict labelled_columns: Column header -> variable name, for each column that was labelled.
+    :ivar dict invalid_counts: Column header -> the number of its codes that aren't among the variable's choices.
+    :ivar list invalid_examples: The first (row number, column header, code) of each invalid code, up to :py:data:`MAX_INVALID_EXAMPLES`.
+    '''
+
+    def __init__(self):
+        self.rows= 0
+        self.labelled_columns= dict()
+        self.invalid_counts= dict()
+        self.invalid_examples= list()
+
+    @property
+    def invalid_count(self):
+        return sum(self.invalid_counts.itervalues())
+
+    def summary(self):
+        '''
+        :returns: A one-line description of the report.
+        :rtype: str
+        '''
+
+        summary= 'Read %d rows; labelled %d columns.' % (self.rows, len(self.labelled_columns))
+        if self.invalid_count != 0:
+            summary+= ' %d codes not among the choices, in columns: %s.' % (
+                self.invalid_count, ', '.join('%s (%d)' % column_count
+                                              for column_count in sorted(self.invalid_counts.iteritems())))
+        return summary
+
+
+def _encode(text):
+    if isinstance(text, unicode):
+        return text.encode('utf-8')
+    return text
+
+
+def column_names(column_header):
+    '''
+    :param str column_header: A column header of a CSV export.
+    :returns: The names the column's variable may have, longest first: the header itself, then what follows each group separator in it (e.g. "group-question/option", "question/option", "option"), each followed by its legal SPSS name if that differs (e.g. "question_option", as "select multiple" options' variables are named).
+    :rtype: list(str)
+    '''
+
+    names= list()
+    for name in [column_header] + [column_header[character_index + 1:]
+                                   for character_index, character in enumerate(column_header)
+                                   if character in COLUMN_GROUP_SEPARATORS]:
+        names.append(name)
+        legal_name= spss_variable_name(name)
+        if legal_name != name:
+            names.append(legal_name)
+    return names
+
+
+def match_columns(header, variable_names):
+    '''
+    Find the variable each column of a CSV export holds. Columns are matched
+    by the longest of their :py:func:`column_names` that is a variable's
+    name (e.g. "question" in "group-question" or "group/question", or the
+    "select multiple" option variable "question_option" in
+    "group-question/option").
+
+    :param header: The column headers.
+    :type header: list(str)
+    :param variable_names: The names of the form's variables.
+    :returns: The name of each column's variable, or ``None`` for columns that match none.
+    :rtype: list(str)
+    '''
+
+    variable_names= set(_encode(variable_name) for variable_name in variable_names)
+    column_variable_names= list()
+    for column_header in header:
+        variable_name= None
+        for name in column_names(column_header):
+            if name in variable_names:
+                variable_name= name
+                break
+        column_variable_names.append(variable_name)
+    return column_variable_names
+
+
+def _lookup_tables(column_variable_names, variable_metadata_list):
+    '''
+    :param column_variable_names: The name of each column's variable, from :py:func:`match_columns`.
+    :returns: For each column, the table of labels of its variable's codes (as UTF-8), or ``None`` if it has no value labels. Variables that share a :py:class:`ValueMapping` share a table.
+    :rtype: list(dict)
+    '''
+
+    value_mappings_by_name= dict((_encode(variable_metadata.name), variable_metadata.value_mappings)
+                                 for variable_metadata in variable_metadata_list)
+    # id(value mappings) -> lookup table.
+    tables_by_id= dict()
+    lookup_tables= list()
+    for variable_name in column_variable_names:
+        value_mappings= value_mappings_by_name.get(variable_name)
+        if value_mappings == None or len(value_mappings) == 0:
+            lookup_tables.append(None)
+            continue
+        lookup_table= tables_by_id.get(id(value_mappings))
+        if lookup_table == None:
+            lookup_table= dict((_encode(value_name), _encode(value_label))
+                               for value_name, value_label in value_mappings.iteritems())
+            tables_by_id[id(value_mappings)]= lookup_table
+        lookup_tables.append(lookup_table)
+    return lookup_tables
+
+
+def label_csv(variable_metadata_list, csv_in, csv_out=None, mode=DEFAULT_LABEL_MODE):
+    '''
+    Stream a CSV export of a form's submissions, labelling the codes of its
+    select questions' columns.
+
+    :param variable_metadata_list: The form's metadata.
+    :type variable_metadata_list: list(:py:class:`odk_to_spss_syntax.variable_metadata.VariableMetadata`)
+    :param csv_in: A readable file-like object containing the export, with a header row.
+    :param csv_out: A writable file-like object. In "replace" and "append" modes it receives the labelled export; in "validate" mode a row (row number, column header, code) for each code that isn't among its variable's choices. Nothing is written if it isn't supplied.
+    :param str mode: One of :py:data:`LABEL_MODES`. Codes that aren't among the choices are left as they are.
+    :returns: What was found.
+    :rtype: :py:class:`LabellingReport`
+    '''
+
+    if mode not in LABEL_MODES:
+        raise ValueError('Unknown label mode "%s"; expected one of %s.' % (mode, ', '.join(LABEL_MODES)))
+
+    report= LabellingReport()
+    reader= csv.reader(csv_in)
+    header= next(reader, None)
+    if header == None:
+        return report
+    column_variable_names= match_columns(header, [variable_metadata.name for variable_metadata in variable_metadata_list])
+    lookup_tables= _lookup_tables(column_variable_names, variable_metadata_list)
+    labelled_indexes= [column_index for column_index, lookup_table in enumerate(lookup_tables)
+                       if lookup_table != None]
+    for column_index in labelled_indexes:
+        report.labelled_columns[header[column_index]]= column_variable_names[column_index]
+
+    writer= csv.writer(csv_out) if csv_out != None else None
+    if writer != None:
+        if mode == 'append':
+            writer.writerow(_append_label_columns(header, [column_header + LABEL_COLUMN_SUFFIX for column_header in header]
+                                                  , lookup_tables))
+        elif mode == 'replace':
+            writer.writerow(header)
+        else:
+            writer.writerow(['row', 'column', 'code'])
+
+    for row_number, row in enumerate(reader, 1):
+        labels= list(row)
+        for column_index in labelled_indexes:
+            if column_index >= len(row):
+                break
+            code= row[column_index]
+            if code == '':
+                continue
+            label= lookup_tables[column_index].get(code)
+            if label == None:
+                column_header= header[column_index]
+                report.invalid_counts[column_header]= report.invalid_counts.get(column_header, 0) + 1
+                if len(report.invalid_examples) < MAX_INVALID_EXAMPLES:
+                    report.invalid_examples.append((row_number, column_header, code))
+                if writer != None and mode == 'validate':
+                    writer.writerow([row_number, column_header, code])
+            else:
+                labels[column_index]= label
+        report.rows= row_number
+
+        if writer == None or mode == 'validate':
+            continue
+        if mode == 'replace':
+            writer.writerow(labels)
+        else:
+            writer.writerow(_append_label_columns(row, labels, lookup_tables))
+
+    return report
+
+
+def _append_label_columns(row, labels, lookup_tables):
+    ''':returns: ``row`` with each labelled column followed by its label.'''
+    appended_row= list()
+    for column_index, value in enumerate(row):
+        appended_row.append(value)
+        if column_index < len(lookup_tables) and lookup_tables[column_index] != None:
+            appended_row.append(labels[column_index])
+    return appended_row
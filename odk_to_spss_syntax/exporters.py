@@ -0,0 +1,360 @@
+'''
+Created on Oct 18, 2026
+
+A registry of output formats for imported :py:class:`VariableMetadata`
+lists, so that a form parsed once can be exported to several statistics
+packages' label definitions at once: SPSS syntax (".sps") and system files
+(".sav"), Stata do-files (".do"), R scripts (".R") and SAS programs
+(".sas"), as well as metadata snapshots (".odksnap"). Further formats can
+be added with :py:func:`register_exporter`.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+from collections import namedtuple, OrderedDict
+import os
+import re
+
+from variable_metadata import VariableMetadata
+from spss_labels import truncate_utf8
+
+
+__all__= ['Exporter', 'register_exporter', 'get_exporter', 'exporter_names', 'export_files', 'export_tables']
+
+# The longest variable labels Stata and SAS accept, in bytes.
+STATA_VARIABLE_LABEL_MAX_BYTES= 80
+SAS_LABEL_MAX_BYTES= 256
+
+_INTEGER_RE= re.compile(r'^[-+]?\d+$')
+_NUMBER_RE= re.compile(r'^[-+]?(?:\d+\.?\d*|\.\d+)$')
+_LINE_BREAK_RE= re.compile(r'[\r\n\t]+')
+
+
+class Exporter(namedtuple('_Exporter', 'name, extension, write, binary')):
+    '''
+    An output format.
+
+    :param str name: The name the format is selected by (e.g. on the command line).
+    :param str extension: The extension of the format's files, including the ".".
+    :param write: A function that writes a list of :py:class:`VariableMetadata` to a file-like object and returns the number of variables written.
+    :param bool binary: Whether the format's files are binary rather than text.
+    '''
+
+
+# Name -> :py:class:`Exporter`, in registration order.
+_exporters= OrderedDict()
+
+
+def register_exporter(name, extension, write, binary=False):
+    '''
+    Make an output format available to :py:func:`export_files` and the
+    command line's "--format" option, replacing any of the same name.
+
+    :param str name: The name to select the format by.
+    :param str extension: The extension of the format's files, including the ".".
+    :param write: A function of a list of :py:class:`VariableMetadata` and a writable file-like object, returning the number of variables written.
+    :param bool binary: Whether the format's files are binary rather than text.
+    '''
+
+    _exporters[name]= Exporter(name, extension, write, binary)
+
+
+def get_exporter(name):
+    '''
+    :returns: The output format of the given name.
+    :rtype: :py:class:`Exporter`
+    :raises ValueError: If no such format has been registered.
+    '''
+
+    exporter= _exporters.get(name)
+    if exporter == None:
+        raise ValueError('Unknown output format "%s"; expected one of %s.' % (name, ', '.join(_exporters)))
+    return exporter
+
+
+def exporter_names():
+    '''
+    :returns: The names of the registered output formats, in registration order.
+    :rtype: list(str)
+    '''
+
+    return list(_exporters)
+
+
+def _export_file(job):
+    '''Write a single format's file, removing it if the export fails part way.'''
+    exporter, variable_metadata_list, path= job
+    try:
+        with open(path, 'wb' if exporter.binary else 'w') as fileobj:
+            return exporter.write(variable_metadata_list, fileobj)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+def export_files(variable_metadata_list, paths_by_format, jobs=None):
+    '''
+    Export the same metadata to several formats' files, writing the files
+    concurrently.
+
+    :param variable_metadata_list: The metadata to export, shared (not copied) between the exporters.
+    :type variable_metadata_list: list(:py:class:`VariableMetadata`)
+    :param paths_by_format: The path of the file to write for each format name.
+    :type paths_by_format: dict(str, str)
+    :param int jobs: The number of files to write at once; by default, all of them.
+    :returns: The number of variables written in each format.
+    :rtype: dict(str, int)
+    '''
+
+    jobs_list= [(get_exporter(format_name), variable_metadata_list, path)
+                for format_name, path in paths_by_format.iteritems()]
+    variable_counts= _export_jobs(jobs_list, jobs)
+    return dict(zip([exporter.name for exporter, _variable_metadata_list, _path in jobs_list], variable_counts))
+
+
+def export_tables(tables, paths_by_table, format_name='sps', jobs=None):
+    '''
+    Export each of several tables of metadata (e.g. those of a form's 
+    repeats, from :py:meth:`VariableMetadata.import_repeat_tables`) to a 
+    file of its own, writing the files concurrently.
+
+    :param tables: The metadata of each table, keyed by table name.
+    :type tables: dict(str, list(:py:class:`VariableMetadata`))
+    :param paths_by_table: The path of the file to write for each table name.
+    :type paths_by_table: dict(str, str)
+    :param str format_name: The name of the output format.
+    :param int jobs: The number of files to write at once; by default, all of them.
+    :returns: The number of variables written for each table.
+    :rtype: dict(str, int)
+    '''
+
+    exporter= get_exporter(format_name)
+    table_names= list(paths_by_table)
+    jobs_list= [(exporter, tables[table_name], paths_by_table[table_name]) for table_name in table_names]
+    return dict(zip(table_names, _export_jobs(jobs_list, jobs)))
+
+
+def _export_jobs(jobs_list, jobs=None):
+    '''
+    :param jobs_list: The (exporter, metadata, path) of each file to write.
+    :param int jobs: The number of files to write at once; by default, all of them.
+    :returns: The number of variables written to each file, in the order of ``jobs_list``.
+    :rtype: list(int)
+    '''
+
+    if jobs == None:
+        jobs= len(jobs_list)
+    if jobs <= 1 or len(jobs_list) <= 1:
+        return map(_export_file, jobs_list)
+    # Only loaded when needed, since it takes as long to import as a small 
+    #   form takes to convert.
+    from multiprocessing.pool import ThreadPool
+    pool= ThreadPool(min(jobs, len(jobs_list)))
+    try:
+        return pool.map(_export_file, jobs_list)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _encode(text):
+    if isinstance(text, unicode):
+        return text.encode('utf-8')
+    return text
+
+
+def _flatten(text):
+    '''UTF-8-encode a label and put it on a single line.'''
+    return _LINE_BREAK_RE.sub(' ', _encode(text))
+
+
+def _value_pairs(value_mappings):
+    ''':returns: (value name, value label) pairs, in export order where there is one.'''
+    if hasattr(value_mappings, 'ordered_items'):
+        return value_mappings.ordered_items()
+    return sorted(value_mappings.iteritems())
+
+
+def _iter_value_label_sets(variable_metadata_list):
+    '''
+    Group the variables with value labels by their value mappings, so that
+    variables that share an interned :py:class:`ValueMapping` share a
+    single label definition.
+
+    :returns: The number of each set (from 1), its value mappings and the names of its variables.
+    :rtype: generator(tuple(int, dict, list(str)))
+    '''
+
+    variable_names_by_id= OrderedDict()
+    value_mappings_by_id= dict()
+    for variable_metadata in variable_metadata_list:
+        value_mappings= variable_metadata.value_mappings
+        if value_mappings == None or len(value_mappings) == 0:
+            continue
+        variable_names_by_id.setdefault(id(value_mappings), list()).append(variable_metadata.name)
+        value_mappings_by_id[id(value_mappings)]= value_mappings
+    for set_number, (mappings_id, variable_names) in enumerate(variable_names_by_id.iteritems(), 1):
+        yield set_number, value_mappings_by_id[mappings_id], variable_names
+
+
+def _stata_string(text):
+    '''Quote text for a Stata do-file, protecting it from macro expansion.'''
+    text= _flatten(text).replace('$', '\\$').replace('`', '\\`')
+    if '"' in text:
+        # Compound double quotes allow embedded double quotes.
+        return '`"' + text + '"\''
+    return '"' + text + '"'
+
+
+def write_stata_labels(variable_metadata_list, do_file):
+    '''
+    Write Stata commands that label a dataset's variables and values. Stata
+    only labels integer values, so value labels of other codes are left out
+    (with a comment).
+
+    :param variable_metadata_list: The metadata to export.
+    :type variable_metadata_list: list(:py:class:`VariableMetadata`)
+    :param do_file: A writable file-like object.
+    :returns: The number of variables written.
+    :rtype: int
+    '''
+
+    lines= ['* Variable and value labels generated by odk_to_spss_syntax.']
+    variable_count= 0
+    for variable_metadata in variable_metadata_list:
+        label= variable_metadata.label if variable_metadata.label != None else variable_metadata.name
+        lines.append('label variable %s %s' % (variable_metadata.name
+                                                , _stata_string(truncate_utf8(_flatten(label)
+                                                                              , STATA_VARIABLE_LABEL_MAX_BYTES))))
+        variable_count+= 1
+
+    for set_number, value_mappings, variable_names in _iter_value_label_sets(variable_metadata_list):
+        if not all(_INTEGER_RE.match(_encode(value_name)) for value_name in value_mappings):
+            lines.append('* Not labelled (codes are not integers): ' + ' '.join(variable_names))
+            continue
+        label_set_name= 'odk_vl%d' % set_number
+        for pair_number, (value_name, value_label) in enumerate(_value_pairs(value_mappings)):
+            lines.append('label define %s %d %s, %s' % (label_set_name, int(value_name), _stata_string(value_label)
+                                                        , 'replace' if pair_number == 0 else 'add'))
+        lines.append('label values %s %s' % (' '.join(variable_names), label_set_name))
+
+    do_file.write('\n'.join(lines) + '\n')
+    return variable_count
+
+
+def _r_string(text):
+    return '"' + _encode(text).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n').replace('\r', '\\r') + '"'
+
+
+_R_APPLY_FUNCTION= '''
+apply_odk_labels <- function(data) {
+  for (name in intersect(names(value_labels), names(data))) {
+    data[[name]] <- factor(data[[name]], levels = value_labels[[name]]$levels
+                           , labels = value_labels[[name]]$labels)
+  }
+  for (name in intersect(names(variable_labels), names(data))) {
+    attr(data[[name]], "label") <- variable_labels[[name]]
+  }
+  data
+}
+'''
+
+
+def write_r_labels(variable_metadata_list, r_file):
+    '''
+    Write an R script defining "variable_labels" (a named character vector),
+    "value_labels" (a named list of each variable's factor levels and
+    labels) and "apply_odk_labels", a function that converts the labelled
+    columns of a data frame to factors and attaches the variable labels.
+
+    :param variable_metadata_list: The metadata to export.
+    :type variable_metadata_list: list(:py:class:`VariableMetadata`)
+    :param r_file: A writable file-like object.
+    :returns: The number of variables written.
+    :rtype: int
+    '''
+
+    r_file.write('# Variable and value labels generated by odk_to_spss_syntax.\n'
+                 + '# source() this file, then label a data frame with: data <- apply_odk_labels(data)\n\n')
+
+    variable_label_entries= ['  %s = %s' % (_r_string(variable_metadata.name)
+                                            , _r_string(variable_metadata.label if variable_metadata.label != None
+                                                        else variable_metadata.name))
+                             for variable_metadata in variable_metadata_list]
+    r_file.write('variable_labels <- c(\n' + ',\n'.join(variable_label_entries) + '\n)\n\n')
+
+    value_label_entries= list()
+    for set_number, value_mappings, variable_names in _iter_value_label_sets(variable_metadata_list):
+        value_pairs= _value_pairs(value_mappings)
+        r_file.write('.odk_value_labels_%d <- list(levels = c(%s), labels = c(%s))\n'
+                     % (set_number, ', '.join(_r_string(value_name) for value_name, _value_label in value_pairs)
+                        , ', '.join(_r_string(value_label) for _value_name, value_label in value_pairs)))
+        value_label_entries.extend('  %s = .odk_value_labels_%d' % (_r_string(variable_name), set_number)
+                                   for variable_name in variable_names)
+    r_file.write('\nvalue_labels <- list(\n' + ',\n'.join(value_label_entries) + '\n)\n')
+    r_file.write(_R_APPLY_FUNCTION)
+    return len(variable_label_entries)
+
+
+def _sas_string(text, max_bytes=SAS_LABEL_MAX_BYTES):
+    return "'" + truncate_utf8(_flatten(text), max_bytes).replace("'", "''") + "'"
+
+
+def write_sas_labels(variable_metadata_list, sas_file):
+    '''
+    Write a SAS program that defines a format for each set of value labels
+    and attaches the labels and formats to the variables of the dataset
+    named by the macro variable "odk_dataset" (in the WORK library).
+
+    :param variable_metadata_list: The metadata to export.
+    :type variable_metadata_list: list(:py:class:`VariableMetadata`)
+    :param sas_file: A writable file-like object.
+    :returns: The number of variables written.
+    :rtype: int
+    '''
+
+    lines= ['/* Variable and value labels generated by odk_to_spss_syntax. */'
+            , '/* Name the dataset to label first, e.g.: %LET odk_dataset= my_data; */'
+            , 'PROC FORMAT;']
+    format_lines= list()
+    for set_number, value_mappings, variable_names in _iter_value_label_sets(variable_metadata_list):
+        is_numeric= all(_NUMBER_RE.match(_encode(value_name)) for value_name in value_mappings)
+        # Format names can't end in a digit; character formats start with "$".
+        format_name= ('' if is_numeric else '$') + 'odkvl%d_' % set_number
+        lines.append('  VALUE ' + format_name)
+        for value_name, value_label in _value_pairs(value_mappings):
+            value= _encode(value_name) if is_numeric else _sas_string(value_name)
+            lines.append('    %s = %s' % (value, _sas_string(value_label)))
+        lines.append('  ;')
+        format_lines.append('  FORMAT %s %s.;' % (' '.join(variable_names), format_name))
+    lines.extend(['RUN;', '', 'PROC DATASETS LIBRARY=WORK NOLIST;', '  MODIFY &odk_dataset;'])
+
+    label_lines= list()
+    for variable_metadata in variable_metadata_list:
+        label= variable_metadata.label if variable_metadata.label != None else variable_metadata.name
+        label_lines.append('    %s = %s' % (variable_metadata.name, _sas_string(label)))
+    if len(label_lines) != 0:
+        lines.append('  LABEL')
+        lines.extend(label_lines)
+        lines.append('  ;')
+    lines.extend(format_lines)
+    lines.append('QUIT;')
+
+    sas_file.write('\n'.join(lines) + '\n')
+    return len(label_lines)
+
+
+def _write_sav(variable_metadata_list, sav_file):
+    return VariableMetadata.write_sav(variable_metadata_list, sav_file)[0]
+
+
+register_exporter('sps', '.sps', VariableMetadata.write_spss_syntax)
+register_exporter('sav', '.sav', _write_sav, binary=True)
+register_exporter('do', '.do', write_stata_labels)
+register_exporter('r', '.R', write_r_labels)
+register_exporter('sas', '.sas', write_sas_labels)
+# Not a statistics package's format, but a metadata snapshot for reloading 
+#   with "--from-snapshot". (The extension is that of 
+#   :py:data:`odk_to_spss_syntax.snapshot.SNAPSHOT_EXTENSION`.)
+register_exporter('snapshot', '.odksnap', VariableMetadata.dump_snapshot, binary=True)
@@ -0,0 +1,227 @@
+'''
+Created on Oct 18, 2026
+
+Compares two versions of a form's variable metadata so that only the
+variables that changed need to be exported again.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+from collections import namedtuple
+import json
+
+from variable_metadata import VariableMetadata, DEFAULT_VALUE_ORDER
+from spss_labels import LINE_MAX_BYTES, CONTINUATION_INDENT
+
+
+__all__= ['MetadataDiff', 'diff_metadata', 'index_spss_syntax', 'read_spss_syntax_options', 'write_delta_spss_syntax'
+          , 'write_updated_spss_syntax']
+
+# Starts the comment recording the import options that syntax was generated 
+#   with, so that its lines are only reused under the same options.
+_OPTIONS_COMMENT_PREFIX= '* Import options: '
+
+
+class MetadataDiff(namedtuple('_MetadataDiff', 'added, removed, changed, unchanged')):
+    '''
+    The differences between two versions of a form, keyed by variable name.
+
+    :param list added: :py:class:`VariableMetadata` objects only found in the new version, in form order.
+    :param list removed: :py:class:`VariableMetadata` objects only found in the old version, in form order.
+    :param list changed: The new versions of :py:class:`VariableMetadata` objects whose label or value labels differ, in form order.
+    :param list unchanged: :py:class:`VariableMetadata` objects identical in both versions, in form order.
+    '''
+
+    def summary(self):
+        '''
+        :returns: A one-line summary of the differences.
+        :rtype: str
+        '''
+
+        return '%d added, %d removed, %d changed, %d unchanged.' % (len(self.added), len(self.removed)
+                                                                   , len(self.changed), len(self.unchanged))
+
+
+def diff_metadata(old_variable_metadata_iter, new_variable_metadata_iter):
+    '''
+    Compute a keyed diff of two versions of a form's metadata.
+
+    :param old_variable_metadata_iter: The metadata of the old version.
+    :type old_variable_metadata_iter: iterable(:py:class:`VariableMetadata`)
+    :param new_variable_metadata_iter: The metadata of the new version.
+    :type new_variable_metadata_iter: iterable(:py:class:`VariableMetadata`)
+    :rtype: :py:class:`MetadataDiff`
+    '''
+
+    old_variable_metadata_list= list(old_variable_metadata_iter)
+    old_by_name= dict((var_metadata.name, var_metadata) for var_metadata in old_variable_metadata_list)
+
+    added= list()
+    changed= list()
+    unchanged= list()
+    new_names= set()
+    for var_metadata in new_variable_metadata_iter:
+        new_names.add(var_metadata.name)
+        old_var_metadata= old_by_name.get(var_metadata.name)
+        if old_var_metadata == None:
+            added.append(var_metadata)
+        elif old_var_metadata == var_metadata:
+            unchanged.append(var_metadata)
+        else:
+            changed.append(var_metadata)
+
+    removed= [var_metadata for var_metadata in old_variable_metadata_list if var_metadata.name not in new_names]
+
+    return MetadataDiff(added, removed, changed, unchanged)
+
+
+def index_spss_syntax(syntax_file, import_options=None):
+    '''
+    Index the lines of a syntax file previously generated by
+    :py:meth:`VariableMetadata.write_spss_syntax` by variable name, so they
+    can be reused by :py:func:`write_updated_spss_syntax`.
+
+    :param syntax_file: An iterable of the syntax file's lines (e.g. an open file).
+    :param dict import_options: If supplied, the import options the lines will be reused under, which must match those the syntax file was generated with (see :py:func:`read_spss_syntax_options`).
+    :returns: A mapping from variable names to pairs of variable label line and value label line (or ``None``), as returned by :py:meth:`VariableMetadata._to_spss_syntax`.
+    :rtype: dict(str, tuple(str, str))
+    :raises ValueError: If the syntax file was generated with other import options.
+    '''
+
+    variable_label_lines= dict()
+    value_label_lines= dict()
+    section_lines= None
+    var_name= None
+    for line_number, line in enumerate(syntax_file):
+        if line_number == 0 and import_options != None:
+            syntax_options= read_spss_syntax_options([line])
+            if syntax_options != _normalized_options(import_options):
+                raise ValueError('The syntax was generated with other import options (%s); expected %s.'
+                                 % (json.dumps(syntax_options, sort_keys=True)
+                                    , json.dumps(import_options, sort_keys=True)))
+        line= line.rstrip('\r\n')
+        if line == 'VARIABLE LABELS':
+            section_lines= variable_label_lines
+            var_name= None
+        elif line == 'VALUE LABELS':
+            section_lines= value_label_lines
+            var_name= None
+        elif line == '':
+            section_lines= None
+        elif section_lines == None:
+            continue
+        elif line.startswith('/') or var_name == None:
+            # The first variable label line lacks the prepending "/".
+            if not line.startswith('/'):
+                line= '/' + line
+            var_name= line[1:].split(' ', 1)[0]
+            section_lines[var_name]= line
+        else:
+            # A continuation of the previous variable's line.
+            section_lines[var_name]+= '\n' + line
+
+    return dict((var_name, (var_label_line, value_label_lines.get(var_name)))
+                for var_name, var_label_line in variable_label_lines.iteritems())
+
+
+def _normalized_options(import_options):
+    ''':returns: The import options as recorded in (and read back from) a syntax file's comment.'''
+    return json.loads(json.dumps(import_options))
+
+
+def read_spss_syntax_options(syntax_lines):
+    '''
+    Read the import options recorded in a syntax file written by
+    :py:func:`write_updated_spss_syntax` or
+    :py:func:`write_delta_spss_syntax`, to check that its lines may be
+    reused under the current options.
+
+    :param syntax_lines: The syntax file's lines (only the first is needed).
+    :type syntax_lines: list(str)
+    :returns: The recorded import options (e.g. ``value_order``); syntax without them (e.g. from a plain conversion) is taken to use the default options.
+    :rtype: dict
+    '''
+
+    if len(syntax_lines) != 0 and syntax_lines[0].startswith(_OPTIONS_COMMENT_PREFIX):
+        return json.loads(syntax_lines[0][len(_OPTIONS_COMMENT_PREFIX):].rstrip('\r\n')[:-1])
+    return _normalized_options({'value_order': DEFAULT_VALUE_ORDER})
+
+
+def _write_options_comment(import_options, fileobj):
+    if import_options != None:
+        fileobj.write(_OPTIONS_COMMENT_PREFIX + json.dumps(import_options, sort_keys=True) + '.\n\n')
+
+
+def _write_comment(words, fileobj):
+    '''Write an SPSS comment of the supplied words, wrapped to SPSS's line length limit.'''
+
+    line= '*'
+    for word in words:
+        # Leave room for a closing period.
+        if len(line) > len(CONTINUATION_INDENT) and len(line) + 1 + len(word) + 1 > LINE_MAX_BYTES:
+            fileobj.write(line + '\n')
+            line= CONTINUATION_INDENT + word
+        else:
+            line+= ' ' + word
+    fileobj.write(line + '.\n')
+
+
+def write_delta_spss_syntax(new_variable_metadata_list, metadata_diff, fileobj, import_options=None):
+    '''
+    Write syntax for just the variables that were added or changed, in form
+    order. Removed variables are listed in a leading comment.
+
+    :param new_variable_metadata_list: The metadata of the new version.
+    :type new_variable_metadata_list: list(:py:class:`VariableMetadata`)
+    :param metadata_diff: The differences between the versions.
+    :type metadata_diff: :py:class:`MetadataDiff`
+    :param fileobj: A writable file-like object to receive the syntax.
+    :param dict import_options: If supplied, the import options both versions were read with, recorded in a leading comment (see :py:func:`read_spss_syntax_options`).
+    :returns: The number of variables written.
+    :rtype: int
+    '''
+
+    _write_options_comment(import_options, fileobj)
+    if len(metadata_diff.removed) != 0:
+        _write_comment(['Removed', 'variables:'] + [var_metadata.name for var_metadata in metadata_diff.removed]
+                       , fileobj)
+        fileobj.write('\n')
+
+    delta_names= set(var_metadata.name for var_metadata in metadata_diff.added + metadata_diff.changed)
+    delta_variable_metadata_iter= (var_metadata for var_metadata in new_variable_metadata_list
+                                   if var_metadata.name in delta_names)
+
+    return VariableMetadata.write_spss_syntax(delta_variable_metadata_iter, fileobj)
+
+
+def write_updated_spss_syntax(new_variable_metadata_list, metadata_diff, old_syntax_index, fileobj
+                              , import_options=None):
+    '''
+    Write the full syntax of the new version of a form, reusing the
+    previously generated lines of unchanged variables and only generating
+    lines for the variables that were added or changed.
+
+    :param new_variable_metadata_list: The metadata of the new version.
+    :type new_variable_metadata_list: list(:py:class:`VariableMetadata`)
+    :param metadata_diff: The differences between the versions.
+    :type metadata_diff: :py:class:`MetadataDiff`
+    :param dict old_syntax_index: The old version's lines, from :py:func:`index_spss_syntax`, generated with the same import options; if ``None``, all lines are generated afresh.
+    :param fileobj: A writable file-like object to receive the syntax.
+    :param dict import_options: If supplied, the import options both versions were read with, recorded in a leading comment (see :py:func:`read_spss_syntax_options`).
+    :returns: The number of variables written.
+    :rtype: int
+    '''
+
+    _write_options_comment(import_options, fileobj)
+    if old_syntax_index == None:
+        old_syntax_index= dict()
+    unchanged_names= set(var_metadata.name for var_metadata in metadata_diff.unchanged)
+
+    def iter_syntax_line_pairs():
+        for var_metadata in new_variable_metadata_list:
+            if var_metadata.name in unchanged_names and var_metadata.name in old_syntax_index:
+                yield old_syntax_index[var_metadata.name]
+            else:
+                yield var_metadata._to_spss_syntax()
+
+    return VariableMetadata.write_spss_syntax_lines(iter_syntax_line_pairs(), fileobj)
@@ -0,0 +1,152 @@
+'''
+Created on Oct 18, 2026
+
+A read-only container for a form's :py:class:`VariableMetadata`, indexed so
+that looking variables up by name or by group, and checking a form for
+duplicate names, take constant time rather than a scan of the whole form.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+from variable_metadata import GROUP_PATH_SEPARATOR
+
+
+__all__= ['FormMetadata']
+
+
+class FormMetadata(object):
+    '''
+    A form's variables in form order, indexed by name and by the path of the
+    groups enclosing them. Behaves as a read-only sequence of
+    :py:class:`VariableMetadata`, so it can be passed wherever a list of
+    them is expected (e.g. :py:meth:`VariableMetadata.write_spss_syntax`).
+
+    :param variable_metadata_iter: The form's metadata, in form order.
+    :type variable_metadata_iter: iterable(:py:class:`VariableMetadata`)
+    :param group_paths: The path of the groups enclosing each variable (e.g. "household/member", or "" outside any group), in the same order; by default, every variable is taken to be outside any group.
+    :type group_paths: iterable(str)
+    '''
+
+    def __init__(self, variable_metadata_iter, group_paths=None):
+        self._variable_metadata_list= list(variable_metadata_iter)
+        if group_paths == None:
+            self._group_paths= [''] * len(self._variable_metadata_list)
+        else:
+            self._group_paths= list(group_paths)
+            if len(self._group_paths) != len(self._variable_metadata_list):
+                raise ValueError('Expected a group path per variable.')
+
+        # Name -> position of the first variable with that name.
+        self._positions_by_name= dict()
+        # Name -> positions of every variable with that name, for names
+        #   shared by several variables only.
+        self._duplicate_positions= dict()
+        for position, variable_metadata in enumerate(self._variable_metadata_list):
+            first_position= self._positions_by_name.setdefault(variable_metadata.name, position)
+            if first_position != position:
+                self._duplicate_positions.setdefault(variable_metadata.name, [first_position]).append(position)
+
+        # Group path -> positions of the variables within the group,
+        #   including those of nested groups. Paths are shared by the
+        #   variables of a group, so each is only split once.
+        self._positions_by_group_path= {'': range(len(self._variable_metadata_list))}
+        last_group_path= enclosing_group_paths= None
+        for position, group_path in enumerate(self._group_paths):
+            if group_path != last_group_path:
+                group_names= group_path.split(GROUP_PATH_SEPARATOR) if group_path else ()
+                enclosing_group_paths= [GROUP_PATH_SEPARATOR.join(group_names[:depth])
+                                        for depth in range(1, len(group_names) + 1)]
+                last_group_path= group_path
+            for enclosing_group_path in enclosing_group_paths:
+                self._positions_by_group_path.setdefault(enclosing_group_path, list()).append(position)
+
+    def __len__(self):
+        return len(self._variable_metadata_list)
+
+    def __getitem__(self, index):
+        return self._variable_metadata_list[index]
+
+    def __iter__(self):
+        return iter(self._variable_metadata_list)
+
+    def __contains__(self, variable_name):
+        return variable_name in self._positions_by_name
+
+    def __eq__(self, other):
+        if isinstance(other, FormMetadata):
+            return (self._variable_metadata_list == other._variable_metadata_list
+                    and self._group_paths == other._group_paths)
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal= self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    def get(self, variable_name, default=None):
+        '''
+        :param str variable_name: The name of the variable to look up.
+        :returns: The first variable with the name, or ``default`` if there is none.
+        :rtype: :py:class:`VariableMetadata`
+        '''
+
+        position= self._positions_by_name.get(variable_name)
+        if position == None:
+            return default
+        return self._variable_metadata_list[position]
+
+    def index(self, variable_name):
+        '''
+        :param str variable_name: The name of the variable to look up.
+        :returns: The position in form order of the first variable with the name.
+        :rtype: int
+        :raises KeyError: If no variable has the name.
+        '''
+
+        return self._positions_by_name[variable_name]
+
+    def names(self):
+        '''
+        :returns: The distinct variable names, in form order of their first use.
+        :rtype: list(str)
+        '''
+
+        return [variable_metadata.name for position, variable_metadata in enumerate(self._variable_metadata_list)
+                if self._positions_by_name[variable_metadata.name] == position]
+
+    def duplicate_names(self):
+        '''
+        :returns: The names shared by several variables (which SPSS would reject), each with the positions of the variables sharing it, in form order of their first use.
+        :rtype: list(tuple(str, list(int)))
+        '''
+
+        return sorted(self._duplicate_positions.iteritems(), key=lambda name_positions: name_positions[1][0])
+
+    def group_path(self, variable_name):
+        '''
+        :param str variable_name: The name of the variable to look up.
+        :returns: The path of the groups enclosing the first variable with the name ("" outside any group).
+        :rtype: str
+        :raises KeyError: If no variable has the name.
+        '''
+
+        return self._group_paths[self._positions_by_name[variable_name]]
+
+    def group_paths(self):
+        '''
+        :returns: The paths of the form's groups, in form order (starting with "", the whole form).
+        :rtype: list(str)
+        '''
+
+        return sorted(self._positions_by_group_path, key=lambda group_path: (self._positions_by_group_path[group_path][0]
+                                                                             , len(group_path)))
+
+    def in_group(self, group_path):
+        '''
+        :param str group_path: The path of a group (e.g. "household/member"), or "" for the whole form.
+        :returns: The variables within the group, including those of its nested groups, in form order.
+        :rtype: list(:py:class:`VariableMetadata`)
+        '''
+
+        return [self._variable_metadata_list[position] for position in self._positions_by_group_path.get(group_path, ())]
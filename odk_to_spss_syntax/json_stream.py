@@ -0,0 +1,398 @@
+'''
+Created on Oct 18, 2026
+
+An incremental JSON tokenizer that reads from file-like objects in fixed-size
+chunks, so that documents much larger than available memory can be walked
+one piece at a time.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import codecs
+import json.decoder
+import re
+
+
+__all__= ['iter_events', 'iter_items', 'iter_prefixed_items', 'iter_tree_events']
+
+CHUNK_SIZE= 64 * 1024
+
+_WHITESPACE_RE= re.compile(r'[ \t\n\r]*')
+_COLON_RE= re.compile(r'[ \t\n\r]*:')
+_NUMBER_RE= re.compile(r'-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?$')
+# Characters that may continue a number or literal token.
+_TOKEN_RE= re.compile(r'[-+.\w]*')
+_LITERALS= {'true': ('boolean', True), 'false': ('boolean', False), 'null': ('null', None)}
+_CONTAINER_EVENTS= {'{': 'start_map', '}': 'end_map', '[': 'start_array', ']': 'end_array'}
+_CONTAINER_OPENERS= {'}': '{', ']': '['}
+# What the tokenizer may read next.
+_EXPECT_VALUE, _EXPECT_VALUE_OR_END, _EXPECT_KEY, _EXPECT_KEY_OR_END, _EXPECT_COLON, _EXPECT_COMMA_OR_END, _EXPECT_NOTHING= range(7)
+_VALUE_STATES= frozenset([_EXPECT_VALUE, _EXPECT_VALUE_OR_END])
+_KEY_STATES= frozenset([_EXPECT_KEY, _EXPECT_KEY_OR_END])
+# The state in which each closer may end an empty container.
+_EMPTY_CONTAINER_STATES= {'}': _EXPECT_KEY_OR_END, ']': _EXPECT_VALUE_OR_END}
+
+
+class _Buffer(object):
+    '''
+    A sliding window of decoded text over a file-like object. Consumed text
+    is periodically discarded so the window stays roughly one chunk in size.
+    '''
+
+    def __init__(self, fileobj, chunk_size):
+        self.fileobj= fileobj
+        self.chunk_size= chunk_size
+        self.decoder= codecs.getincrementaldecoder('utf-8')()
+        self.text= u''
+        self.pos= 0
+        self.eof= False
+
+    def fill(self, size=None):
+        '''
+        Read another chunk into the window.
+
+        :param int size: The number of bytes to read; by default, one chunk.
+        :returns: ``False`` if the underlying file is exhausted.
+        :rtype: bool
+        '''
+
+        if self.eof:
+            return False
+
+        data= self.fileobj.read(size or self.chunk_size)
+        if isinstance(data, unicode):
+            new_text= data
+        else:
+            new_text= self.decoder.decode(data, final=(not data))
+        if not data:
+            self.eof= True
+
+        # Drop what has already been consumed before growing the window.
+        self.text= self.text[self.pos:] + new_text
+        self.pos= 0
+        return bool(data) or bool(new_text)
+
+    def grow(self):
+        '''
+        Read more text for a token that straddles the end of the window,
+        reading as much again as the window holds of it so that a long
+        token is only copied a logarithmic number of times.
+
+        :returns: ``False`` if the underlying file is exhausted.
+        :rtype: bool
+        '''
+
+        return self.fill(max(self.chunk_size, len(self.text) - self.pos))
+
+
+def _string_end(buf):
+    '''
+    :returns: The position of the quote closing the string that starts at the window's position, reading more text as need be; each character is scanned only once.
+    :rtype: int
+    :raises ValueError: If the string is unterminated.
+    '''
+
+    # Relative to the string's start, which stays put while the window grows.
+    search_offset= 1
+    while True:
+        quote_pos= buf.text.find('"', buf.pos + search_offset)
+        if quote_pos == -1:
+            search_offset= len(buf.text) - buf.pos
+            if not buf.grow():
+                raise ValueError('Unterminated string in JSON text.')
+            continue
+        backslash_pos= quote_pos
+        while buf.text[backslash_pos - 1] == '\\':
+            backslash_pos-= 1
+        if (quote_pos - backslash_pos) % 2 == 0:
+            return quote_pos
+        search_offset= quote_pos + 1 - buf.pos
+
+
+def iter_events(fileobj, chunk_size=CHUNK_SIZE):
+    '''
+    Tokenize the JSON document in the supplied file-like object, checking
+    its structure as strictly as :py:func:`json.load` does.
+
+    :param fileobj: A readable file-like object containing (UTF-8) JSON text.
+    :param int chunk_size: The number of bytes to read at a time.
+    :returns: Pairs of event name (one of "start_map", "end_map", "map_key",
+        "start_array", "end_array", "string", "number", "boolean" and "null")
+        and the associated value (``None`` for structural events).
+    :rtype: generator(tuple(str, object))
+    :raises ValueError: If the document is malformed.
+    '''
+
+    buf= _Buffer(fileobj, chunk_size)
+    # What may come next: one of the ``_EXPECT_*`` states.
+    expect= _EXPECT_VALUE
+    # Stack of the open containers ('{' or '[').
+    containers= list()
+
+    while True:
+        buf.pos= _WHITESPACE_RE.match(buf.text, buf.pos).end()
+        if buf.pos >= len(buf.text):
+            if buf.fill():
+                continue
+            break
+
+        char= buf.text[buf.pos]
+        if char == '"':
+            if expect in _KEY_STATES:
+                event= 'map_key'
+            elif expect in _VALUE_STATES:
+                event= 'string'
+            else:
+                raise ValueError('Unexpected string in JSON text.')
+            try:
+                string, buf.pos= json.decoder.scanstring(buf.text, buf.pos + 1)
+            except ValueError:
+                # Most likely the string straddles the end of the window; 
+                #   find its end without rescanning it for each chunk read.
+                _string_end(buf)
+                string, buf.pos= json.decoder.scanstring(buf.text, buf.pos + 1)
+            if event == 'map_key':
+                # Keys are always followed by a colon, read along with them 
+                #   where it's in the window already.
+                colon_match= _COLON_RE.match(buf.text, buf.pos)
+                if colon_match:
+                    buf.pos= colon_match.end()
+                    expect= _EXPECT_VALUE
+                else:
+                    expect= _EXPECT_COLON
+            else:
+                expect= _EXPECT_COMMA_OR_END if len(containers) != 0 else _EXPECT_NOTHING
+            yield event, string
+
+        elif char == ',':
+            if expect != _EXPECT_COMMA_OR_END:
+                raise ValueError('Unexpected %r in JSON text.' % char)
+            buf.pos+= 1
+            expect= _EXPECT_KEY if containers[-1] == '{' else _EXPECT_VALUE
+
+        elif char == ':':
+            if expect != _EXPECT_COLON:
+                raise ValueError('Unexpected %r in JSON text.' % char)
+            buf.pos+= 1
+            expect= _EXPECT_VALUE
+
+        elif char in '{[':
+            if expect not in _VALUE_STATES:
+                raise ValueError('Unexpected %r in JSON text.' % char)
+            buf.pos+= 1
+            containers.append(char)
+            expect= _EXPECT_KEY_OR_END if char == '{' else _EXPECT_VALUE_OR_END
+            yield _CONTAINER_EVENTS[char], None
+
+        elif char in '}]':
+            if (len(containers) == 0 or containers[-1] != _CONTAINER_OPENERS[char]
+                    or expect not in (_EXPECT_COMMA_OR_END, _EMPTY_CONTAINER_STATES[char])):
+                raise ValueError('Unexpected %r in JSON text.' % char)
+            buf.pos+= 1
+            containers.pop()
+            expect= _EXPECT_COMMA_OR_END if len(containers) != 0 else _EXPECT_NOTHING
+            yield _CONTAINER_EVENTS[char], None
+
+        else:
+            if expect not in _VALUE_STATES:
+                raise ValueError('Unexpected %r in JSON text.' % char)
+            # Numbers and literals are only complete when followed by
+            #   something else (or the end of the document).
+            while True:
+                token_end= _TOKEN_RE.match(buf.text, buf.pos).end()
+                if token_end < len(buf.text) or not buf.grow():
+                    break
+
+            token= buf.text[buf.pos:token_end]
+            buf.pos= token_end
+            expect= _EXPECT_COMMA_OR_END if len(containers) != 0 else _EXPECT_NOTHING
+            number_match= _NUMBER_RE.match(token)
+            if number_match:
+                if number_match.group(1) or number_match.group(2):
+                    yield 'number', float(token)
+                else:
+                    yield 'number', int(token)
+            elif token in _LITERALS:
+                yield _LITERALS[token]
+            else:
+                raise ValueError('Unexpected token %r in JSON text.' % (token or char))
+
+    if expect != _EXPECT_NOTHING:
+        raise ValueError('Unexpected end of JSON text.')
+
+
+def _build_value(events, event, value):
+    '''
+    Assemble the complete value whose first event has just been consumed
+    from ``events``.
+    '''
+
+    if event not in ('start_map', 'start_array'):
+        return value
+
+    root= dict() if event == 'start_map' else list()
+    # Stack of (container, pending map key) pairs.
+    stack= [(root, None)]
+    for event, value in events:
+        container, key= stack[-1]
+        if event == 'map_key':
+            stack[-1]= (container, value)
+            continue
+        if event in ('end_map', 'end_array'):
+            stack.pop()
+            if len(stack) == 0:
+                return root
+            continue
+
+        if event == 'start_map':
+            child= dict()
+        elif event == 'start_array':
+            child= list()
+        else:
+            child= value
+
+        if isinstance(container, dict):
+            container[key]= child
+        else:
+            container.append(child)
+
+        if event in ('start_map', 'start_array'):
+            stack.append((child, None))
+
+    raise ValueError('Unexpected end of JSON text.')
+
+
+def iter_items(fileobj, prefix, chunk_size=CHUNK_SIZE):
+    '''
+    Yield each fully-built value found at the given location in a JSON
+    document, holding only one such value in memory at a time. Each value
+    is built whole; see :py:func:`iter_tree_events` to walk nested values
+    a piece at a time.
+
+    :param fileobj: A readable file-like object containing (UTF-8) JSON text.
+    :param tuple prefix: The location of the values, as a sequence of object
+        keys and the string "item" for array elements (e.g.
+        ``('children', 'item')`` for each element of the root object's
+        "children" array).
+    :param int chunk_size: The number of bytes to read at a time.
+    :rtype: generator
+    '''
+
+    for _prefix, value in iter_prefixed_items(fileobj, (prefix,), chunk_size):
+        yield value
+
+
+def iter_prefixed_items(fileobj, prefixes, chunk_size=CHUNK_SIZE):
+    '''
+    Like :py:func:`iter_items`, but yield the values found at any of 
+    several locations in a single pass over the document.
+
+    :param fileobj: A readable file-like object containing (UTF-8) JSON text.
+    :param prefixes: The locations of the values, as for :py:func:`iter_items`.
+    :param int chunk_size: The number of bytes to read at a time.
+    :returns: Each value with its location, in document order.
+    :rtype: generator(tuple(tuple, object))
+    '''
+
+    events= iter_events(fileobj, chunk_size)
+    for prefix, event, value in _iter_prefixed_starts(events, prefixes):
+        yield prefix, _build_value(events, event, value)
+
+
+def iter_tree_events(fileobj, prefix, children_key, chunk_size=CHUNK_SIZE):
+    '''
+    Walk the trees of objects found at the given location in a JSON 
+    document (e.g. a form's questions, groups and choices), whose children 
+    are listed in arrays under ``children_key``. Rather than being built 
+    whole, each tree is reported a node at a time: children arrays are 
+    never built, so only the nodes currently open (without their children) 
+    are held in memory.
+
+    :param fileobj: A readable file-like object containing (UTF-8) JSON text.
+    :param tuple prefix: The location of the trees' roots, as for :py:func:`iter_items`.
+    :param str children_key: The key of each object's array of children.
+    :param int chunk_size: The number of bytes to read at a time.
+    :returns: A "start_node" event (with ``None``) as each root or child 
+        begins and an "end_node" event (with the node, minus its children 
+        array) as it ends, so a node's children's events come between its 
+        own, in document order.
+    :rtype: generator(tuple(str, object))
+    '''
+
+    events= iter_events(fileobj, chunk_size)
+    for _prefix, event, value in _iter_prefixed_starts(events, (prefix,)):
+        for node_event in _iter_node_events(events, event, value, children_key):
+            yield node_event
+
+
+def _iter_prefixed_starts(events, prefixes):
+    '''
+    Yield the location, first event and value of each value found at any of 
+    several locations; the caller consumes the rest of the value's events 
+    from ``events`` before asking for the next.
+    '''
+
+    prefixes= set(tuple(prefix) for prefix in prefixes)
+    # The path to the value about to be read.
+    path= list()
+    for event, value in events:
+        if event == 'map_key':
+            path[-1]= value
+            continue
+        if event in ('end_map', 'end_array'):
+            path.pop()
+            continue
+
+        current_path= tuple(path)
+        if current_path in prefixes:
+            yield current_path, event, value
+        elif event == 'start_map':
+            path.append(None)
+        elif event == 'start_array':
+            path.append('item')
+
+
+def _iter_node_events(events, event, value, children_key):
+    '''
+    The events of :py:func:`iter_tree_events` for a tree whose first event 
+    has just been consumed from ``events``, walked with an explicit stack 
+    rather than recursion so that deep nesting doesn't hit the interpreter's 
+    recursion limit.
+    '''
+
+    yield 'start_node', None
+    if event != 'start_map':
+        yield 'end_node', _build_value(events, event, value)
+        return
+
+    # One [node, pending key] per open object, innermost last; ``None`` 
+    #   stands for an open children array.
+    stack= [[dict(), None]]
+    for event, value in events:
+        node_entry= stack[-1]
+        if node_entry == None:
+            # Each element of a children array is a node of its own.
+            if event == 'end_array':
+                stack.pop()
+                continue
+            yield 'start_node', None
+            if event == 'start_map':
+                stack.append([dict(), None])
+            else:
+                yield 'end_node', _build_value(events, event, value)
+            continue
+
+        node, key= node_entry
+        if event == 'end_map':
+            stack.pop()
+            yield 'end_node', node
+            if len(stack) == 0:
+                return
+        elif event == 'map_key':
+            node_entry[1]= value
+        elif key == children_key and event == 'start_array':
+            stack.append(None)
+        else:
+            node[key]= _build_value(events, event, value)
+
+    raise ValueError('Unexpected end of JSON text.')
@@ -0,0 +1,18 @@
+'''
+Created on Oct 18, 2026
+
+The modes of :py:func:`odk_to_spss_syntax.data_labels.label_csv`, kept apart
+from the labelling itself so that the command line can offer them without
+loading the CSV backend.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+
+__all__= ['LABEL_MODES', 'DEFAULT_LABEL_MODE']
+
+# What to do with the codes of labelled columns: replace them with their
+#   labels, add a column of labels after each, or only check them against the
+#   form's choices.
+LABEL_MODES= ('replace', 'append', 'validate')
+DEFAULT_LABEL_MODE= 'replace'
@@ -10,9 +10,17 @@ Provides the outward interface of the package.
 
 import sys
 import os
-import argparse
+from StringIO import StringIO
+import json
+import re
+from collections import OrderedDict
 
-from variable_metadata import VariableMetadata
+from variable_metadata import VariableMetadata, VALUE_ORDERS, DEFAULT_VALUE_ORDER
+from profiling import ConversionMetrics, start_metrics
+from label_modes import LABEL_MODES, DEFAULT_LABEL_MODE
+# The cache, the exporters, the form format backends and "argparse" are 
+#   imported where they are used, so that importing the package (or asking 
+#   the command line for its version) doesn't load them.
 
 
 __all__ = []
@@ -20,23 +28,412 @@ __all__ = []
 __date__ = '2014-06-15'
 __updated__ = '2014-06-15'
 
-def from_dicts(variable_labels_dict, value_labels_dict):
-    variable_metadata_list= VariableMetadata.import_dicts(variable_labels_dict, value_labels_dict)
-    spss_syntax_string= VariableMetadata.export_spss_syntax(variable_metadata_list)
+# The supported form file formats (including metadata snapshots written by 
+#   :py:meth:`VariableMetadata.dump_snapshot`).
+FORM_FORMATS= ('json', 'xml', 'xls', 'snapshot')
+
+def from_dicts(variable_labels_dict, value_labels_dict, value_order=DEFAULT_VALUE_ORDER, metrics=None):
+    '''
+    :param variable_labels_dict: A mapping from variable names to variable labels, or (variable name, variable label) pairs.
+    :param dict value_labels_dict: A mapping from variable names to mappings from value names to value labels; variables with value labels but no variable label are exported too.
+    :param str value_order: One of :py:data:`VALUE_ORDERS`.
+    :param metrics: If supplied, collect the conversion's stage timings and counters.
+    :type metrics: :py:class:`ConversionMetrics`
+    '''
+    
+    metrics= start_metrics(metrics)
+    with metrics.timer('import'):
+        variable_metadata_list= VariableMetadata.import_dicts(variable_labels_dict, value_labels_dict, value_order)
+    syntax_buffer= StringIO()
+    with metrics.timer('export'):
+        metrics.count('variables', VariableMetadata.write_spss_syntax(variable_metadata_list, syntax_buffer))
+    spss_syntax_string= syntax_buffer.getvalue()
     
+    metrics.count('bytes_out', len(spss_syntax_string))
+    metrics.finish()
     return spss_syntax_string
 
-def from_json(json_text):
+def from_json(json_text, cache=None, metrics=None, **import_options):
     '''
     :param str json_text:
+    :param cache: If supplied, return previously generated syntax for an unchanged form without parsing it.
+    :type cache: :py:class:`SyntaxCache`
+    :param metrics: If supplied, collect the conversion's stage timings and counters.
+    :type metrics: :py:class:`ConversionMetrics`
+    :param import_options: Keyword arguments for :py:meth:`VariableMetadata.import_json` (e.g. ``value_order``).
     '''
     
-    variable_metadata_list= VariableMetadata.import_json(json_text)
-    spss_syntax_string= VariableMetadata.export_spss_syntax(variable_metadata_list)
+    metrics= start_metrics(metrics)
+    metrics.count('bytes_in', len(json_text))
+    if cache != None:
+        cache_key= cache.key(json_text, import_options)
+        spss_syntax_string= cache.get(cache_key)
+        if spss_syntax_string != None:
+            metrics.count('cache_hits')
+            metrics.count('bytes_out', len(spss_syntax_string))
+            metrics.finish()
+            return spss_syntax_string
     
+    syntax_buffer= StringIO()
+    _write_from_json(json_text, syntax_buffer, metrics, **import_options)
+    spss_syntax_string= syntax_buffer.getvalue()
+    
+    if cache != None:
+        cache.put(cache_key, spss_syntax_string)
+    
+    metrics.count('bytes_out', len(spss_syntax_string))
+    metrics.finish()
     return spss_syntax_string
 
 
+def from_json_translations(json_text, languages=None, value_order=DEFAULT_VALUE_ORDER):
+    '''
+    Like :py:func:`from_json`, but generate the syntax of each of several 
+    languages from a single parse of the form.
+    
+    :param str json_text:
+    :param languages: The languages to generate syntax for; by default, every language the form's labels are translated into.
+    :type languages: list(str)
+    :param str value_order: One of :py:data:`VALUE_ORDERS`.
+    :returns: Each language's syntax, in the order of ``languages``.
+    :rtype: :py:class:`collections.OrderedDict`
+    '''
+    
+    translations= VariableMetadata.import_json_translations(json_text, languages, value_order)
+    for language, variable_metadata_list in translations.iteritems():
+        translations[language]= VariableMetadata.export_spss_syntax(variable_metadata_list)
+    return translations
+
+
+def _write_from_json(json_text, syntax_file, metrics, **import_options):
+    '''Convert a JSON-formatted form's text, timing each stage.'''
+    
+    with metrics.timer('parse'):
+        form_dict= json.loads(json_text)
+    variable_metadata_iter= metrics.timed_iter('import', VariableMetadata.iter_import(form_dict, metrics=metrics
+                                                                                     , **import_options))
+    with metrics.timer('export'):
+        metrics.count('variables', VariableMetadata.write_spss_syntax(variable_metadata_iter, syntax_file))
+
+
+def to_file_from_json(json_text, syntax_file, cache=None, metrics=None, **import_options):
+    '''
+    Like :py:func:`from_json`, but stream the syntax directly to a file-like 
+    object instead of building it up as a string.
+    
+    :param str json_text:
+    :param syntax_file: A writable file-like object.
+    :param cache: If supplied, reuse previously generated syntax for an unchanged form.
+    :type cache: :py:class:`SyntaxCache`
+    :param metrics: If supplied, collect the conversion's stage timings and counters.
+    :type metrics: :py:class:`ConversionMetrics`
+    :param import_options: Keyword arguments for :py:meth:`VariableMetadata.import_json`.
+    '''
+    
+    if cache != None:
+        syntax_file.write(from_json(json_text, cache, metrics, **import_options))
+        return
+    
+    metrics= start_metrics(metrics)
+    metrics.count('bytes_in', len(json_text))
+    _write_from_json(json_text, metrics.counting_writer(syntax_file), metrics, **import_options)
+    metrics.finish()
+
+
+def to_file_from_json_file(json_file, syntax_file, stream=False, cache=None, metrics=None, **import_options):
+    '''
+    Convert a JSON-formatted form read from one file-like object to syntax 
+    written to another.
+    
+    :param json_file: A readable file-like object; seekable if ``cache`` is supplied with ``stream``.
+    :param syntax_file: A writable file-like object.
+    :param bool stream: Whether to read the form incrementally.
+    :param cache: If supplied, reuse previously generated syntax for an unchanged form.
+    :type cache: :py:class:`SyntaxCache`
+    :param metrics: If supplied, collect the conversion's stage timings and counters.
+    :type metrics: :py:class:`ConversionMetrics`
+    :param import_options: Keyword arguments for :py:meth:`VariableMetadata.import_json` or :py:meth:`VariableMetadata.iter_import_json_stream`.
+    '''
+    
+    to_file_from_form_file(json_file, syntax_file, 'json', stream, cache, metrics, **import_options)
+
+
+def to_file_from_form_file(form_file, syntax_file, form_format='json', stream=False, cache=None, metrics=None
+                           , **import_options):
+    '''
+    Convert a form of any supported format read from one file-like object to 
+    syntax written to another.
+    
+    :param form_file: A readable file-like object; seekable if ``cache`` is supplied and the form is read incrementally.
+    :param syntax_file: A writable file-like object.
+    :param str form_format: One of :py:data:`FORM_FORMATS`.
+    :param bool stream: Whether to read a JSON-formatted form incrementally (other formats always are).
+    :param cache: If supplied, reuse previously generated syntax for an unchanged form.
+    :type cache: :py:class:`SyntaxCache`
+    :param metrics: If supplied, collect the conversion's stage timings and counters. Parsing and importing are indistinguishable (and timed as "import") when the form is read incrementally.
+    :type metrics: :py:class:`ConversionMetrics`
+    :param import_options: Keyword arguments for the format's import method of :py:class:`VariableMetadata`.
+    '''
+    
+    if form_format not in FORM_FORMATS:
+        raise ValueError('Unknown form format "%s"; expected one of %s.' % (form_format, ', '.join(FORM_FORMATS)))
+    
+    if form_format == 'json' and not stream:
+        to_file_from_json(form_file.read(), syntax_file, cache, metrics, **import_options)
+        return
+    
+    metrics= start_metrics(metrics)
+    form_size= _file_size(form_file)
+    if form_size != None:
+        metrics.count('bytes_in', form_size)
+    syntax_file= metrics.counting_writer(syntax_file)
+    
+    if cache == None:
+        _write_from_form_file(form_file, syntax_file, form_format, metrics, **import_options)
+        metrics.finish()
+        return
+    
+    import shutil
+    import tempfile
+    
+    cache_options= dict(import_options)
+    if form_format != 'json':
+        # JSON keys match those of :py:func:`from_json`.
+        cache_options['form_format']= form_format
+    else:
+        # Streamed imports are keyed apart, in case their output ever differs.
+        cache_options['stream']= True
+    cache_key= cache.file_key(form_file, cache_options)
+    cache_entry_file= cache.open(cache_key)
+    if cache_entry_file != None:
+        with cache_entry_file:
+            shutil.copyfileobj(cache_entry_file, syntax_file)
+        metrics.count('cache_hits')
+        metrics.finish()
+        return
+    
+    # Generate the syntax once, then copy it to both the cache and the output.
+    with tempfile.TemporaryFile() as spool:
+        _write_from_form_file(form_file, spool, form_format, metrics, **import_options)
+        spool.seek(0)
+        cache.put_file(cache_key, spool)
+        spool.seek(0)
+        shutil.copyfileobj(spool, syntax_file)
+    metrics.finish()
+
+
+def to_sav_file_from_form_file(form_file, sav_file, form_format='json', data_file=None, stream=False, metrics=None
+                               , **import_options):
+    '''
+    Convert a form of any supported format read from a file-like object 
+    directly to an SPSS system (".sav") file, instead of to syntax that must 
+    then be run in SPSS.
+    
+    :param form_file: A readable file-like object.
+    :param sav_file: A writable binary file-like object.
+    :param str form_format: One of :py:data:`FORM_FORMATS`.
+    :param data_file: If supplied, a readable file-like object containing a CSV export of the form's data, written to the system file as its cases.
+    :param bool stream: Whether to read a JSON-formatted form incrementally (other formats always are).
+    :param metrics: If supplied, collect the conversion's stage timings and counters.
+    :type metrics: :py:class:`ConversionMetrics`
+    :param import_options: Keyword arguments for the format's import method of :py:class:`VariableMetadata`.
+    '''
+    
+    import sav_writer
+    
+    if form_format not in FORM_FORMATS:
+        raise ValueError('Unknown form format "%s"; expected one of %s.' % (form_format, ', '.join(FORM_FORMATS)))
+    
+    metrics= start_metrics(metrics)
+    form_size= _file_size(form_file)
+    if form_size != None:
+        metrics.count('bytes_in', form_size)
+    
+    with metrics.timer('parse'):
+        variable_metadata_iter= _iter_import_form_file(form_file, form_format, stream, metrics=metrics
+                                                       , **import_options)
+    variable_metadata_iter= metrics.timed_iter('import', variable_metadata_iter)
+    if data_file != None:
+        data_rows= sav_writer.iter_csv_data_rows(data_file)
+    else:
+        data_rows= None
+    with metrics.timer('export'):
+        variable_count, case_count= VariableMetadata.write_sav(variable_metadata_iter, metrics.counting_writer(sav_file)
+                                                               , data_rows)
+    metrics.count('variables', variable_count)
+    metrics.count('cases', case_count)
+    metrics.finish()
+
+
+def to_files_from_form_file(form_file, paths_by_format, form_format='json', stream=False, jobs=None, metrics=None
+                            , **import_options):
+    '''
+    Convert a form read from a file-like object to the files of several 
+    output formats (e.g. SPSS syntax, a Stata do-file and an R script), 
+    parsing the form only once and writing the files concurrently. See 
+    :py:mod:`odk_to_spss_syntax.exporters`.
+    
+    :param form_file: A readable file-like object.
+    :param paths_by_format: The path of the file to write for each output format name.
+    :type paths_by_format: dict(str, str)
+    :param str form_format: One of :py:data:`FORM_FORMATS`.
+    :param bool stream: Whether to read a JSON-formatted form incrementally (other formats always are).
+    :param int jobs: The number of files to write at once; by default, all of them.
+    :param metrics: If supplied, collect the conversion's stage timings and counters.
+    :type metrics: :py:class:`ConversionMetrics`
+    :param import_options: Keyword arguments for the format's import method of :py:class:`VariableMetadata`.
+    :returns: The number of variables written in each output format.
+    :rtype: dict(str, int)
+    '''
+    
+    from exporters import export_files
+    
+    if form_format not in FORM_FORMATS:
+        raise ValueError('Unknown form format "%s"; expected one of %s.' % (form_format, ', '.join(FORM_FORMATS)))
+    
+    metrics= start_metrics(metrics)
+    form_size= _file_size(form_file)
+    if form_size != None:
+        metrics.count('bytes_in', form_size)
+    
+    with metrics.timer('parse'):
+        variable_metadata_iter= _iter_import_form_file(form_file, form_format, stream, metrics=metrics
+                                                       , **import_options)
+    # Every exporter works from the same list.
+    variable_metadata_list= list(metrics.timed_iter('import', variable_metadata_iter))
+    with metrics.timer('export'):
+        variable_counts= export_files(variable_metadata_list, paths_by_format, jobs)
+    metrics.count('variables', len(variable_metadata_list))
+    metrics.count('files_out', len(variable_counts))
+    metrics.finish()
+    return variable_counts
+
+
+def to_repeat_files_from_json(json_text, syntax_path, jobs=None, metrics=None, **import_options):
+    '''
+    Convert a JSON-formatted form to a syntax file per table of its data as 
+    ODK exports it: one for the questions outside any repeat and one for 
+    each repeat's (e.g. a household roster's), with variables named after 
+    their group path. The files are written concurrently. See 
+    :py:meth:`VariableMetadata.import_repeat_tables`.
+    
+    :param str json_text:
+    :param str syntax_path: The path of the syntax file of the questions outside any repeat; each repeat's file is named after it (see :py:func:`repeat_syntax_path`).
+    :param int jobs: The number of files to write at once; by default, all of them.
+    :param metrics: If supplied, collect the conversion's stage timings and counters.
+    :type metrics: :py:class:`ConversionMetrics`
+    :param import_options: Keyword arguments for :py:meth:`VariableMetadata.import_repeat_tables` (e.g. ``value_order``).
+    :returns: The path of each table's syntax file, keyed by the repeat's path (``None`` for the questions outside any repeat).
+    :rtype: :py:class:`collections.OrderedDict`
+    '''
+    
+    from exporters import export_tables
+    
+    metrics= start_metrics(metrics)
+    metrics.count('bytes_in', len(json_text))
+    with metrics.timer('parse'):
+        form_dict= json.loads(json_text)
+    with metrics.timer('import'):
+        tables= VariableMetadata.import_repeat_tables(form_dict, metrics=metrics, **import_options)
+    paths_by_table= OrderedDict((table_name, repeat_syntax_path(syntax_path, table_name)) for table_name in tables)
+    with metrics.timer('export'):
+        variable_counts= export_tables(tables, paths_by_table, 'sps', jobs)
+    metrics.count('variables', sum(variable_counts.itervalues()))
+    metrics.count('files_out', len(variable_counts))
+    metrics.finish()
+    return paths_by_table
+
+
+def repeat_syntax_path(syntax_path, table_name):
+    '''
+    :returns: The path of a repeat table's syntax file, e.g. "syntax-household-member.sps" for the "household/member" repeat of "syntax.sps".
+    :rtype: str
+    '''
+    
+    if table_name == None:
+        return syntax_path
+    syntax_path_root, syntax_path_ext= os.path.splitext(syntax_path)
+    return syntax_path_root + '-' + re.sub(r'[^\w-]+', '_', table_name.replace('/', '-')) + syntax_path_ext
+
+
+def label_csv_from_form_file(form_file, csv_in, csv_out, form_format='json', mode=DEFAULT_LABEL_MODE, stream=False
+                             , **import_options):
+    '''
+    Label a CSV export of a form's submissions with the form's value 
+    labels, streaming the export a row at a time. See 
+    :py:func:`odk_to_spss_syntax.data_labels.label_csv`.
+    
+    :param form_file: A readable file-like object containing the form.
+    :param csv_in: A readable file-like object containing the export.
+    :param csv_out: A writable file-like object for the labelled export (or, in "validate" mode, the invalid codes).
+    :param str form_format: One of :py:data:`FORM_FORMATS`.
+    :param str mode: One of :py:data:`odk_to_spss_syntax.label_modes.LABEL_MODES`.
+    :param bool stream: Whether to read a JSON-formatted form incrementally (other formats always are).
+    :param import_options: Keyword arguments for the format's import method of :py:class:`VariableMetadata`.
+    :rtype: :py:class:`odk_to_spss_syntax.data_labels.LabellingReport`
+    '''
+    
+    from data_labels import label_csv
+    
+    if form_format not in FORM_FORMATS:
+        raise ValueError('Unknown form format "%s"; expected one of %s.' % (form_format, ', '.join(FORM_FORMATS)))
+    
+    variable_metadata_list= list(_iter_import_form_file(form_file, form_format, stream, **import_options))
+    return label_csv(variable_metadata_list, csv_in, csv_out, mode)
+
+
+def _write_from_form_file(form_file, syntax_file, form_format, metrics, **import_options):
+    '''Convert a form read incrementally from a file-like object, timing each stage.'''
+    
+    with metrics.timer('parse'):
+        # Formats read in a single pass (XML) are parsed here, the others lazily.
+        variable_metadata_iter= _iter_import_form_file(form_file, form_format, metrics=metrics, **import_options)
+    variable_metadata_iter= metrics.timed_iter('import', variable_metadata_iter)
+    with metrics.timer('export'):
+        metrics.count('variables', VariableMetadata.write_spss_syntax(variable_metadata_iter, syntax_file))
+
+
+def _iter_import_form_file(form_file, form_format, stream=True, metrics=None, **import_options):
+    '''
+    :returns: The metadata of a form read from a file-like object.
+    :rtype: iterable(:py:class:`VariableMetadata`)
+    '''
+    
+    if form_format == 'xml':
+        return VariableMetadata.import_xml(form_file, **import_options)
+    if form_format == 'xls':
+        return VariableMetadata.iter_import_xls(form_file, **import_options)
+    if form_format == 'snapshot':
+        # The snapshot's labels and value order were fixed when it was written.
+        return _iter_snapshot(form_file)
+    if not stream:
+        return VariableMetadata.import_json(form_file.read(), **import_options)
+    return VariableMetadata.iter_import_json_stream(form_file, metrics=metrics, **import_options)
+
+
+def _iter_snapshot(snapshot_file):
+    '''
+    :returns: The metadata in a snapshot, releasing its memory-mapped file once read.
+    :rtype: iterable(:py:class:`VariableMetadata`)
+    '''
+    
+    with VariableMetadata.load_snapshot(snapshot_file) as snapshot:
+        for variable_metadata in snapshot:
+            yield variable_metadata
+
+
+def _file_size(fileobj):
+    '''
+    :returns: The size of a file-like object's file, or ``None`` if it isn't backed by one.
+    :rtype: int
+    '''
+    
+    try:
+        return os.fstat(fileobj.fileno()).st_size
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+
 def main(argv=None): # IGNORE:C0111
     '''Command line options.'''
     from odk_to_spss_syntax import __version__
@@ -49,6 +446,15 @@ def main(argv=None): # IGNORE:C0111
     program_version = "v%s" % __version__
     program_build_date = str(__updated__)
     program_version_message = '%%(prog)s %s (%s)' % (program_version, program_build_date)
+    if list(argv) in (['-V'], ['--version']):
+        # Answer as "argparse" would (on stderr), without building the parser.
+        sys.stderr.write(program_version_message % {'prog': program_name} + '\n')
+        return 0
+    
+    import argparse
+    from cache import DEFAULT_MAX_SIZE as DEFAULT_CACHE_SIZE
+    from exporters import exporter_names
+    
     program_shortdesc = __import__('odk_to_spss_syntax').__doc__.split("\n")[1]
     program_license = '''%s
 
@@ -67,27 +473,488 @@ USAGE
     # Setup argument parser
     parser = argparse.ArgumentParser(description=program_license
                                      , formatter_class=argparse.RawDescriptionHelpFormatter)
-    parser.add_argument('infile', type=argparse.FileType('r'), help='The ODK form file to parse.')
-    parser.add_argument('outfile', type=argparse.FileType('w'), help='The SPSS syntax file to output.')
+    parser.add_argument('infile', type=argparse.FileType('rb'), nargs='?', help='The ODK form file to parse.')
+    parser.add_argument('outfile', type=argparse.FileType('w'), nargs='?', help='The SPSS syntax file to output.')
     group= parser.add_mutually_exclusive_group()
     group.add_argument('--json', action='store_true', default=True
                        , help='Treat the input file as a JSON-formatted ODK form [implicit default].')
-#     # TODO
-#     group.add_argument('--xml', action='store_true'
-#                        , help='Treat the input file as XML-formatted.')
-#     group.add_argument('--xls', action='store_true'
-#                        , help='Treat the input file as XLS-formatted.')
+    group.add_argument('--xml', action='store_true'
+                       , help='Treat the input file as an XML-formatted ODK form (XForm).')
+    group.add_argument('--xls', action='store_true'
+                       , help='Treat the input file as an XLSForm (".xlsx" or ".xls" workbook).')
+    group.add_argument('--from-snapshot', action='store_true'
+                       , help='Treat the input file as a metadata snapshot written with "--snapshot", skipping the form\'s parsing (its language and value order are those it was written with).')
+    parser.add_argument('--stream', action='store_true'
+                        , help='Read the JSON form incrementally, a question at a time, to bound memory use on very large forms.')
+    parser.add_argument('--language', action='append', metavar='LANGUAGE'
+                        , help='Take labels from this language of a multilingual form [default: the form\'s default language]. Give more than once, or give "all", to write a syntax file per language (named after "outfile", e.g. "syntax.English.sps") from a single parse of a JSON form.')
+    parser.add_argument('--format', metavar='FORMATS'
+                        , help='Comma-separated output formats, from: %s [default: sps]. With more than one, a file per format is written, named after "outfile" (e.g. "labels.sps,labels.do"), from a single parse of the form.' % ', '.join(exporter_names()))
+    parser.add_argument('--snapshot', action='store_true'
+                        , help='Also write a metadata snapshot next to "outfile" (e.g. "syntax.odksnap"), for reloading with "--from-snapshot" without parsing the form again.')
+    parser.add_argument('--sav', action='store_true'
+                        , help='Write "outfile" as an SPSS system (".sav") file with the form\'s labels already applied, instead of as syntax.')
+    parser.add_argument('--data', type=argparse.FileType('rb'), metavar='CSV_FILE'
+                        , help='With "--sav", write the cases of this CSV export of the form\'s data to the system file.')
+    parser.add_argument('--label-csv', type=argparse.FileType('rb'), metavar='CSV_FILE'
+                        , help='Instead of syntax, write a copy of this CSV export of the form\'s data to "outfile" with its select questions\' codes labelled.')
+    parser.add_argument('--label-mode', choices=LABEL_MODES, default=DEFAULT_LABEL_MODE
+                        , help='With "--label-csv": replace codes with their labels, add a label column after each coded column, or only validate the codes, writing each one that isn\'t among the choices to "outfile" [default: %(default)s].')
+    parser.add_argument('--repeats', action='store_true'
+                        , help='Write a syntax file per table of the form\'s data as ODK exports it, with variables named after their group path: "outfile" for the questions outside any repeat and one named after it for each repeat (e.g. "syntax-household-member.sps"), from a single parse of a JSON form.')
+    parser.add_argument('--value-order', choices=VALUE_ORDERS, default=DEFAULT_VALUE_ORDER
+                        , help='The order in which to list value labels: as in the form, sorted lexicographically, or sorted with numeric values in numeric order [default: %(default)s].')
+    parser.add_argument('--batch', nargs=2, metavar=('INDIR', 'OUTDIR')
+                        , help='Convert every form under INDIR to a syntax file under OUTDIR (instead of "infile" and "outfile"); forms whose names only differ by extension keep it (e.g. "form.xml.sps").')
+    parser.add_argument('-j', '--jobs', type=int, default=None
+                        , help='The number of worker processes to use with "--batch" [default: number of CPUs], or of files to write at once with "--format" or "--repeats" [default: all].')
+    parser.add_argument('--diff', type=argparse.FileType('rb'), metavar='OLD_FORM'
+                        , help='Compare "infile" against this older version of the form, regenerating only the lines of changed variables.')
+    parser.add_argument('--old-syntax', type=argparse.FileType('r'), metavar='OLD_SYNTAX'
+                        , help='With "--diff", the syntax file previously generated from OLD_FORM with the same "--language" and "--value-order", whose lines are reused for unchanged variables.')
+    parser.add_argument('--delta', action='store_true'
+                        , help='With "--diff", only write the syntax of added and changed variables (not with "--old-syntax").')
+    parser.add_argument('--cache-dir'
+                        , help='Reuse syntax previously generated for unchanged forms, cached in this directory.')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_CACHE_SIZE / (1024 * 1024)
+                        , help='The size bound of the "--cache-dir" cache, in MiB [default: %(default)d].')
+    parser.add_argument('--cache-stats', action='store_true'
+                        , help='Report the number of cache hits and misses to stderr.')
+    parser.add_argument('--profile', action='store_true'
+                        , help='Report the time spent in each stage of the conversion, and what it processed, to stderr.')
+    parser.add_argument('--cprofile', metavar='STATS_FILE'
+                        , help='Run under cProfile, writing the statistics to STATS_FILE (for e.g. "pstats" or "snakeviz").')
     parser.add_argument('-V', '--version', action='version', version=program_version_message)
 
     # Process arguments
     args = parser.parse_args(argv)
     
-    json_form_text= args.infile.read()
+    if args.cprofile:
+        import cProfile
+        profiler= cProfile.Profile()
+        try:
+            return profiler.runcall(_main, parser, args)
+        finally:
+            profiler.dump_stats(args.cprofile)
+    return _main(parser, args)
+
+
+def _main(parser, args):
+    '''
+    Carry out the conversion requested by the parsed command line options.
+    
+    :returns: The process exit status.
+    :rtype: int
+    '''
+    
+    if args.profile and (args.batch or args.diff):
+        parser.error('"--profile" only applies to the conversion of a single form.')
+    languages= _languages(args)
+    is_multilingual= (languages == None or len(languages) > 1)
+    if is_multilingual and (args.batch or args.diff):
+        parser.error('"--batch" and "--diff" only apply to a single language.')
+    output_formats= _output_formats(parser, args)
+    if (args.sav or output_formats != None) and (args.batch or args.diff):
+        parser.error('"--sav", "--format" and "--snapshot" only apply to the conversion of a single form.')
+    if args.label_csv and (args.batch or args.diff or args.sav or output_formats != None):
+        parser.error('"--label-csv" cannot be combined with "--batch", "--diff", "--sav", "--format" or "--snapshot".')
+    if args.sav and output_formats != None:
+        parser.error('"--sav" cannot be combined with "--format" or "--snapshot"; use e.g. "--format sav,snapshot".')
+    if args.repeats and (args.batch or args.diff or args.sav or args.label_csv or output_formats != None):
+        parser.error('"--repeats" cannot be combined with "--batch", "--diff", "--sav", "--label-csv", "--format" or "--snapshot".')
+    if args.batch:
+        if args.infile or args.outfile:
+            parser.error('"infile" and "outfile" cannot be combined with "--batch".')
+        return _main_batch(args)
+    if not (args.infile and args.outfile):
+        parser.error('"infile" and "outfile" are required.')
+    if args.old_syntax and args.delta:
+        parser.error('"--old-syntax" cannot be combined with "--delta", which doesn\'t reuse any lines.')
+    if args.diff:
+        return _main_diff(parser, args)
+    if args.old_syntax or args.delta:
+        parser.error('"--old-syntax" and "--delta" require "--diff".')
+    if args.data and not args.sav:
+        parser.error('"--data" requires "--sav".')
+    if args.sav:
+        return _main_sav(parser, args)
+    if args.label_csv:
+        return _main_label_csv(parser, args)
+    if output_formats != None:
+        return _main_formats(parser, args, output_formats)
+    if args.repeats:
+        return _main_repeats(parser, args)
+    if is_multilingual:
+        return _main_languages(parser, args)
+    
+    syntax_cache= _make_cache(args)
+    if args.profile:
+        metrics= ConversionMetrics()
+    else:
+        metrics= None
+    to_file_from_form_file(args.infile, args.outfile, _form_format(args), args.stream, syntax_cache, metrics
+                           , **_import_options(args))
+    args.infile.close()
+    args.outfile.close()
+    
+    if args.cache_stats and syntax_cache != None:
+        sys.stderr.write(syntax_cache.stats_message() + '\n')
+    if metrics != None:
+        sys.stderr.write(metrics.summary() + '\n')
+    
+    return 0
+
+
+def _outfile_path(parser, args, option):
+    '''
+    Close "outfile" (opened by argparse for writing text) and return its 
+    path, for output written by path instead.
+    
+    :param str option: The command line option that needs the path, for the error message.
+    :returns: The path of "outfile".
+    :rtype: str
+    '''
+    
+    if args.outfile is sys.stdout:
+        parser.error('"%s" writes its output by file name, so "outfile" can\'t be "-".' % option)
+    outfile_path= args.outfile.name
+    args.outfile.close()
+    return outfile_path
+
+
+def _form_format(args):
+    '''
+    :returns: The form format requested by the command line options.
+    :rtype: str
+    '''
+    
+    if args.xml:
+        return 'xml'
+    if args.xls:
+        return 'xls'
+    if args.from_snapshot:
+        return 'snapshot'
+    return 'json'
+
+
+def _output_formats(parser, args):
+    '''
+    :returns: The output formats requested by the command line options, or ``None`` for just SPSS syntax.
+    :rtype: list(str)
+    '''
+    
+    from exporters import exporter_names
+    
+    if args.format == None and not args.snapshot:
+        return None
+    output_formats= list()
+    for output_format in (args.format or 'sps').split(','):
+        output_format= output_format.strip()
+        if output_format in output_formats or output_format == '':
+            continue
+        if output_format not in exporter_names():
+            parser.error('Unknown output format "%s"; expected one of %s.' % (output_format, ', '.join(exporter_names())))
+        output_formats.append(output_format)
+    if args.snapshot and 'snapshot' not in output_formats:
+        output_formats.append('snapshot')
+    if output_formats == ['sps']:
+        return None
+    return output_formats
+
+
+def _format_paths(outfile_path, output_formats):
+    '''
+    :returns: The path of each output format's file: "outfile" itself for a single format, or else "outfile" with each format's extension.
+    :rtype: dict(str, str)
+    '''
+    
+    from exporters import get_exporter
+    
+    if len(output_formats) == 1:
+        return {output_formats[0]: outfile_path}
+    outfile_root= os.path.splitext(outfile_path)[0]
+    return dict((output_format, outfile_root + get_exporter(output_format).extension)
+                for output_format in output_formats)
+
+
+def _import_options(args):
+    '''
+    :returns: The keyword arguments for the import methods of :py:class:`VariableMetadata` requested by the command line options.
+    :rtype: dict
+    '''
+    
+    import_options= {'value_order': args.value_order}
+    languages= _languages(args)
+    if languages != None and len(languages) == 1 and languages[0] != None:
+        import_options['language']= languages[0]
+    return import_options
+
+
+def _languages(args):
+    '''
+    :returns: The languages requested by the command line options: ``None`` for all of the form's languages, or a list.
+    :rtype: list(str)
+    '''
+    
+    if args.language == None:
+        return [None]
+    if 'all' in args.language:
+        return None
+    return args.language
+
+
+def _language_syntax_path(syntax_path, language):
+    '''
+    :returns: The path of a language's syntax file, e.g. "syntax.English.sps" for "syntax.sps".
+    :rtype: str
+    '''
+    
+    if language == None:
+        return syntax_path
+    syntax_path_root, syntax_path_ext= os.path.splitext(syntax_path)
+    return syntax_path_root + '.' + re.sub(r'[^\w-]+', '_', language) + syntax_path_ext
+
+
+def _make_cache(args):
+    '''
+    :returns: The cache requested by the command line options, if any.
+    :rtype: :py:class:`SyntaxCache`
+    '''
+    
+    if args.cache_dir == None:
+        return None
+    from cache import SyntaxCache
+    return SyntaxCache(args.cache_dir, int(args.cache_size * 1024 * 1024))
+
+
+
+def _main_diff(parser, args):
+    '''
+    Carry out a "--diff" conversion, reporting a summary of the changes to 
+    stderr.
+    
+    :returns: The process exit status.
+    :rtype: int
+    '''
+    
+    import form_diff
+    
+    old_variable_metadata_list= list(_iter_import_form_file(args.diff, _form_format(args), args.stream
+                                                            , **_import_options(args)))
+    args.diff.close()
+    new_variable_metadata_list= list(_iter_import_form_file(args.infile, _form_format(args), args.stream
+                                                            , **_import_options(args)))
     args.infile.close()
     
-    spss_syntax_text= from_json(json_form_text)
-    args.outfile.write(spss_syntax_text)
+    metadata_diff= form_diff.diff_metadata(old_variable_metadata_list, new_variable_metadata_list)
+    if args.delta:
+        form_diff.write_delta_spss_syntax(new_variable_metadata_list, metadata_diff, args.outfile
+                                          , _import_options(args))
+    else:
+        if args.old_syntax:
+            try:
+                # Lines generated with another language or value order can't be reused.
+                old_syntax_index= form_diff.index_spss_syntax(args.old_syntax, _import_options(args))
+            except ValueError as e:
+                parser.error('"--old-syntax": %s' % e)
+            args.old_syntax.close()
+        else:
+            old_syntax_index= None
+        form_diff.write_updated_spss_syntax(new_variable_metadata_list, metadata_diff, old_syntax_index, args.outfile
+                                            , _import_options(args))
     args.outfile.close()
+    
+    sys.stderr.write(metadata_diff.summary() + '\n')
+    return 0
+
+
+def _main_sav(parser, args):
+    '''
+    Carry out a conversion to an SPSS system file.
+    
+    :returns: The process exit status.
+    :rtype: int
+    '''
+    
+    languages= _languages(args)
+    if languages == None or len(languages) > 1:
+        parser.error('"--sav" only applies to a single language.')
+    if args.cache_dir:
+        parser.error('"--cache-dir" only applies to syntax output.')
+    
+    if args.profile:
+        metrics= ConversionMetrics()
+    else:
+        metrics= None
+    if args.outfile is sys.stdout:
+        # Without seeking, the header's case count is left unknown.
+        to_sav_file_from_form_file(args.infile, sys.stdout, _form_format(args), args.data, args.stream, metrics
+                                   , **_import_options(args))
+    else:
+        # The output file was opened for text.
+        with open(_outfile_path(parser, args, '--sav'), 'wb') as sav_file:
+            to_sav_file_from_form_file(args.infile, sav_file, _form_format(args), args.data, args.stream, metrics
+                                       , **_import_options(args))
+    args.infile.close()
+    if args.data:
+        args.data.close()
+    
+    if metrics != None:
+        sys.stderr.write(metrics.summary() + '\n')
+    return 0
+
+
+def _main_formats(parser, args, output_formats):
+    '''
+    Carry out a conversion to one or more output formats other than just 
+    SPSS syntax, parsing the form only once.
+    
+    :returns: The process exit status.
+    :rtype: int
+    '''
+    
+    languages= _languages(args)
+    if languages == None or len(languages) > 1:
+        parser.error('"--format" only applies to a single language.')
+    if args.cache_dir:
+        parser.error('"--cache-dir" only applies to SPSS syntax output.')
+    
+    outfile_path= _outfile_path(parser, args, '--format')
+    paths_by_format= _format_paths(outfile_path, output_formats)
+    if outfile_path not in paths_by_format.values():
+        os.remove(outfile_path)
+    if args.profile:
+        metrics= ConversionMetrics()
+    else:
+        metrics= None
+    to_files_from_form_file(args.infile, paths_by_format, _form_format(args), args.stream, args.jobs, metrics
+                            , **_import_options(args))
+    args.infile.close()
+    
+    if metrics != None:
+        sys.stderr.write(metrics.summary() + '\n')
+    return 0
+
+
+def _main_repeats(parser, args):
+    '''
+    Carry out a conversion to a syntax file per repeat table, parsing the 
+    form only once.
+    
+    :returns: The process exit status.
+    :rtype: int
+    '''
+    
+    if _form_format(args) != 'json' or args.stream:
+        parser.error('"--repeats" only applies to a JSON form read without "--stream".')
+    languages= _languages(args)
+    if languages == None or len(languages) > 1:
+        parser.error('"--repeats" only applies to a single language.')
+    if args.cache_dir:
+        parser.error('"--cache-dir" doesn\'t apply to "--repeats".')
+    
+    syntax_path= _outfile_path(parser, args, '--repeats')
+    json_text= args.infile.read()
+    args.infile.close()
+    if args.profile:
+        metrics= ConversionMetrics()
+    else:
+        metrics= None
+    to_repeat_files_from_json(json_text, syntax_path, args.jobs, metrics, **_import_options(args))
+    
+    if metrics != None:
+        sys.stderr.write(metrics.summary() + '\n')
+    return 0
+
+
+def _main_label_csv(parser, args):
+    '''
+    Carry out a "--label-csv" conversion, reporting what was found to 
+    stderr.
+    
+    :returns: The process exit status: non-zero if validation found codes that aren't among the choices.
+    :rtype: int
+    '''
+    
+    languages= _languages(args)
+    if languages == None or len(languages) > 1:
+        parser.error('"--label-csv" only applies to a single language.')
+    
+    if args.outfile is sys.stdout:
+        report= label_csv_from_form_file(args.infile, args.label_csv, sys.stdout, _form_format(args), args.label_mode
+                                         , args.stream, **_import_options(args))
+    else:
+        # The CSV module wants binary files.
+        with open(_outfile_path(parser, args, '--label-csv'), 'wb') as csv_out:
+            report= label_csv_from_form_file(args.infile, args.label_csv, csv_out, _form_format(args)
+                                             , args.label_mode, args.stream, **_import_options(args))
+    args.infile.close()
+    args.label_csv.close()
+    
+    sys.stderr.write(report.summary() + '\n')
+    if args.label_mode == 'validate' and report.invalid_count != 0:
+        return 1
+    return 0
+
+
+def _main_languages(parser, args):
+    '''
+    Carry out a conversion to several languages' syntax files, parsing the 
+    form only once.
+    
+    :returns: The process exit status.
+    :rtype: int
+    '''
+    
+    if _form_format(args) != 'json' or args.stream:
+        parser.error('Several languages can only be converted at once from a JSON form read without "--stream".')
+    if args.profile or args.cache_dir:
+        parser.error('"--profile" and "--cache-dir" only apply to the conversion of a single language.')
+    
+    # Each language gets a file of its own instead.
+    syntax_path= _outfile_path(parser, args, '--language')
+    os.remove(syntax_path)
+    json_text= args.infile.read()
+    args.infile.close()
+    
+    translations= from_json_translations(json_text, _languages(args), args.value_order)
+    for language, spss_syntax_string in translations.iteritems():
+        with open(_language_syntax_path(syntax_path, language), 'w') as syntax_file:
+            syntax_file.write(spss_syntax_string)
+    
+    return 0
+
+
+def _main_batch(args):
+    '''
+    Carry out a "--batch" conversion, reporting each failed form to stderr.
+    
+    :returns: The process exit status: non-zero if any form failed to convert.
+    :rtype: int
+    '''
+    
+    import batch
+    
+    in_dir, out_dir= args.batch
+    syntax_cache= _make_cache(args)
+    try:
+        results= batch.convert_directory(in_dir, out_dir, args.jobs, args.stream, syntax_cache
+                                         , **_import_options(args))
+    except ValueError as e:
+        # Forms that would overwrite each other's syntax.
+        sys.stderr.write('%s\n' % e)
+        return 1
+    
+    failed_results= [result for result in results if result.error != None]
+    for result in failed_results:
+        sys.stderr.write('Failed to convert "%s":\n%s\n' % (result.form_path, result.error))
+    sys.stderr.write('Converted %d of %d forms.\n' % (len(results) - len(failed_results), len(results)))
+    if args.cache_stats and syntax_cache != None:
+        sys.stderr.write(syntax_cache.stats_message() + '\n')
+    
+    if len(failed_results) != 0:
+        return 1
+    return 0
 
 
 if __name__ == "__main__":
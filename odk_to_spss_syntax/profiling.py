@@ -0,0 +1,202 @@
+'''
+Created on Oct 18, 2026
+
+Instrumentation of the conversion pipeline: per-stage timers and counters
+that the conversion functions of :py:mod:`main` fill in, and hooks through
+which embedding applications can forward them to their own monitoring.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+from contextlib import contextmanager
+import time
+
+
+__all__= ['STAGES', 'ConversionMetrics', 'NULL_METRICS', 'add_metrics_callback', 'remove_metrics_callback'
+          , 'start_metrics']
+
+# The pipeline stages, in pipeline order: parsing the form text, walking the
+#   parsed form, scanning "calculate" expressions and writing the syntax.
+STAGES= ('parse', 'import', 'calculate', 'export')
+
+# Callbacks to pass every finished :py:class:`ConversionMetrics` to.
+_metrics_callbacks= list()
+
+
+def add_metrics_callback(callback):
+    '''
+    Have every conversion report its metrics, even when the caller didn't
+    ask for them.
+
+    :param callback: A function to call with the :py:class:`ConversionMetrics` of each finished conversion.
+    '''
+
+    _metrics_callbacks.append(callback)
+
+
+def remove_metrics_callback(callback):
+    '''
+    Undo :py:func:`add_metrics_callback`.
+
+    :param callback: A function previously added.
+    '''
+
+    _metrics_callbacks.remove(callback)
+
+
+class ConversionMetrics(object):
+    '''
+    The time spent in each stage of a conversion and counts of what it
+    processed (e.g. "variables", "groups", "choices", "bytes_in",
+    "bytes_out"). Stage times are exclusive: time spent in a stage that is
+    entered from within another (e.g. "calculate" within "import") is only
+    counted toward the inner stage, so the stage times add up to the total.
+
+    :param callback: A function to call with the metrics once the conversion has finished.
+    '''
+
+    def __init__(self, callback=None):
+        self.callback= callback
+        # Stage -> seconds.
+        self.timings= dict()
+        # Counter name -> count.
+        self.counters= dict()
+        self._stage_stack= list()
+
+    def add_time(self, stage, seconds):
+        self.timings[stage]= self.timings.get(stage, 0.) + seconds
+
+    def count(self, counter, amount=1):
+        self.counters[counter]= self.counters.get(counter, 0) + amount
+
+    @contextmanager
+    def timer(self, stage):
+        '''Context manager that times the enclosed code as part of ``stage``.'''
+        self._stage_stack.append(stage)
+        start_time= time.time()
+        try:
+            yield
+        finally:
+            elapsed_seconds= time.time() - start_time
+            self._stage_stack.pop()
+            self.add_time(stage, elapsed_seconds)
+            if len(self._stage_stack) != 0:
+                # Keep the enclosing stage's time exclusive of this one.
+                self.add_time(self._stage_stack[-1], -elapsed_seconds)
+
+    def timed_iter(self, stage, iterable):
+        '''
+        Time the production of each item of an iterable (e.g. a generator
+        that imports lazily) as part of ``stage``.
+
+        :rtype: generator
+        '''
+
+        iterator= iter(iterable)
+        while True:
+            with self.timer(stage):
+                try:
+                    item= next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def counting_writer(self, fileobj, counter='bytes_out'):
+        '''
+        :returns: A wrapper around a writable file-like object that counts the bytes written to it.
+        '''
+
+        return _CountingWriter(fileobj, self, counter)
+
+    def finish(self):
+        '''Hand the metrics to the callback and to those added with :py:func:`add_metrics_callback`.'''
+        if self.callback != None:
+            self.callback(self)
+        for callback in list(_metrics_callbacks):
+            callback(self)
+
+    def total_time(self):
+        return sum(self.timings.itervalues())
+
+    def summary(self):
+        '''
+        :returns: A breakdown of the stage times and the counters.
+        :rtype: str
+        '''
+
+        total_seconds= self.total_time()
+        lines= ['Stage breakdown:']
+        stages= [stage for stage in STAGES if stage in self.timings]
+        stages.extend(sorted(stage for stage in self.timings if stage not in STAGES))
+        for stage in stages:
+            seconds= self.timings[stage]
+            if total_seconds > 0:
+                share= 100. * seconds / total_seconds
+            else:
+                share= 0.
+            lines.append('  %-12s %10.4f s %6.1f%%' % (stage, seconds, share))
+        lines.append('  %-12s %10.4f s' % ('total', total_seconds))
+        if len(self.counters) != 0:
+            lines.append('Counters: ' + ', '.join('%s=%d' % counter_pair
+                                                  for counter_pair in sorted(self.counters.iteritems())))
+        return '\n'.join(lines)
+
+
+class _NullMetrics(ConversionMetrics):
+    '''Stands in when no metrics are being collected, doing as little as possible.'''
+
+    def add_time(self, stage, seconds):
+        pass
+
+    def count(self, counter, amount=1):
+        pass
+
+    @contextmanager
+    def timer(self, stage):
+        yield
+
+    def timed_iter(self, stage, iterable):
+        return iterable
+
+    def counting_writer(self, fileobj, counter='bytes_out'):
+        return fileobj
+
+    def finish(self):
+        pass
+
+
+NULL_METRICS= _NullMetrics()
+
+
+def start_metrics(metrics):
+    '''
+    :param metrics: The metrics a caller asked to be collected, if any.
+    :type metrics: :py:class:`ConversionMetrics`
+    :returns: The metrics to collect for a conversion: ``metrics`` itself, fresh metrics if callbacks have been added with :py:func:`add_metrics_callback`, or else :py:data:`NULL_METRICS`.
+    :rtype: :py:class:`ConversionMetrics`
+    '''
+
+    if metrics != None:
+        return metrics
+    if len(_metrics_callbacks) != 0:
+        return ConversionMetrics()
+    return NULL_METRICS
+
+
+class _CountingWriter(object):
+    '''Delegates to a file-like object, counting the bytes written.'''
+
+    def __init__(self, fileobj, metrics, counter):
+        self._fileobj= fileobj
+        self._metrics= metrics
+        self._counter= counter
+
+    def write(self, text):
+        if isinstance(text, unicode):
+            self._metrics.count(self._counter, len(text.encode('utf-8')))
+        else:
+            self._metrics.count(self._counter, len(text))
+        self._fileobj.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._fileobj, name)
@@ -0,0 +1,403 @@
+'''
+Created on Oct 18, 2026
+
+Writes variable metadata directly to an SPSS system (".sav") file, so that
+labels needn't be applied by running syntax in SPSS: the file's dictionary
+(variable records with their labels, value label records and the extension
+records naming the variables and their encoding) and, optionally, the cases
+of a CSV export of the form's data.
+
+Variables whose value names are all numbers are written as numeric
+variables; all others as strings. Records are built with :py:mod:`struct`
+and written through a buffer in a single pass; only the number of cases is
+filled in afterward, when the file is seekable (it is otherwise left as
+"unknown", which SPSS accepts).
+
+See the PSPP documentation of the system file format for the layout of the
+records.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import csv
+import re
+import struct
+import time
+
+from spss_labels import VALUE_LABEL_MAX_BYTES, truncate_utf8, spss_variable_name, unique_variable_name
+from variable_metadata import _is_seekable
+from data_labels import column_names
+
+
+__all__= ['write_sav', 'iter_csv_data_rows', 'DEFAULT_STRING_WIDTH']
+
+# The width of string variables whose values aren't constrained by a choice list.
+DEFAULT_STRING_WIDTH= 255
+# The widest string variable that doesn't need "very long string" records.
+MAX_STRING_WIDTH= 255
+# The longest variable label SPSS reads, in bytes.
+SAV_VARIABLE_LABEL_MAX_BYTES= 255
+# The number of bytes to collect before writing them to the file.
+BUFFER_SIZE= 64 * 1024
+
+_PRODUCT_NAME= '@(#) SPSS DATA FILE odk_to_spss_syntax'
+# Offset of the header's case count, filled in once the cases are written.
+_CASE_COUNT_OFFSET= 80
+# The system-missing value (the most negative double), and the largest and
+#   second most negative doubles, as SPSS expects them.
+_SYSMIS= -1.7976931348623157e+308
+_HIGHEST= 1.7976931348623157e+308
+_LOWEST= struct.unpack('<d', struct.pack('<Q', 0xffeffffffffffffe))[0]
+_UTF8_CODE_PAGE= 65001
+# The header's creation date is always in English, whatever the locale.
+_MONTH_ABBREVIATIONS= ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+# Print and write format types.
+_FORMAT_A= 1
+_FORMAT_F= 5
+_NUMERIC_WIDTH= 8
+
+# Value names that are numbers (but not e.g. "nan" or "1e3", which are likelier codes).
+_NUMBER_RE= re.compile(r'^[-+]?(?:\d+\.?\d*|\.\d+)$')
+_SHORT_NAME_INVALID_CHARACTER_RE= re.compile(r'[^A-Za-z0-9_.@#$]')
+_RESERVED_NAMES= frozenset(['ALL', 'AND', 'BY', 'EQ', 'GE', 'GT', 'LE', 'LT', 'NE', 'NOT', 'OR', 'TO', 'WITH'])
+
+
+class _SavVariable(object):
+    '''The system file layout of a variable: its type, names and place in each case.'''
+
+    __slots__= ('variable_metadata', 'short_name', 'long_name', 'width', 'decimals', 'dictionary_index')
+
+    def __init__(self, variable_metadata, short_name, long_name, width, decimals, dictionary_index):
+        self.variable_metadata= variable_metadata
+        self.short_name= short_name
+        # The variable's name made legal (so it can't break the records 
+        #   listing "short=long" pairs) and unique.
+        self.long_name= long_name
+        # 0 for numeric variables, the string length for strings.
+        self.width= width
+        self.decimals= decimals
+        # The 1-based position of the variable's first record.
+        self.dictionary_index= dictionary_index
+
+    @property
+    def segment_count(self):
+        '''The number of 8-byte pieces of each case the variable takes up.'''
+        if self.width == 0:
+            return 1
+        return (self.width + 7) // 8
+
+    def print_format(self):
+        if self.width == 0:
+            return (_FORMAT_F << 16) | ((_NUMERIC_WIDTH + self.decimals) << 8) | self.decimals
+        return (_FORMAT_A << 16) | (self.width << 8)
+
+
+class _BufferedWriter(object):
+    '''Collects pieces of a file and writes them in large blocks.'''
+
+    def __init__(self, fileobj, buffer_size=BUFFER_SIZE):
+        self._fileobj= fileobj
+        self._buffer_size= buffer_size
+        self._pieces= list()
+        self._size= 0
+
+    def write(self, data):
+        self._pieces.append(data)
+        self._size+= len(data)
+        if self._size >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        if len(self._pieces) != 0:
+            self._fileobj.write(''.join(self._pieces))
+            self._pieces= list()
+            self._size= 0
+
+
+def _encode(text):
+    '''
+    :returns: ``text`` as UTF-8-encoded bytes (empty for ``None``).
+    :rtype: str
+    '''
+
+    if text == None:
+        return ''
+    if isinstance(text, unicode):
+        return text.encode('utf-8')
+    return str(text)
+
+
+def _pad(data, multiple, padding=' '):
+    '''Pad ``data`` up to a multiple of ``multiple`` bytes.'''
+    return data + padding * (-len(data) % multiple)
+
+
+def _parse_number(value_name):
+    '''
+    :returns: The number a value name represents, or ``None`` if it isn't numeric.
+    :rtype: float
+    '''
+
+    if value_name == None or not _NUMBER_RE.match(value_name.strip()):
+        return None
+    return float(value_name)
+
+
+def _variable_type(variable_metadata, string_width):
+    '''
+    :returns: The width (0 for numeric) and number of decimal places of a variable.
+    :rtype: tuple(int, int)
+    '''
+
+    value_mappings= variable_metadata.value_mappings
+    if value_mappings == None or len(value_mappings) == 0:
+        return string_width, 0
+    value_names= [_encode(value_name) for value_name in value_mappings]
+    if all(_parse_number(value_name) != None for value_name in value_names):
+        decimals= max(len(value_name.partition('.')[2]) for value_name in value_names)
+        return 0, min(decimals, 16)
+    return min(max(len(value_name) for value_name in value_names), MAX_STRING_WIDTH), 0
+
+
+def _short_name(name, used_short_names):
+    '''
+    :returns: A unique name of at most 8 characters for a variable, as the system file's variable records require.
+    :rtype: str
+    '''
+
+    # Names may not end in ".".
+    short_name= _SHORT_NAME_INVALID_CHARACTER_RE.sub('_', _encode(name))[:8].upper().rstrip('.')
+    if (short_name == '' or not short_name[0].isalpha() or short_name in used_short_names
+        or short_name in _RESERVED_NAMES):
+        variable_number= len(used_short_names) + 1
+        short_name= 'V%d' % variable_number
+        while short_name in used_short_names:
+            variable_number+= 1
+            short_name= 'V%d' % variable_number
+    used_short_names.add(short_name)
+    return short_name
+
+
+def _layout_variables(variable_metadata_iter, string_width):
+    '''
+    :returns: The layout of each variable, and the number of 8-byte pieces in a case.
+    :rtype: tuple(list(:py:class:`_SavVariable`), int)
+    '''
+
+    sav_variables= list()
+    used_short_names= set()
+    used_long_names= set()
+    dictionary_index= 1
+    for variable_metadata in variable_metadata_iter:
+        width, decimals= _variable_type(variable_metadata, string_width)
+        long_name= unique_variable_name(spss_variable_name(variable_metadata.name), used_long_names)
+        sav_variable= _SavVariable(variable_metadata, _short_name(variable_metadata.name, used_short_names), long_name
+                                   , width, decimals, dictionary_index)
+        sav_variables.append(sav_variable)
+        dictionary_index+= sav_variable.segment_count
+    return sav_variables, dictionary_index - 1
+
+
+def _header_record(case_size, file_label):
+    creation_time= time.localtime()
+    creation_date= '%02d %s %02d' % (creation_time.tm_mday, _MONTH_ABBREVIATIONS[creation_time.tm_mon - 1]
+                                     , creation_time.tm_year % 100)
+    return struct.pack('<4s60s5id9s8s64s3x', '$FL2', _PRODUCT_NAME.ljust(60), 2, case_size, 0, 0, -1, 100.
+                       , creation_date, time.strftime('%H:%M:%S', creation_time)
+                       , _pad(truncate_utf8(_encode(file_label), 64), 64))
+
+
+def _variable_records(sav_variable):
+    '''
+    :returns: The variable record of a variable, followed by a continuation record for each further 8 bytes of a string.
+    :rtype: list(str)
+    '''
+
+    variable_metadata= sav_variable.variable_metadata
+    print_format= sav_variable.print_format()
+    label= _encode(variable_metadata.label if variable_metadata.label != None else variable_metadata.name)
+    label= truncate_utf8(label, SAV_VARIABLE_LABEL_MAX_BYTES)
+    records= [struct.pack('<6i8si', 2, sav_variable.width, 1, 0, print_format, print_format
+                          , sav_variable.short_name.ljust(8), len(label)) + _pad(label, 4)]
+    for _segment_number in range(sav_variable.segment_count - 1):
+        records.append(struct.pack('<6i8s', 2, -1, 0, 0, 0, 0, ' ' * 8))
+    return records
+
+
+def _encode_value(sav_variable, value_name):
+    ''':returns: A value as its 8 bytes in a value label record.'''
+    if sav_variable.width == 0:
+        return struct.pack('<d', _parse_number(value_name))
+    return _encode(value_name)[:8].ljust(8)
+
+
+def _value_label_records(sav_variables):
+    '''
+    :returns: A value label record, and the record of the variables it applies to, for each distinct set of value labels of the variables of up to 8 bytes. Variables that share a :py:class:`ValueMapping` share the record.
+    :rtype: list(str)
+    '''
+
+    # (value mappings, width) -> variables; widths must match to share labels.
+    shared_variables= dict()
+    ordered_keys= list()
+    for sav_variable in sav_variables:
+        value_mappings= sav_variable.variable_metadata.value_mappings
+        if value_mappings == None or len(value_mappings) == 0 or sav_variable.width > 8:
+            continue
+        key= (id(value_mappings), sav_variable.width)
+        if key not in shared_variables:
+            shared_variables[key]= list()
+            ordered_keys.append(key)
+        shared_variables[key].append(sav_variable)
+
+    records= list()
+    for key in ordered_keys:
+        variables= shared_variables[key]
+        value_mappings= variables[0].variable_metadata.value_mappings
+        label_pieces= [struct.pack('<2i', 3, len(value_mappings))]
+        for value_name, value_label in _value_pairs(value_mappings):
+            value_label= truncate_utf8(_encode(value_label), VALUE_LABEL_MAX_BYTES)
+            label_pieces.append(_encode_value(variables[0], value_name)
+                                + _pad(chr(len(value_label)) + value_label, 8))
+        records.append(''.join(label_pieces))
+        records.append(struct.pack('<2i', 4, len(variables))
+                       + ''.join(struct.pack('<i', sav_variable.dictionary_index) for sav_variable in variables))
+    return records
+
+
+def _value_pairs(value_mappings):
+    ''':returns: (value name, value label) pairs, in export order where there is one.'''
+    if hasattr(value_mappings, 'ordered_items'):
+        return value_mappings.ordered_items()
+    return sorted(value_mappings.iteritems())
+
+
+def _extension_record(subtype, size, data_items):
+    '''A type 7 record of ``data_items`` items of ``size`` bytes each, given already packed.'''
+    data= ''.join(data_items)
+    return struct.pack('<4i', 7, subtype, size, len(data) // size) + data
+
+
+def _extension_records(sav_variables):
+    records= [_extension_record(3, 4, [struct.pack('<8i', 1, 0, 0, -1, 1, 1, 2, _UTF8_CODE_PAGE)])
+              , _extension_record(4, 8, [struct.pack('<3d', _SYSMIS, _HIGHEST, _LOWEST)])]
+
+    long_names= '\t'.join(sav_variable.short_name + '=' + sav_variable.long_name for sav_variable in sav_variables)
+    if long_names:
+        records.append(_extension_record(13, 1, [long_names]))
+
+    # Value labels of strings longer than 8 bytes have a record of their own.
+    long_string_pieces= list()
+    for sav_variable in sav_variables:
+        value_mappings= sav_variable.variable_metadata.value_mappings
+        if value_mappings == None or len(value_mappings) == 0 or sav_variable.width <= 8:
+            continue
+        name= sav_variable.long_name
+        long_string_pieces.append(struct.pack('<i', len(name)) + name
+                                  + struct.pack('<2i', sav_variable.width, len(value_mappings)))
+        for value_name, value_label in _value_pairs(value_mappings):
+            value= truncate_utf8(_encode(value_name), sav_variable.width).ljust(sav_variable.width)
+            value_label= truncate_utf8(_encode(value_label), VALUE_LABEL_MAX_BYTES)
+            long_string_pieces.append(struct.pack('<i', len(value)) + value + struct.pack('<i', len(value_label))
+                                      + value_label)
+    if len(long_string_pieces) != 0:
+        records.append(_extension_record(21, 1, long_string_pieces))
+
+    records.append(_extension_record(20, 1, ['UTF-8']))
+    return records
+
+
+def _encode_case(sav_variables, data_row):
+    ''':returns: The bytes of a case, from a row of data keyed by variable name.'''
+    pieces= list()
+    for sav_variable in sav_variables:
+        value= data_row.get(sav_variable.variable_metadata.name)
+        if sav_variable.width == 0:
+            number= _parse_number(value)
+            pieces.append(struct.pack('<d', _SYSMIS if number == None else number))
+        else:
+            pieces.append(truncate_utf8(_encode(value), sav_variable.width).ljust(8 * sav_variable.segment_count))
+    return ''.join(pieces)
+
+
+def write_sav(variable_metadata_iter, sav_file, data_rows=None, string_width=DEFAULT_STRING_WIDTH, file_label=''):
+    '''
+    Write the metadata of a form's variables, and optionally their data, to
+    an SPSS system file.
+
+    :param variable_metadata_iter: The metadata to write.
+    :type variable_metadata_iter: iterable(:py:class:`odk_to_spss_syntax.variable_metadata.VariableMetadata`)
+    :param sav_file: A writable binary file-like object.
+    :param data_rows: If supplied, the cases to write, each a mapping from variable names to values as text (e.g. from :py:func:`iter_csv_data_rows`). Values missing from a row are written as blank (or system-missing).
+    :type data_rows: iterable(dict)
+    :param int string_width: The width of string variables without value labels; longer values are truncated.
+    :param str file_label: The file's label.
+    :returns: The number of variables and the number of cases written.
+    :rtype: tuple(int, int)
+    '''
+
+    if not 1 <= string_width <= MAX_STRING_WIDTH:
+        raise ValueError('String width must be between 1 and %d.' % MAX_STRING_WIDTH)
+
+    # The header gives the size of a case, so the layout must be known first.
+    sav_variables, case_size= _layout_variables(variable_metadata_iter, string_width)
+    start_position= sav_file.tell() if _is_seekable(sav_file) else None
+
+    writer= _BufferedWriter(sav_file)
+    writer.write(_header_record(case_size, file_label))
+    for sav_variable in sav_variables:
+        for record in _variable_records(sav_variable):
+            writer.write(record)
+    for record in _value_label_records(sav_variables):
+        writer.write(record)
+    for record in _extension_records(sav_variables):
+        writer.write(record)
+    writer.write(struct.pack('<2i', 999, 0))
+
+    case_count= 0
+    if data_rows != None:
+        for data_row in data_rows:
+            writer.write(_encode_case(sav_variables, data_row))
+            case_count+= 1
+    writer.flush()
+
+    if data_rows != None and start_position != None:
+        end_position= sav_file.tell()
+        sav_file.seek(start_position + _CASE_COUNT_OFFSET)
+        sav_file.write(struct.pack('<i', case_count))
+        sav_file.seek(end_position)
+
+    return len(sav_variables), case_count
+
+
+def iter_csv_data_rows(csv_file):
+    '''
+    Read the cases of a CSV export of a form's data (e.g. from ODK
+    Briefcase or Aggregate), keyed by variable name. Columns named after
+    the path of a question in a group (e.g. "group-question" or
+    "group/question") are also keyed by each of their shorter
+    :py:func:`~odk_to_spss_syntax.data_labels.column_names` (e.g. the
+    question's own name).
+
+    :param csv_file: A readable file-like object containing CSV text with a header row.
+    :rtype: generator(dict)
+    '''
+
+    reader= csv.reader(csv_file)
+    header= next(reader, None)
+    if header == None:
+        return
+    header_names= list()
+    for column_header in header:
+        names= [column_header]
+        for short_name in column_names(column_header)[1:]:
+            if short_name not in names and short_name not in header:
+                names.append(short_name)
+        header_names.append(names)
+
+    for row in reader:
+        data_row= dict()
+        for names, value in zip(header_names, row):
+            for name in names:
+                data_row.setdefault(name, value)
+        yield data_row
@@ -0,0 +1,418 @@
+#!/usr/bin/env python2.7
+# encoding: utf-8
+'''
+Created on Oct 18, 2026
+
+A long-running local HTTP service that converts forms to SPSS syntax, so
+that callers converting form after form (e.g. a survey platform on every
+form publish) don't pay for starting Python and importing the package each
+time. Conversions run in a pool of worker processes that are started (and
+warmed up) once, so requests are converted concurrently.
+
+Endpoints:
+
+* ``POST /convert``: the body is a JSON-formatted form; the response is its
+  syntax. The "value_order" and "language" query parameters are passed on
+  to :py:func:`odk_to_spss_syntax.main.from_json`.
+* ``POST /convert/dicts``: the body is a JSON object with
+  "variable_labels" and "value_labels" members, as for
+  :py:func:`odk_to_spss_syntax.main.from_dicts`.
+* ``GET /metrics``: request counts, throughput and latency percentiles, as
+  JSON.
+* ``GET /health``: "ok".
+
+Malformed requests and forms are answered with a 400, internal errors with
+a 500, and conversions that don't finish within the service's timeout (e.g.
+because a worker process died) with a 504.
+
+Usage::
+
+    odk_to_spss_syntax_service --port 8765 --jobs 4
+    curl --data-binary @my_odk_form.json http://127.0.0.1:8765/convert > my_odk_form_syntax.sps
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import argparse
+import BaseHTTPServer
+from collections import deque, OrderedDict
+import json
+import multiprocessing
+import SocketServer
+import sys
+import threading
+import time
+import urlparse
+
+from main import from_json, from_dicts
+from variable_metadata import VALUE_ORDERS, DEFAULT_VALUE_ORDER
+from cache import SyntaxCache
+from profiling import ConversionMetrics
+
+
+__all__= ['ServiceMetrics', 'ConversionTimeout', 'ConversionService', 'ConversionServer', 'make_server', 'serve']
+
+DEFAULT_HOST= '127.0.0.1'
+DEFAULT_PORT= 8765
+# The largest request body accepted, in bytes.
+MAX_REQUEST_SIZE= 64 * 1024 * 1024
+# How long to wait for a worker to convert a form, in seconds.
+DEFAULT_TIMEOUT= 300.
+# The number of most recent requests that latency percentiles are computed over.
+LATENCY_WINDOW= 1000
+LATENCY_PERCENTILES= (50, 90, 99)
+
+_WARM_UP_FORM_JSON= json.dumps({'name': 'warm_up', 'default_language': 'default', 'children': [
+    {'type': 'select one', 'name': 'q', 'label': 'Q', 'children': [{'name': '1', 'label': 'One'}]}]})
+
+# The cache of each worker process, if any.
+_worker_cache= None
+
+
+def _init_worker(cache_args):
+    '''Pool initializer: open the cache and run a conversion so the first request is as fast as the rest.'''
+    global _worker_cache
+    if cache_args != None:
+        _worker_cache= SyntaxCache(*cache_args)
+    from_json(_WARM_UP_FORM_JSON)
+
+
+def _convert_json_job(job):
+    json_text, import_options= job
+    metrics= ConversionMetrics()
+    spss_syntax_string= from_json(json_text, _worker_cache, metrics, **import_options)
+    return spss_syntax_string, metrics.timings
+
+
+def _convert_dicts_job(job):
+    variable_labels, value_labels, value_order= job
+    metrics= ConversionMetrics()
+    spss_syntax_string= from_dicts(variable_labels, value_labels, value_order, metrics)
+    return spss_syntax_string, metrics.timings
+
+
+def _percentile(sorted_values, percentile):
+    '''The nearest-rank percentile of a sorted, non-empty list.'''
+    rank= max(int(round(percentile / 100. * len(sorted_values))), 1)
+    return sorted_values[rank - 1]
+
+
+class ServiceMetrics(object):
+    '''
+    Thread-safe counts and timings of the requests a service has handled:
+    totals since it started (including the time spent in each stage of the
+    conversions, as reported by the workers' :py:class:`ConversionMetrics`),
+    and latencies (end to end, and of the conversion itself in a worker)
+    over the most recent :py:data:`LATENCY_WINDOW` requests.
+    '''
+
+    def __init__(self, latency_window=LATENCY_WINDOW):
+        self._lock= threading.Lock()
+        self.start_time= time.time()
+        self.requests= 0
+        self.errors= 0
+        self.bytes_in= 0
+        self.bytes_out= 0
+        # Stage -> seconds, summed over all conversions.
+        self.stage_seconds= dict()
+        # (finish time, latency, conversion time) of the most recent requests.
+        self._recent= deque(maxlen=latency_window)
+
+    def record(self, latency_seconds, stage_timings=None, bytes_in=0, bytes_out=0, error=False):
+        '''
+        Record a finished conversion request.
+
+        :param float latency_seconds: The time taken to handle the request.
+        :param dict stage_timings: The :py:attr:`ConversionMetrics.timings` of the conversion, if it happened.
+        '''
+
+        conversion_seconds= None
+        if stage_timings != None:
+            conversion_seconds= sum(stage_timings.itervalues())
+        with self._lock:
+            for stage, seconds in (stage_timings or dict()).iteritems():
+                self.stage_seconds[stage]= self.stage_seconds.get(stage, 0.) + seconds
+            self.requests+= 1
+            if error:
+                self.errors+= 1
+            self.bytes_in+= bytes_in
+            self.bytes_out+= bytes_out
+            self._recent.append((time.time(), latency_seconds, conversion_seconds))
+
+    def snapshot(self):
+        '''
+        :returns: The metrics so far, with latencies in milliseconds and throughputs in requests per second.
+        :rtype: dict
+        '''
+
+        with self._lock:
+            now= time.time()
+            recent= list(self._recent)
+            snapshot= {'uptime_seconds': now - self.start_time, 'requests': self.requests, 'errors': self.errors
+                       , 'bytes_in': self.bytes_in, 'bytes_out': self.bytes_out
+                       , 'stage_seconds': dict(self.stage_seconds)}
+        snapshot['throughput']= snapshot['requests'] / max(snapshot['uptime_seconds'], 1e-9)
+
+        if len(recent) != 0:
+            window_seconds= now - min(finish_time - latency for finish_time, latency, _conversion in recent)
+            snapshot['recent_throughput']= len(recent) / max(window_seconds, 1e-9)
+            for name, values in (('latency_ms', [latency for _finish_time, latency, _conversion in recent])
+                                 , ('conversion_ms', [conversion for _finish_time, _latency, conversion in recent
+                                                      if conversion != None])):
+                if len(values) == 0:
+                    continue
+                values.sort()
+                summary= {'mean': 1000. * sum(values) / len(values), 'max': 1000. * values[-1]}
+                for percentile in LATENCY_PERCENTILES:
+                    summary['p%d' % percentile]= 1000. * _percentile(values, percentile)
+                snapshot[name]= summary
+        return snapshot
+
+
+class ConversionTimeout(Exception):
+    '''A conversion didn't finish in time, e.g. because its worker process died.'''
+
+
+class ConversionService(object):
+    '''
+    Converts forms in a pool of warm worker processes.
+
+    :param int jobs: The number of worker processes. Defaults to the number of CPUs.
+    :param cache: If supplied, reuse syntax previously generated for unchanged forms.
+    :type cache: :py:class:`SyntaxCache`
+    :param float timeout: How long to wait for each conversion, in seconds.
+    '''
+
+    def __init__(self, jobs=None, cache=None, timeout=DEFAULT_TIMEOUT):
+        if cache == None:
+            cache_args= None
+        else:
+            cache_args= (cache.cache_dir, cache.max_size)
+        self._pool= multiprocessing.Pool(jobs, _init_worker, (cache_args,))
+        self.timeout= timeout
+
+    def _apply(self, job_function, job):
+        '''
+        Run a job in a worker, giving up after :py:attr:`timeout`: a pool 
+        never finishes a job whose worker died, so waiting without a 
+        timeout could block forever.
+        
+        :raises ConversionTimeout: If the job didn't finish in time.
+        '''
+        
+        try:
+            return self._pool.apply_async(job_function, (job,)).get(self.timeout)
+        except multiprocessing.TimeoutError:
+            raise ConversionTimeout('The conversion didn\'t finish within %g seconds.' % self.timeout)
+
+    def convert_json(self, json_text, **import_options):
+        '''
+        :returns: The syntax of a JSON-formatted form, and the time each stage of its conversion took in the worker.
+        :rtype: tuple(str, dict)
+        :raises ConversionTimeout: If the conversion didn't finish in time.
+        '''
+
+        return self._apply(_convert_json_job, (json_text, import_options))
+
+    def convert_dicts(self, variable_labels, value_labels, value_order=DEFAULT_VALUE_ORDER):
+        '''
+        :returns: The syntax for variable and value labels given as dictionaries, and the time each stage of its conversion took in the worker.
+        :rtype: tuple(str, dict)
+        :raises ConversionTimeout: If the conversion didn't finish in time.
+        '''
+
+        return self._apply(_convert_dicts_job, (variable_labels, value_labels, value_order))
+
+    def close(self):
+        '''Stop the worker processes.'''
+        self._pool.terminate()
+        self._pool.join()
+
+
+class _BadRequest(Exception):
+    '''A request the service can't handle, with the HTTP status to report.'''
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status= status
+
+
+class _ConversionRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    '''Handles a single HTTP request to a :py:class:`ConversionServer`.'''
+
+    server_version= 'odk_to_spss_syntax'
+    protocol_version= 'HTTP/1.1'
+
+    def do_GET(self):
+        path= urlparse.urlparse(self.path).path
+        if path == '/health':
+            self._respond(200, 'ok\n')
+        elif path == '/metrics':
+            self._respond(200, json.dumps(self.server.metrics.snapshot(), sort_keys=True) + '\n', 'application/json')
+        else:
+            self._respond(404, 'Not found.\n')
+
+    def do_POST(self):
+        start_time= time.time()
+        parsed_url= urlparse.urlparse(self.path)
+        body= ''
+        try:
+            body= self._read_body()
+            if parsed_url.path == '/convert':
+                spss_syntax_string, stage_timings= self.server.service.convert_json(
+                    body, **self._import_options(parsed_url.query))
+            elif parsed_url.path == '/convert/dicts':
+                try:
+                    # Keep the request's order of variables.
+                    labels_dict= json.loads(body, object_pairs_hook=OrderedDict)
+                    variable_labels= labels_dict['variable_labels']
+                    value_labels= labels_dict.get('value_labels', dict())
+                    variable_label_pairs= _encode_pairs(variable_labels)
+                    value_label_pairs= OrderedDict((_encode(variable_name), _encode_pairs(variable_value_labels))
+                                                   for variable_name, variable_value_labels in value_labels.iteritems())
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    raise _BadRequest(400, 'Expected a JSON object with "variable_labels" and "value_labels".')
+                spss_syntax_string, stage_timings= self.server.service.convert_dicts(
+                    variable_label_pairs, value_label_pairs
+                    , self._import_options(parsed_url.query).get('value_order', DEFAULT_VALUE_ORDER))
+            else:
+                raise _BadRequest(404, 'Not found.')
+        except _BadRequest as bad_request:
+            self._respond(bad_request.status, str(bad_request) + '\n')
+            self.server.metrics.record(time.time() - start_time, bytes_in=len(body), error=True)
+            return
+        except ConversionTimeout as timeout:
+            self._respond(504, str(timeout) + '\n')
+            self.server.metrics.record(time.time() - start_time, bytes_in=len(body), error=True)
+            return
+        except (ValueError, KeyError) as error:
+            # A malformed form, raised in the worker.
+            self._respond(400, 'Conversion failed: %s: %s\n' % (type(error).__name__, error))
+            self.server.metrics.record(time.time() - start_time, bytes_in=len(body), error=True)
+            return
+        except Exception as error:
+            self._respond(500, 'Internal error: %s: %s\n' % (type(error).__name__, error))
+            self.server.metrics.record(time.time() - start_time, bytes_in=len(body), error=True)
+            return
+
+        self._respond(200, spss_syntax_string)
+        self.server.metrics.record(time.time() - start_time, stage_timings, len(body), len(spss_syntax_string))
+
+    def _read_body(self):
+        try:
+            content_length= int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            raise _BadRequest(411, 'A "Content-Length" header is required.')
+        if content_length < 0:
+            raise _BadRequest(400, 'Invalid "Content-Length" header.')
+        if content_length > MAX_REQUEST_SIZE:
+            raise _BadRequest(413, 'Request bodies are limited to %d bytes.' % MAX_REQUEST_SIZE)
+        return self.rfile.read(content_length)
+
+    def _import_options(self, query):
+        import_options= dict()
+        for option, values in urlparse.parse_qs(query).iteritems():
+            if option == 'value_order':
+                if values[-1] not in VALUE_ORDERS:
+                    raise _BadRequest(400, '"value_order" must be one of %s.' % ', '.join(VALUE_ORDERS))
+                import_options['value_order']= values[-1]
+            elif option == 'language':
+                import_options['language']= values[-1].decode('utf-8')
+            else:
+                raise _BadRequest(400, 'Unknown parameter "%s".' % option)
+        return import_options
+
+    def _respond(self, status, body, content_type='text/plain; charset=utf-8'):
+        if isinstance(body, unicode):
+            body= body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format, *args)
+
+
+def _encode(text):
+    if isinstance(text, unicode):
+        return text.encode('utf-8')
+    return text
+
+
+def _encode_pairs(labels_dict):
+    '''UTF-8-encode a mapping of names to labels parsed from a JSON request, as (name, label) pairs.'''
+    return [(_encode(name), _encode(label)) for name, label in labels_dict.iteritems()]
+
+
+class ConversionServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    '''
+    An HTTP server that handles each request in a thread of its own, handing
+    the conversions to a :py:class:`ConversionService`.
+    '''
+
+    daemon_threads= True
+    allow_reuse_address= True
+
+    def __init__(self, server_address, service, verbose=False):
+        BaseHTTPServer.HTTPServer.__init__(self, server_address, _ConversionRequestHandler)
+        self.service= service
+        self.metrics= ServiceMetrics()
+        self.verbose= verbose
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, jobs=None, cache=None, verbose=False, timeout=DEFAULT_TIMEOUT):
+    '''
+    Start the worker processes and bind a server to an address, ready to
+    ``serve_forever()``.
+
+    :param str host: The address to listen on.
+    :param int port: The port to listen on (``0`` for any free port).
+    :param int jobs: The number of worker processes. Defaults to the number of CPUs.
+    :param cache: If supplied, reuse syntax previously generated for unchanged forms.
+    :type cache: :py:class:`SyntaxCache`
+    :param bool verbose: Whether to log each request to stderr.
+    :param float timeout: How long to wait for each conversion, in seconds.
+    :rtype: :py:class:`ConversionServer`
+    '''
+
+    return ConversionServer((host, port), ConversionService(jobs, cache, timeout), verbose)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, jobs=None, cache=None, verbose=False, timeout=DEFAULT_TIMEOUT):
+    '''Serve conversions until interrupted. See :py:func:`make_server`.'''
+    server= make_server(host, port, jobs, cache, verbose, timeout)
+    sys.stderr.write('Serving conversions on http://%s:%d/\n' % server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+
+
+def main(argv=None):
+    '''Command line options.'''
+    parser= argparse.ArgumentParser(description='Serve conversions of ODK forms to SPSS syntax over HTTP, from a pool of warm worker processes.')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='The address to listen on [default: %(default)s].')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='The port to listen on [default: %(default)d].')
+    parser.add_argument('-j', '--jobs', type=int, default=None
+                        , help='The number of worker processes [default: number of CPUs].')
+    parser.add_argument('--cache-dir', help='Reuse syntax previously generated for unchanged forms, cached in this directory.')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT
+                        , help='How long to wait for each conversion, in seconds [default: %(default)g].')
+    parser.add_argument('--verbose', action='store_true', help='Log each request to stderr.')
+    args= parser.parse_args(argv)
+
+    cache= None
+    if args.cache_dir:
+        cache= SyntaxCache(args.cache_dir)
+    serve(args.host, args.port, args.jobs, cache, args.verbose, args.timeout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
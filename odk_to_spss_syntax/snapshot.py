@@ -0,0 +1,275 @@
+'''
+Created on Oct 18, 2026
+
+A compact binary snapshot of a list of :py:class:`VariableMetadata`, so that
+tools converting the same form to several artifacts can reload its metadata
+without parsing the form again.
+
+A snapshot is laid out as (all integers little-endian, unsigned 32-bit)::
+
+    header     magic, format version, string count, mapping count,
+               variable count, and the offsets of the three sections below
+    strings    an index of (count + 1) offsets into the string data, then
+               the data: each distinct string once, as a type byte (0 for
+               str, 1 for unicode) followed by its UTF-8 encoding
+    mappings   an index of (count + 1) offsets into the mapping data, then
+               each distinct value mapping once: its value order's string
+               (or none, for a plain dict), its number of pairs and the
+               strings of each (value name, value label) pair, in export order
+    variables  a fixed-size record per variable: the strings of its name and
+               label and its mapping (or none)
+
+Loading a snapshot memory-maps the file and decodes nothing up front: each
+variable is decoded when it is first accessed, and each string and value
+mapping only once, so variables that shared a :py:class:`ValueMapping`
+still share one.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import mmap
+import struct
+
+from variable_metadata import VariableMetadata, ValueMapping
+
+
+__all__= ['SNAPSHOT_EXTENSION', 'Snapshot', 'dump_snapshot', 'load_snapshot']
+
+SNAPSHOT_EXTENSION= '.odksnap'
+MAGIC= 'ODKSNAP\0'
+FORMAT_VERSION= 1
+
+_HEADER= struct.Struct('<8s7I')
+_OFFSET= struct.Struct('<I')
+_MAPPING_HEADER= struct.Struct('<II')
+_VARIABLE= struct.Struct('<III')
+# Stands for a missing label or mapping.
+_NONE= 0xFFFFFFFF
+
+_STR_TYPE= '\0'
+_UNICODE_TYPE= '\1'
+
+
+def _encode_string(text):
+    if isinstance(text, unicode):
+        return _UNICODE_TYPE + text.encode('utf-8')
+    return _STR_TYPE + text
+
+
+def _pack_indexed(records):
+    ''':returns: An index of the records' offsets (with the end offset last), then the records.'''
+    offsets= [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+    return struct.pack('<%dI' % len(offsets), *offsets) + ''.join(records)
+
+
+def dump_snapshot(variable_metadata_iter, snapshot_file):
+    '''
+    Write a snapshot of the supplied metadata.
+
+    :param variable_metadata_iter: The metadata to write.
+    :type variable_metadata_iter: iterable(:py:class:`VariableMetadata`)
+    :param snapshot_file: A writable binary file-like object.
+    :returns: The number of variables written.
+    :rtype: int
+    '''
+
+    # Encoded string -> index in the string table.
+    string_indexes= dict()
+    strings= list()
+
+    def string_index(text):
+        if text == None:
+            return _NONE
+        encoded_string= _encode_string(text)
+        index= string_indexes.get(encoded_string)
+        if index == None:
+            index= string_indexes[encoded_string]= len(strings)
+            strings.append(encoded_string)
+        return index
+
+    # id(value mappings) -> index in the mapping table; the mappings
+    #   themselves are kept referenced so that their IDs stay unique.
+    mapping_indexes= dict()
+    mappings= list()
+    mapping_records= list()
+    variable_records= list()
+    for variable_metadata in variable_metadata_iter:
+        value_mappings= variable_metadata.value_mappings
+        if value_mappings == None:
+            mapping_index= _NONE
+        else:
+            mapping_index= mapping_indexes.get(id(value_mappings))
+            if mapping_index == None:
+                mapping_index= mapping_indexes[id(value_mappings)]= len(mappings)
+                mappings.append(value_mappings)
+                if isinstance(value_mappings, ValueMapping):
+                    value_order_index= string_index(value_mappings.value_order)
+                    value_pairs= value_mappings.ordered_items()
+                else:
+                    value_order_index= _NONE
+                    value_pairs= sorted(value_mappings.iteritems())
+                pair_indexes= [string_index(text) for value_pair in value_pairs for text in value_pair]
+                mapping_records.append(_MAPPING_HEADER.pack(value_order_index, len(value_pairs))
+                                       + struct.pack('<%dI' % len(pair_indexes), *pair_indexes))
+        variable_records.append(_VARIABLE.pack(string_index(variable_metadata.name)
+                                               , string_index(variable_metadata.label), mapping_index))
+
+    strings_section= _pack_indexed(strings)
+    mappings_section= _pack_indexed(mapping_records)
+    strings_offset= _HEADER.size
+    mappings_offset= strings_offset + len(strings_section)
+    variables_offset= mappings_offset + len(mappings_section)
+    snapshot_file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(strings), len(mapping_records), len(variable_records)
+                                     , strings_offset, mappings_offset, variables_offset))
+    snapshot_file.write(strings_section)
+    snapshot_file.write(mappings_section)
+    snapshot_file.write(''.join(variable_records))
+    return len(variable_records)
+
+
+class Snapshot(object):
+    '''
+    A read-only sequence of the :py:class:`VariableMetadata` in a snapshot,
+    decoded lazily from its buffer. Use as a context manager, or
+    :py:meth:`close` it, to release a memory-mapped file.
+
+    :param buf: The snapshot's bytes: a :py:class:`str` or :py:class:`mmap.mmap`.
+    :param variable_metadata_class: The class of metadata objects to create.
+    :raises ValueError: If ``buf`` isn't a snapshot of a supported version, or is truncated; a variable whose records are corrupt raises it when accessed.
+    '''
+
+    def __init__(self, buf, variable_metadata_class=VariableMetadata):
+        if len(buf) < _HEADER.size:
+            raise ValueError('Not a metadata snapshot (too short).')
+        (magic, format_version, string_count, mapping_count, variable_count, self._strings_offset
+         , self._mappings_offset, self._variables_offset)= _HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a metadata snapshot.')
+        if format_version != FORMAT_VERSION:
+            raise ValueError('Unsupported metadata snapshot version %d; expected %d.' % (format_version, FORMAT_VERSION))
+
+        # The sections must follow each other within the buffer, so that
+        #   decoding a record never reads past its section.
+        self._string_data_offset= self._strings_offset + _OFFSET.size * (string_count + 1)
+        self._mapping_data_offset= self._mappings_offset + _OFFSET.size * (mapping_count + 1)
+        variables_end= self._variables_offset + _VARIABLE.size * variable_count
+        if not (_HEADER.size <= self._strings_offset and self._string_data_offset <= self._mappings_offset
+                and self._mapping_data_offset <= self._variables_offset and variables_end <= len(buf)):
+            raise ValueError('Corrupt metadata snapshot (truncated or overlapping sections).')
+        self._string_data_end= self._string_data_offset + _OFFSET.unpack_from(buf, self._string_data_offset
+                                                                              - _OFFSET.size)[0]
+        self._mapping_data_end= self._mapping_data_offset + _OFFSET.unpack_from(buf, self._mapping_data_offset
+                                                                                - _OFFSET.size)[0]
+        if self._string_data_end > self._mappings_offset or self._mapping_data_end > self._variables_offset:
+            raise ValueError('Corrupt metadata snapshot (truncated section data).')
+
+        self._buf= buf
+        self._variable_metadata_class= variable_metadata_class
+        self._variable_count= variable_count
+        # Decoded on first use.
+        self._strings= [None] * string_count
+        self._mappings= [None] * mapping_count
+
+    def _string(self, index):
+        if index == _NONE:
+            return None
+        if index >= len(self._strings):
+            raise ValueError('Corrupt metadata snapshot (string %d of %d).' % (index, len(self._strings)))
+        text= self._strings[index]
+        if text == None:
+            start, end= struct.unpack_from('<2I', self._buf, self._strings_offset + _OFFSET.size * index)
+            if not start < end <= self._string_data_end - self._string_data_offset:
+                raise ValueError('Corrupt metadata snapshot (string %d).' % index)
+            encoded_string= self._buf[self._string_data_offset + start:self._string_data_offset + end]
+            text= encoded_string[1:]
+            if encoded_string[0] == _UNICODE_TYPE:
+                text= text.decode('utf-8')
+            self._strings[index]= text
+        return text
+
+    def _mapping(self, index):
+        if index == _NONE:
+            return None
+        if index >= len(self._mappings):
+            raise ValueError('Corrupt metadata snapshot (mapping %d of %d).' % (index, len(self._mappings)))
+        value_mappings= self._mappings[index]
+        if value_mappings == None:
+            mapping_offset= self._mapping_data_offset + _OFFSET.unpack_from(self._buf, self._mappings_offset
+                                                                            + _OFFSET.size * index)[0]
+            if mapping_offset + _MAPPING_HEADER.size > self._mapping_data_end:
+                raise ValueError('Corrupt metadata snapshot (mapping %d).' % index)
+            value_order_index, pair_count= _MAPPING_HEADER.unpack_from(self._buf, mapping_offset)
+            if mapping_offset + _MAPPING_HEADER.size + _OFFSET.size * 2 * pair_count > self._mapping_data_end:
+                raise ValueError('Corrupt metadata snapshot (mapping %d).' % index)
+            pair_indexes= struct.unpack_from('<%dI' % (2 * pair_count), self._buf, mapping_offset + _MAPPING_HEADER.size)
+            value_pairs= [(self._string(pair_indexes[pair_number]), self._string(pair_indexes[pair_number + 1]))
+                          for pair_number in xrange(0, 2 * pair_count, 2)]
+            if value_order_index == _NONE:
+                value_mappings= dict(value_pairs)
+            else:
+                value_mappings= ValueMapping.intern(value_pairs, self._string(value_order_index))
+            self._mappings[index]= value_mappings
+        return value_mappings
+
+    def __len__(self):
+        return self._variable_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[variable_index] for variable_index in xrange(*index.indices(self._variable_count))]
+        if index < 0:
+            index+= self._variable_count
+        if not 0 <= index < self._variable_count:
+            raise IndexError('Snapshot index out of range.')
+        name_index, label_index, mapping_index= _VARIABLE.unpack_from(self._buf, self._variables_offset
+                                                                      + _VARIABLE.size * index)
+        return self._variable_metadata_class(self._string(name_index), self._string(label_index)
+                                             , self._mapping(mapping_index))
+
+    def __iter__(self):
+        for index in xrange(self._variable_count):
+            yield self[index]
+
+    def close(self):
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_snapshot(snapshot_file, variable_metadata_class=VariableMetadata):
+    '''
+    Open a snapshot written by :py:func:`dump_snapshot`, memory-mapping it if
+    it's a file on disk.
+
+    :param snapshot_file: The path of a snapshot or a readable binary file-like object containing one.
+    :param variable_metadata_class: The class of metadata objects to create.
+    :rtype: :py:class:`Snapshot`
+    :raises ValueError: If the file isn't a snapshot of a supported version.
+    '''
+
+    if isinstance(snapshot_file, basestring):
+        with open(snapshot_file, 'rb') as f:
+            return _load_file(f, variable_metadata_class)
+    return _load_file(snapshot_file, variable_metadata_class)
+
+
+def _load_file(snapshot_file, variable_metadata_class):
+    try:
+        # The mapping stays valid after the file is closed.
+        buf= mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, IOError, ValueError, EnvironmentError):
+        # Not backed by a file (or an empty one).
+        buf= snapshot_file.read()
+    try:
+        return Snapshot(buf, variable_metadata_class)
+    except ValueError:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+        raise
@@ -0,0 +1,245 @@
+'''
+Created on Oct 18, 2026
+
+Formats labels as SPSS string literals that SPSS will accept: embedded
+quotes are escaped, line breaks flattened, labels truncated to SPSS's byte
+limits without splitting UTF-8 characters, and long literals continued over
+several lines. Generated variable names are made legal SPSS names too.
+Each distinct label is formatted only once and then served
+from a cache, and a shared :py:class:`ValueMapping`'s value labels are
+formatted only once for all the variables that use it.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import re
+
+
+__all__= ['VARIABLE_LABEL_MAX_BYTES', 'VALUE_LABEL_MAX_BYTES', 'LINE_MAX_BYTES', 'VARIABLE_NAME_MAX_BYTES'
+          , 'RESERVED_WORDS', 'truncate_utf8', 'spss_variable_name', 'unique_variable_name', 'spss_string_literal'
+          , 'format_value_labels']
+
+# SPSS's limits on the length of labels, in (UTF-8-encoded) bytes.
+VARIABLE_LABEL_MAX_BYTES= 256
+VALUE_LABEL_MAX_BYTES= 120
+# SPSS's limit on the length of a variable name, in (UTF-8-encoded) bytes.
+VARIABLE_NAME_MAX_BYTES= 64
+# Keywords that SPSS doesn't accept as variable names (in any case).
+RESERVED_WORDS= frozenset(['ALL', 'AND', 'BY', 'EQ', 'GE', 'GT', 'LE', 'LT', 'NE', 'NOT', 'OR', 'TO', 'WITH'])
+# SPSS's limit on the length of a syntax line, in bytes.
+LINE_MAX_BYTES= 256
+# The most (escaped) label bytes to put on a single line; with the variable
+#   name (at most 64 bytes) this keeps lines well within the limit.
+SEGMENT_MAX_BYTES= 120
+# Lines that continue a command are indented, as SPSS's batch syntax mode requires.
+CONTINUATION_INDENT= '  '
+# Where the value labels of a "VALUE LABELS" line start at the latest: after
+#   "/", the longest possible variable name and a space.
+_VALUE_LABELS_START_COLUMN= 1 + 64 + 1
+
+# Characters that need escaping or flattening.
+_SPECIAL_CHARACTER_RE= re.compile(r'["\r\n\t]')
+_LINE_BREAK_RE= re.compile(r'[\r\n\t]+')
+# Characters that may not appear in a variable name, but for non-ASCII 
+#   letters (see :py:func:`_name_character`).
+_NAME_INVALID_CHARACTER_RE= re.compile(u'[^A-Za-z0-9_.@#$]')
+
+# Name -> legal name.
+_name_cache= dict()
+# (label, byte limit) -> literal.
+_literal_cache= dict()
+_LITERAL_CACHE_MAX_SIZE= 65536
+
+
+def truncate_utf8(text, max_bytes):
+    '''
+    :param str text: UTF-8-encoded text.
+    :param int max_bytes: The most bytes to keep.
+    :returns: The longest prefix of ``text`` of at most ``max_bytes`` bytes that doesn't end part way through a character.
+    :rtype: str
+    '''
+
+    if len(text) <= max_bytes:
+        return text
+    end= max_bytes
+    # Back up over the continuation bytes (0b10xxxxxx) of a split character.
+    while end > 0 and (ord(text[end]) & 0xC0) == 0x80:
+        end-= 1
+    return text[:end]
+
+
+def _split_segments(text):
+    '''Split text so that each piece, once escaped, fits in :py:data:`SEGMENT_MAX_BYTES`.'''
+    segments= list()
+    segment_start= 0
+    escaped_size= 0
+    position= 0
+    while position < len(text):
+        byte= text[position]
+        if byte == '"':
+            character_size, character_escaped_size= 1, 2
+        else:
+            lead= ord(byte)
+            if lead < 0x80:
+                character_size= 1
+            elif lead >= 0xF0:
+                character_size= 4
+            elif lead >= 0xE0:
+                character_size= 3
+            else:
+                character_size= 2
+            character_escaped_size= character_size
+        if escaped_size + character_escaped_size > SEGMENT_MAX_BYTES:
+            segments.append(text[segment_start:position])
+            segment_start= position
+            escaped_size= 0
+        escaped_size+= character_escaped_size
+        position+= character_size
+    segments.append(text[segment_start:])
+    return segments
+
+
+def _name_character(match):
+    ''':returns: A character matched by :py:data:`_NAME_INVALID_CHARACTER_RE` if it's a (non-ASCII) letter, else "_".'''
+    character= match.group()
+    if character.isalpha():
+        return character
+    return u'_'
+
+
+def spss_variable_name(name):
+    '''
+    Make a generated name (e.g. a "select multiple" option's, or one 
+    prefixed with its group path) a legal SPSS variable name, as SPSS does 
+    with the column headers of the CSV files it imports: characters that 
+    aren't allowed (e.g. "/", "-" or non-ASCII punctuation and spaces; 
+    non-ASCII letters are) become "_", names that don't start with 
+    a letter or "@" get a "v" in front, names that are reserved words get a 
+    "_" after, and names are truncated to :py:data:`VARIABLE_NAME_MAX_BYTES` 
+    and may not end in ".".
+    
+    :param name: The name; UTF-8-encoded or :py:class:`unicode`.
+    :returns: The legal name, UTF-8-encoded.
+    :rtype: str
+    '''
+
+    legal_name= _name_cache.get(name)
+    if legal_name != None:
+        return legal_name
+
+    if isinstance(name, unicode):
+        legal_name= name
+    else:
+        legal_name= name.decode('utf-8', 'replace')
+    legal_name= _NAME_INVALID_CHARACTER_RE.sub(_name_character, legal_name)
+    if legal_name == u'' or not (legal_name[0].isalpha() or legal_name[0] == u'@'):
+        legal_name= u'v' + legal_name
+    legal_name= legal_name.encode('utf-8')
+    if legal_name.upper() in RESERVED_WORDS:
+        legal_name+= '_'
+    legal_name= truncate_utf8(legal_name, VARIABLE_NAME_MAX_BYTES).rstrip('.')
+
+    if len(_name_cache) >= _LITERAL_CACHE_MAX_SIZE:
+        _name_cache.clear()
+    _name_cache[name]= legal_name
+    return legal_name
+
+
+def unique_variable_name(name, used_names):
+    '''
+    Make a legal name unique among the names of a dataset's other 
+    variables, which SPSS compares regardless of case, by appending "_2", 
+    "_3", etc. (truncating the name to make room if need be).
+    
+    :param str name: A legal name, from :py:func:`spss_variable_name`.
+    :param set used_names: The upper-cased names already used; the name returned is added to it.
+    :returns: The unique name.
+    :rtype: str
+    '''
+
+    unique_name= name
+    name_number= 1
+    while unique_name.upper() in used_names:
+        name_number+= 1
+        name_suffix= '_%d' % name_number
+        unique_name= truncate_utf8(name, VARIABLE_NAME_MAX_BYTES - len(name_suffix)) + name_suffix
+    used_names.add(unique_name.upper())
+    return unique_name
+
+
+def spss_string_literal(text, max_bytes=VARIABLE_LABEL_MAX_BYTES):
+    '''
+    Quote a label for use in SPSS syntax.
+
+    :param text: The label; UTF-8-encoded or :py:class:`unicode`.
+    :param int max_bytes: The most UTF-8 bytes of the label to keep.
+    :returns: The label as one or more quoted segments joined by "+" over indented continuation lines, of the same type as ``text``.
+    :rtype: str
+    '''
+
+    # The common case: short and nothing to escape.
+    if (len(text) <= min(SEGMENT_MAX_BYTES, max_bytes) and isinstance(text, str)
+        and not _SPECIAL_CHARACTER_RE.search(text)):
+        return '"' + text + '"'
+
+    cache_key= (text, max_bytes)
+    literal= _literal_cache.get(cache_key)
+    if literal != None:
+        return literal
+
+    is_unicode= isinstance(text, unicode)
+    if is_unicode:
+        normalized_text= text.encode('utf-8')
+    else:
+        normalized_text= text
+    normalized_text= _LINE_BREAK_RE.sub(' ', normalized_text)
+    normalized_text= truncate_utf8(normalized_text, max_bytes)
+    literal= (' +\n' + CONTINUATION_INDENT).join('"' + segment.replace('"', '""') + '"'
+                                                   for segment in _split_segments(normalized_text))
+    if is_unicode:
+        literal= literal.decode('utf-8')
+
+    if len(_literal_cache) >= _LITERAL_CACHE_MAX_SIZE:
+        _literal_cache.clear()
+    _literal_cache[cache_key]= literal
+    return literal
+
+
+def format_value_labels(value_pairs):
+    '''
+    Format the value labels of a variable's "VALUE LABELS" line, starting
+    a continuation line whenever the line would grow too long. Lines are
+    broken as if the variable had the longest possible name, so the result
+    can be reused for any variable.
+
+    :param value_pairs: (value name, value label) pairs in export order.
+    :returns: The pairs as syntax, to follow "/<variable name> ".
+    :rtype: str
+    '''
+
+    parts= list()
+    # In bytes, as SPSS measures lines.
+    column= _VALUE_LABELS_START_COLUMN
+    for value_name, value_label in value_pairs:
+        pair_text= value_name + ' ' + spss_string_literal(value_label, VALUE_LABEL_MAX_BYTES)
+        if isinstance(pair_text, unicode):
+            pair_bytes= pair_text.encode('utf-8')
+        else:
+            pair_bytes= pair_text
+        first_line_end= pair_bytes.find('\n')
+        if first_line_end == -1:
+            first_line_end= len(pair_bytes)
+        if len(parts) != 0:
+            if column + 1 + first_line_end > LINE_MAX_BYTES:
+                parts.append('\n' + CONTINUATION_INDENT)
+                column= len(CONTINUATION_INDENT)
+            else:
+                parts.append(' ')
+                column+= 1
+        parts.append(pair_text)
+        last_line_start= pair_bytes.rfind('\n')
+        if last_line_start == -1:
+            column+= len(pair_bytes)
+        else:
+            column= len(pair_bytes) - last_line_start - 1
+    return ''.join(parts)
@@ -0,0 +1,103 @@
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from StringIO import StringIO
+
+from .. import batch
+from ..main import main
+from test_export_from_json import TestExportFromJson
+
+
+class TestBatch(TestExportFromJson):
+    '''
+    Test converting directories of forms, building on functionality from 
+    :py:class:`TestExportFromJson`.
+    '''
+    
+    def setUp(self):
+        '''Lay out a directory of forms, one of which is malformed.'''
+        super(TestBatch, self).setUp()
+        self.temp_dir= tempfile.mkdtemp()
+        self.in_dir= os.path.join(self.temp_dir, 'forms')
+        self.out_dir= os.path.join(self.temp_dir, 'syntax')
+        
+        os.makedirs(os.path.join(self.in_dir, 'nested'))
+        shutil.copy(self.test_form_path, os.path.join(self.in_dir, 'a.json'))
+        shutil.copy(self.test_form_path, os.path.join(self.in_dir, 'nested', 'b.json'))
+        with open(os.path.join(self.in_dir, 'broken.json'), 'w') as f:
+            f.write('{"children": [')
+        with open(os.path.join(self.in_dir, 'notes.txt'), 'w') as f:
+            f.write('Not a form.')
+    
+    def tearDown(self):
+        super(TestBatch, self).tearDown()
+        shutil.rmtree(self.temp_dir)
+    
+    def test_find_form_files(self):
+        '''Test that only form files are discovered.'''
+        self.assertEquals(batch.find_form_files(self.in_dir)
+                          , ['a.json', 'broken.json', os.path.join('nested', 'b.json')])
+    
+    def test_convert_directory(self):
+        '''Test that failures are reported without aborting the batch.'''
+        for jobs in [1, 2]:
+            results= batch.convert_directory(self.in_dir, self.out_dir, jobs)
+            
+            self.assertEquals(len(results), 3)
+            failed_results= [result for result in results if result.error != None]
+            self.assertEquals([os.path.basename(result.form_path) for result in failed_results], ['broken.json'])
+            self.assertFalse(os.path.exists(failed_results[0].syntax_path))
+            self.assert_syntax_files_correct()
+    
+    def test_colliding_form_names(self):
+        '''Test that forms whose names only differ by extension each get a syntax file of their own.'''
+        with open(os.path.join(self.in_dir, 'nested', 'b.xml'), 'w') as f:
+            f.write('<not a form')
+        self.assertEquals(batch.syntax_file_paths(batch.find_form_files(self.in_dir))
+                          , ['a.sps', 'broken.sps', os.path.join('nested', 'b.json.sps'), os.path.join('nested', 'b.xml.sps')])
+        self.assertRaises(ValueError, batch.syntax_file_paths, ['form.json', 'form.xml', 'form.json.xml'])
+        self.assertRaises(ValueError, batch.syntax_file_paths, ['form.json', 'FORM.JSON'])
+        
+        for jobs in [1, 3]:
+            results= batch.convert_directory(self.in_dir, self.out_dir, jobs)
+            
+            # The failure of "b.xml" leaves the syntax of "b.json" in place.
+            self.assertEquals([result.error == None for result in results], [True, False, True, False])
+            with open(self.test_syntax_path, 'r') as f:
+                canonical_spss_syntax= f.read()
+            for syntax_path in ['a.sps', os.path.join('nested', 'b.json.sps')]:
+                with open(os.path.join(self.out_dir, syntax_path), 'r') as f:
+                    self.assert_syntaxes_equivalent(f.read(), canonical_spss_syntax)
+            self.assertFalse(os.path.exists(os.path.join(self.out_dir, 'nested', 'b.xml.sps')))
+            shutil.rmtree(self.out_dir)
+    
+    def test_cli_batch(self):
+        '''Test the "--batch" command line option.'''
+        original_stderr= sys.stderr
+        sys.stderr= StringIO()
+        try:
+            exit_status= main(['--batch', self.in_dir, self.out_dir, '--jobs', '2'])
+            error_output= sys.stderr.getvalue()
+        finally:
+            sys.stderr= original_stderr
+        
+        self.assertEquals(exit_status, 1)
+        self.assertIn('broken.json', error_output)
+        self.assertIn('Converted 2 of 3 forms.', error_output)
+        self.assert_syntax_files_correct()
+    
+    def assert_syntax_files_correct(self):
+        '''Reusable check of the syntax files generated from the good forms.'''
+        with open(self.test_syntax_path, 'r') as f:
+            canonical_spss_syntax= f.read()
+        for syntax_path in ['a.sps', os.path.join('nested', 'b.sps')]:
+            with open(os.path.join(self.out_dir, syntax_path), 'r') as f:
+                self.assert_syntaxes_equivalent(f.read(), canonical_spss_syntax)
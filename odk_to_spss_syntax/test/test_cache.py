@@ -0,0 +1,92 @@
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from StringIO import StringIO
+
+from ..cache import SyntaxCache
+from ..main import from_json
+from ..main import main
+from test_export_from_json import TestExportFromJson
+
+
+class TestSyntaxCache(TestExportFromJson):
+    '''
+    Test caching generated syntax, building on functionality from 
+    :py:class:`TestExportFromJson`.
+    '''
+    
+    def setUp(self):
+        super(TestSyntaxCache, self).setUp()
+        self.cache_dir= tempfile.mkdtemp()
+        with open(self.test_form_path, 'r') as f:
+            self.form_text_json= f.read()
+    
+    def tearDown(self):
+        super(TestSyntaxCache, self).tearDown()
+        shutil.rmtree(self.cache_dir)
+    
+    def test_keys(self):
+        '''Test that keys depend on the form text and options.'''
+        cache= SyntaxCache(self.cache_dir)
+        key= cache.key(self.form_text_json)
+        self.assertEquals(key, cache.key(self.form_text_json))
+        self.assertEquals(key, cache.file_key(StringIO(self.form_text_json)))
+        self.assertNotEquals(key, cache.key(self.form_text_json + ' '))
+        self.assertNotEquals(key, cache.key(self.form_text_json, {'option': 1}))
+    
+    def test_from_json_cached(self):
+        '''Test that a second conversion of the same form is served from the cache.'''
+        cache= SyntaxCache(self.cache_dir)
+        first_syntax= from_json(self.form_text_json, cache)
+        second_syntax= from_json(self.form_text_json, cache)
+        
+        self.assertEquals((cache.hits, cache.misses), (1, 1))
+        self.assertEquals(first_syntax, second_syntax)
+        self.assertEquals(first_syntax, from_json(self.form_text_json))
+    
+    def test_lru_eviction(self):
+        '''Test that the least recently used entries are evicted first.'''
+        cache= SyntaxCache(self.cache_dir, max_size=250)
+        for i in range(3):
+            cache.put(cache.key(str(i)), 'x' * 100)
+            # Give each entry a distinct modification time.
+            os.utime(cache._entry_path(cache.key(str(i))), (i, i))
+        
+        # Entry "0" was evicted as the oldest.
+        self.assertEquals(cache.get(cache.key('0')), None)
+        self.assertEquals(cache.get(cache.key('1')), 'x' * 100)
+        self.assertEquals(cache.get(cache.key('2')), 'x' * 100)
+        
+        # Entry "1" was just used, so "2" is now the one to go.
+        os.utime(cache._entry_path(cache.key('2')), (0, 0))
+        cache.put(cache.key('3'), 'x' * 100)
+        self.assertEquals(cache.get(cache.key('2')), None)
+        self.assertEquals(cache.get(cache.key('1')), 'x' * 100)
+    
+    def test_cli_cache(self):
+        '''Test the cache command line options, with and without "--stream".'''
+        exported_syntax_file= os.path.join(self.cache_dir, 'exported.sps')
+        for cli_input in ['', '--stream ']:
+            for expected_stats in ['0 hits, 1 misses', '1 hits, 0 misses']:
+                argv= (cli_input + '--cache-stats --cache-dir ' + os.path.join(self.cache_dir, 'cache' + cli_input.strip())
+                       + ' ' + self.test_form_path + ' ' + exported_syntax_file).split(' ')
+                
+                original_stderr= sys.stderr
+                sys.stderr= StringIO()
+                try:
+                    main(argv)
+                    error_output= sys.stderr.getvalue()
+                finally:
+                    sys.stderr= original_stderr
+                
+                self.assertIn(expected_stats, error_output)
+                with open(exported_syntax_file, 'r') as f:
+                    self.assertEquals(f.read(), from_json(self.form_text_json))
@@ -0,0 +1,102 @@
+# encoding: utf-8
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import csv
+import os
+import sys
+import tempfile
+from StringIO import StringIO
+
+from ..variable_metadata import VariableMetadata
+from ..variable_metadata import ValueMapping
+from ..data_labels import match_columns, label_csv, MAX_INVALID_EXAMPLES
+from ..main import main
+
+
+class TestDataLabels(unittest.TestCase):
+    '''
+    Test labelling CSV exports of form submissions.
+    '''
+
+    def setUp(self):
+        yes_no= ValueMapping.intern([('0', 'No'), ('1', 'Oui, très')])
+        self.variable_metadata_list= [VariableMetadata('name', 'Name', None)
+                                      , VariableMetadata('q1', 'Question 1', yes_no)
+                                      , VariableMetadata('q2', 'Question 2', yes_no)]
+        self.csv_text= ('KEY,grp-name,grp/q1,q2\n'
+                        + 'uuid:1,Alice,1,0\n'
+                        + 'uuid:2,"Bob, Jr.",,7\n')
+
+    def read_rows(self, csv_text):
+        return list(csv.reader(StringIO(csv_text)))
+
+    def test_match_columns(self):
+        '''Test matching column headers with and without group prefixes.'''
+        self.assertEquals(match_columns(['KEY', 'grp-name', 'grp/q1', 'q2', 'a-b/q9'], ['name', 'q1', 'q2'])
+                          , [None, 'name', 'q1', 'q2', None])
+        # "select multiple" option columns.
+        self.assertEquals(match_columns(['grp-q1/red', 'q1/blue', 'grp-q1'], ['q1', 'q1_red', 'q1_blue'])
+                          , ['q1_red', 'q1_blue', 'q1'])
+
+    def test_replace(self):
+        '''Test replacing codes with labels, leaving blanks and unknown codes alone.'''
+        csv_out= StringIO()
+        report= label_csv(self.variable_metadata_list, StringIO(self.csv_text), csv_out)
+
+        self.assertEquals(self.read_rows(csv_out.getvalue())
+                          , [['KEY', 'grp-name', 'grp/q1', 'q2'], ['uuid:1', 'Alice', 'Oui, très', 'No']
+                             , ['uuid:2', 'Bob, Jr.', '', '7']])
+        self.assertEquals(report.rows, 2)
+        self.assertEquals(report.labelled_columns, {'grp/q1': 'q1', 'q2': 'q2'})
+        self.assertEquals(report.invalid_counts, {'q2': 1})
+        self.assertEquals(report.invalid_examples, [(2, 'q2', '7')])
+
+    def test_append(self):
+        '''Test adding a label column after each coded column.'''
+        csv_out= StringIO()
+        label_csv(self.variable_metadata_list, StringIO(self.csv_text), csv_out, 'append')
+
+        self.assertEquals(self.read_rows(csv_out.getvalue())[:2]
+                          , [['KEY', 'grp-name', 'grp/q1', 'grp/q1_label', 'q2', 'q2_label']
+                             , ['uuid:1', 'Alice', '1', 'Oui, très', '0', 'No']])
+
+    def test_validate(self):
+        '''Test listing the codes that aren't among the choices.'''
+        csv_out= StringIO()
+        csv_text= 'q1\n' + '9\n' * (MAX_INVALID_EXAMPLES + 1)
+        report= label_csv(self.variable_metadata_list, StringIO(csv_text), csv_out, 'validate')
+
+        invalid_rows= self.read_rows(csv_out.getvalue())
+        self.assertEquals(invalid_rows[0], ['row', 'column', 'code'])
+        self.assertEquals(len(invalid_rows), MAX_INVALID_EXAMPLES + 2)
+        self.assertEquals(report.invalid_count, MAX_INVALID_EXAMPLES + 1)
+        self.assertEquals(len(report.invalid_examples), MAX_INVALID_EXAMPLES)
+        self.assertRaises(ValueError, label_csv, self.variable_metadata_list, StringIO(csv_text), None, 'xyz')
+
+    def test_cli(self):
+        '''Test the "--label-csv" and "--label-mode" command line options.'''
+        module_dir= os.path.dirname(os.path.realpath(__file__))
+        form_path= os.path.join(module_dir, 'test_form.json')
+        data_path= tempfile.mktemp(suffix='.csv')
+        labelled_path= tempfile.mktemp(suffix='.csv')
+        with open(data_path, 'wb') as data_file:
+            data_file.write('M01,M05\nanonymized1,2\nanonymized2,99\n')
+
+        original_stderr= sys.stderr
+        sys.stderr= StringIO()
+        try:
+            self.assertEquals(main([form_path, labelled_path, '--label-csv', data_path]), 0)
+            with open(labelled_path, 'rb') as labelled_file:
+                self.assertEquals(self.read_rows(labelled_file.read())[1], ['Anonymized label', 'Masisi'])
+            self.assertEquals(main([form_path, labelled_path, '--label-csv', data_path, '--label-mode', 'validate']), 1)
+            self.assertIn('1 codes not among the choices, in columns: M05 (1).', sys.stderr.getvalue())
+        finally:
+            sys.stderr= original_stderr
+            for path in (data_path, labelled_path):
+                if os.path.exists(path):
+                    os.remove(path)
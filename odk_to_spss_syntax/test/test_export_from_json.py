@@ -92,3 +92,11 @@ class TestCli(TestExportFromJson):
             canonical_spss_syntax= f.read()
         
         self.assert_syntaxes_equivalent(exported_spss_syntax, canonical_spss_syntax)
+
+
+class TestCliStream(TestCli):
+    '''Test the command line interface with incremental form reading.'''
+    
+    def setUp(self):
+        super(TestCliStream, self).setUp()
+        self.cli_input= '--stream ' + self.cli_input
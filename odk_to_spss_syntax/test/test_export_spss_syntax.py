@@ -5,8 +5,46 @@ Created on Jun 14, 2014
 '''
 
 import unittest
+import re
+from StringIO import StringIO
 
 from ..variable_metadata import VariableMetadata
+from ..variable_metadata import ValueMapping
+
+
+_SPSS_TOKEN_RE= re.compile(r'''"((?:[^"]|"")*)"|(\+)|([^\s"+]+)''')
+
+
+def _join_continuation_lines(lines):
+    '''Join each indented continuation line onto the line it continues.'''
+    joined_lines= list()
+    for line in lines:
+        if line[:1].isspace() and len(joined_lines) != 0:
+            joined_lines[-1]+= ' ' + line.strip()
+        else:
+            joined_lines.append(line)
+    return joined_lines
+
+
+def _tokenize_spss_line(line):
+    '''
+    :returns: The line's words and string literals, each with whether it is a literal; literals joined with "+" are concatenated and unescaped.
+    :rtype: list(tuple(str, bool))
+    '''
+    
+    tokens= list()
+    concatenate= False
+    for literal, plus, word in _SPSS_TOKEN_RE.findall(line):
+        if plus:
+            concatenate= True
+        elif word:
+            tokens.append((word, False))
+        elif concatenate:
+            tokens[-1]= (tokens[-1][0] + literal.replace('""', '"'), True)
+            concatenate= False
+        else:
+            tokens.append((literal.replace('""', '"'), True))
+    return tokens
 
 
 def parse_spss_syntax(test_case, spss_syntax_text):
@@ -23,7 +61,7 @@ def parse_spss_syntax(test_case, spss_syntax_text):
     
     # Surround the prepend and append newlines to the text to ease processing.
     spss_syntax_text= '\n' + spss_syntax_text + '\n'
-    syntax_lines= (line for line in spss_syntax_text.splitlines()) # Generator.
+    syntax_lines= iter(_join_continuation_lines(spss_syntax_text.splitlines()))
     
     # Default error message would print `spss_syntax_text` in its entirety...
     test_case.assertIn('\nVARIABLE LABELS\n', spss_syntax_text, '"VARIABLE LABELS"'
@@ -38,9 +76,10 @@ def parse_spss_syntax(test_case, spss_syntax_text):
     variable_label_line= '/' + variable_label_line
     variable_mappings= dict()
     while variable_label_line != '':
-        var_name= variable_label_line.split('/')[1].split(' ')[0]
-        var_label= variable_label_line.split('"')[1]
-        variable_mappings[var_name]= var_label
+        tokens= _tokenize_spss_line(variable_label_line)
+        test_case.assertEquals(len(tokens), 2, 'Malformed variable label line: ' + variable_label_line)
+        var_name= tokens[0][0].lstrip('/')
+        variable_mappings[var_name]= tokens[1][0]
 
         variable_label_line= syntax_lines.next()
     
@@ -50,16 +89,14 @@ def parse_spss_syntax(test_case, spss_syntax_text):
     value_label_line= syntax_lines.next()
     all_value_mappings= dict()
     while value_label_line != '':
-        var_name= value_label_line.split('/')[1].split(' ')[0]
+        tokens= _tokenize_spss_line(value_label_line)
+        var_name= tokens[0][0].lstrip('/')
         
-        value_mappings_string= value_label_line.split(var_name)[1].strip()
         value_mappings= dict()
-        while value_mappings_string != '':
-            val_name= value_mappings_string.split(' ')[0]
-            val_label= value_mappings_string.split('"')[1]
+        # The rest of the tokens alternate between value names and labels.
+        for (val_name, _is_literal), (val_label, is_literal) in zip(tokens[1::2], tokens[2::2]):
+            test_case.assertTrue(is_literal, 'Value label expected in: ' + value_label_line)
             value_mappings[val_name]= val_label
-            # Chomp off the portion just consumed and proceed.
-            value_mappings_string= value_mappings_string.split(val_label+'"')[1].strip()
             
         all_value_mappings[var_name]= value_mappings
         value_label_line= syntax_lines.next()
@@ -105,6 +142,49 @@ class TestExportSpssSyntax(unittest.TestCase):
         self.assert_correct_export(variable_metadata_list)
 
 
+    def test_write_from_generator(self):
+        '''Test streaming syntax from a generator, spilling value labels to disk.'''
+        variable_metadata_list= [VariableMetadata(name='v' + str(i), label='Label ' + str(i)
+                                                  , value_mappings={'0': 'No', '1': 'Yes'})
+                                 for i in range(100)]
+        
+        original_spool_size= VariableMetadata.VALUE_LABEL_SPOOL_SIZE
+        VariableMetadata.VALUE_LABEL_SPOOL_SIZE= 16
+        try:
+            syntax_file= StringIO()
+            variable_count= VariableMetadata.write_spss_syntax(iter(variable_metadata_list), syntax_file)
+        finally:
+            VariableMetadata.VALUE_LABEL_SPOOL_SIZE= original_spool_size
+        
+        self.assertEquals(variable_count, len(variable_metadata_list))
+        self.assertEquals(syntax_file.getvalue()
+                          , VariableMetadata.export_spss_syntax(variable_metadata_list))
+        self.assert_correct_export(variable_metadata_list)
+
+
+    def test_value_orders(self):
+        '''Test exporting value labels in each of the supported orders.'''
+        value_pairs= [('10', 'Ten'), ('2', 'Two'), ('b', 'Bee'), ('1', 'One'), ('a', 'Ay')]
+        expected_orders= {'form': ['10', '2', 'b', '1', 'a']
+                          , 'lexicographic': ['1', '10', '2', 'a', 'b']
+                          , 'numeric': ['1', '2', '10', 'a', 'b']}
+        
+        for value_order, expected_names in expected_orders.iteritems():
+            value_mappings= ValueMapping.intern(value_pairs, value_order)
+            self.assertIs(value_mappings, ValueMapping.intern(list(reversed(value_pairs)), value_order)
+                          if value_order != 'form' else ValueMapping.intern(value_pairs, value_order))
+            self.assertEquals(list(value_mappings.ordered_names), expected_names)
+            
+            variable_metadata= VariableMetadata('v', 'Label', value_mappings)
+            value_label_line= variable_metadata._to_spss_syntax()[1]
+            self.assertEquals(value_label_line, '/v ' + ' '.join('%s "%s"' % (name, dict(value_pairs)[name])
+                                                                 for name in expected_names))
+        
+        # Plain dictionaries get the default, numeric-aware, order.
+        self.assertEquals(VariableMetadata('v', 'Label', dict(value_pairs))._to_spss_syntax()[1]
+                          , '/v 1 "One" 2 "Two" 10 "Ten" a "Ay" b "Bee"')
+
+
     def assert_correct_export(self, variable_metadata_list):
         '''Reusable assertion for testing with various inputs.'''
         
@@ -0,0 +1,144 @@
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from StringIO import StringIO
+
+from ..variable_metadata import VariableMetadata
+from ..variable_metadata import ValueMapping
+from ..exporters import register_exporter, get_exporter, exporter_names, export_files
+from ..exporters import write_stata_labels, write_r_labels, write_sas_labels
+from ..exporters import _exporters
+from ..main import main
+from .test_export_spss_syntax import parse_spss_syntax
+
+
+class TestExporters(unittest.TestCase):
+    '''
+    Test exporting :py:class:`VariableMetadata` objects to the registered
+    output formats.
+    '''
+
+    def setUp(self):
+        yes_no= ValueMapping.intern([('0', 'No'), ('1', 'Yes')])
+        self.variable_metadata_list= [VariableMetadata('q1', 'Is it "on"?', yes_no)
+                                      , VariableMetadata('q2', 'Costs $5', yes_no)
+                                      , VariableMetadata('colour', None, {'red': "Rouge d'or"})]
+        self.temp_dir= tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_registry(self):
+        '''Test registering, looking up and rejecting output formats.'''
+        self.assertEquals(exporter_names()[:5], ['sps', 'sav', 'do', 'r', 'sas'])
+        self.assertEquals(get_exporter('do').extension, '.do')
+        self.assertRaises(ValueError, get_exporter, 'xyz')
+
+        def write_names(variable_metadata_list, fileobj):
+            fileobj.write(' '.join(variable_metadata.name for variable_metadata in variable_metadata_list))
+            return len(variable_metadata_list)
+
+        register_exporter('names', '.txt', write_names)
+        try:
+            names_path= os.path.join(self.temp_dir, 'names.txt')
+            self.assertEquals(export_files(self.variable_metadata_list, {'names': names_path}), {'names': 3})
+            with open(names_path, 'r') as names_file:
+                self.assertEquals(names_file.read(), 'q1 q2 colour')
+        finally:
+            del _exporters['names']
+
+    def test_export_files_concurrently(self):
+        '''Test writing several formats' files at once from one list.'''
+        paths_by_format= dict((output_format, os.path.join(self.temp_dir, 'labels' + get_exporter(output_format).extension))
+                              for output_format in ('sps', 'do', 'r', 'sas'))
+        variable_counts= export_files(self.variable_metadata_list, paths_by_format, jobs=4)
+
+        self.assertEquals(variable_counts, {'sps': 3, 'do': 3, 'r': 3, 'sas': 3})
+        with open(paths_by_format['sps'], 'r') as syntax_file:
+            self.assertEquals(syntax_file.read(), VariableMetadata.export_spss_syntax(self.variable_metadata_list))
+
+    def test_export_files_failure(self):
+        '''Test that a failed export doesn't leave a partial file behind.'''
+        def write_broken(variable_metadata_list, fileobj):
+            fileobj.write('partial')
+            raise RuntimeError('Broken exporter.')
+
+        register_exporter('broken', '.txt', write_broken)
+        try:
+            broken_path= os.path.join(self.temp_dir, 'broken.txt')
+            self.assertRaises(RuntimeError, export_files, self.variable_metadata_list, {'broken': broken_path})
+            self.assertFalse(os.path.exists(broken_path))
+        finally:
+            del _exporters['broken']
+
+    def test_stata(self):
+        '''Test Stata quoting, shared label sets and non-integer codes.'''
+        do_file= StringIO()
+        write_stata_labels(self.variable_metadata_list, do_file)
+        do_lines= do_file.getvalue().splitlines()
+
+        self.assertIn('label variable q1 `"Is it "on"?"\'', do_lines)
+        self.assertIn('label variable q2 "Costs \\$5"', do_lines)
+        self.assertIn('label variable colour "colour"', do_lines)
+        self.assertIn('label define odk_vl1 0 "No", replace', do_lines)
+        self.assertIn('label define odk_vl1 1 "Yes", add', do_lines)
+        self.assertIn('label values q1 q2 odk_vl1', do_lines)
+        self.assertIn('* Not labelled (codes are not integers): colour', do_lines)
+
+    def test_r(self):
+        '''Test the R script's label vectors and shared factor levels.'''
+        r_file= StringIO()
+        write_r_labels(self.variable_metadata_list, r_file)
+        r_text= r_file.getvalue()
+
+        self.assertIn('  "q1" = "Is it \\"on\\"?",\n', r_text)
+        self.assertIn('.odk_value_labels_1 <- list(levels = c("0", "1"), labels = c("No", "Yes"))\n', r_text)
+        self.assertIn('  "q1" = .odk_value_labels_1,\n  "q2" = .odk_value_labels_1,\n', r_text)
+        self.assertIn('.odk_value_labels_2 <- list(levels = c("red"), labels = c("Rouge d\'or"))\n', r_text)
+        self.assertIn('apply_odk_labels <- function(data)', r_text)
+
+    def test_sas(self):
+        '''Test SAS formats for numeric and character codes.'''
+        sas_file= StringIO()
+        write_sas_labels(self.variable_metadata_list, sas_file)
+        sas_lines= sas_file.getvalue().splitlines()
+
+        self.assertIn('  VALUE odkvl1_', sas_lines)
+        self.assertIn('    0 = \'No\'', sas_lines)
+        self.assertIn('  VALUE $odkvl2_', sas_lines)
+        self.assertIn('    \'red\' = \'Rouge d\'\'or\'', sas_lines)
+        self.assertIn('    q1 = \'Is it "on"?\'', sas_lines)
+        self.assertIn('  FORMAT q1 q2 odkvl1_.;', sas_lines)
+
+    def test_cli(self):
+        '''Test the "--format" command line option.'''
+        module_dir= os.path.dirname(os.path.realpath(__file__))
+        form_path= os.path.join(module_dir, 'test_form.json')
+        outfile_path= os.path.join(self.temp_dir, 'labels.txt')
+
+        self.assertEquals(main([form_path, outfile_path, '--format', 'sps,do,r']), 0)
+        self.assertEquals(sorted(os.listdir(self.temp_dir)), ['labels.R', 'labels.do', 'labels.sps'])
+        with open(os.path.join(self.temp_dir, 'labels.sps'), 'r') as syntax_file:
+            with open(os.path.join(module_dir, 'test_syntax.sps'), 'r') as canonical_syntax_file:
+                self.assertEquals(parse_spss_syntax(self, syntax_file.read())
+                                  , parse_spss_syntax(self, canonical_syntax_file.read()))
+
+        # A single format is written to "outfile" itself.
+        self.assertEquals(main([form_path, outfile_path, '--format', 'do']), 0)
+        with open(outfile_path, 'r') as do_file:
+            self.assertTrue(do_file.read().startswith('* Variable and value labels'))
+
+        original_stderr= sys.stderr
+        sys.stderr= StringIO()
+        try:
+            self.assertRaises(SystemExit, main, [form_path, outfile_path, '--format', 'sps,xyz'])
+        finally:
+            sys.stderr= original_stderr
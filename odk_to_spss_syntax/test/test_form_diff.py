@@ -0,0 +1,160 @@
+# encoding: utf-8
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import copy
+import json
+import os
+import shutil
+import sys
+import tempfile
+from StringIO import StringIO
+
+from .. import form_diff
+from ..main import main
+from ..variable_metadata import VariableMetadata
+from test_export_spss_syntax import parse_spss_syntax
+
+
+class TestFormDiff(unittest.TestCase):
+    '''
+    Test diffing two versions of a form and re-exporting only what changed.
+    '''
+    
+    def setUp(self):
+        '''Derive a revised version of the test form.'''
+        module_dir= os.path.dirname(os.path.realpath(__file__))
+        self.test_form_path= os.path.join(module_dir, 'test_form.json')
+        with open(self.test_form_path, 'r') as f:
+            self.old_form_dict= json.load(f)
+        
+        self.new_form_dict= copy.deepcopy(self.old_form_dict)
+        children= self.new_form_dict['children']
+        children[1]['label']= 'M02 Revised label'          # M02 changed.
+        del children[2]                                     # M03 removed.
+        children[2]['children'][0]['label']= 'Goma (Nord)'  # M05 changed.
+        children.append({'name': 'M13', 'label': 'M13 New question', 'type': 'text'})
+        
+        self.old_variable_metadata_list= VariableMetadata.import_json(json.dumps(self.old_form_dict))
+        self.new_variable_metadata_list= VariableMetadata.import_json(json.dumps(self.new_form_dict))
+    
+    def test_diff_metadata(self):
+        '''Test classifying variables by name.'''
+        metadata_diff= form_diff.diff_metadata(self.old_variable_metadata_list, self.new_variable_metadata_list)
+        
+        self.assertEquals([v.name for v in metadata_diff.added], ['M13'])
+        self.assertEquals([v.name for v in metadata_diff.removed], ['M03'])
+        self.assertEquals([v.name for v in metadata_diff.changed], ['M02', 'M05'])
+        self.assertEquals(len(metadata_diff.unchanged), len(self.old_variable_metadata_list) - 3)
+    
+    def test_index_spss_syntax(self):
+        '''Test recovering each variable's lines from a generated syntax file.'''
+        syntax_text= VariableMetadata.export_spss_syntax(self.old_variable_metadata_list)
+        syntax_index= form_diff.index_spss_syntax(StringIO(syntax_text))
+        
+        for var_metadata in self.old_variable_metadata_list:
+            self.assertEquals(syntax_index[var_metadata.name], var_metadata._to_spss_syntax())
+    
+    def test_write_updated_spss_syntax(self):
+        '''Test that the updated syntax matches a full export of the new form.'''
+        metadata_diff= form_diff.diff_metadata(self.old_variable_metadata_list, self.new_variable_metadata_list)
+        old_syntax_text= VariableMetadata.export_spss_syntax(self.old_variable_metadata_list)
+        syntax_index= form_diff.index_spss_syntax(StringIO(old_syntax_text))
+        
+        updated_syntax_file= StringIO()
+        form_diff.write_updated_spss_syntax(self.new_variable_metadata_list, metadata_diff, syntax_index
+                                            , updated_syntax_file)
+        self.assertEquals(updated_syntax_file.getvalue()
+                          , VariableMetadata.export_spss_syntax(self.new_variable_metadata_list))
+    
+    def test_write_delta_spss_syntax(self):
+        '''Test that the delta syntax only covers added and changed variables.'''
+        metadata_diff= form_diff.diff_metadata(self.old_variable_metadata_list, self.new_variable_metadata_list)
+        delta_syntax_file= StringIO()
+        form_diff.write_delta_spss_syntax(self.new_variable_metadata_list, metadata_diff, delta_syntax_file)
+        
+        delta_syntax_text= delta_syntax_file.getvalue()
+        self.assertTrue(delta_syntax_text.startswith('* Removed variables: M03.'))
+        variable_mappings, all_value_mappings= parse_spss_syntax(self, delta_syntax_text)
+        self.assertEquals(sorted(variable_mappings.keys()), ['M02', 'M05', 'M13'])
+        self.assertEquals(all_value_mappings.keys(), ['M05'])
+    
+    def test_cli_diff(self):
+        '''Test the "--diff" command line options.'''
+        temp_dir= tempfile.mkdtemp()
+        try:
+            new_form_path= os.path.join(temp_dir, 'new_form.json')
+            with open(new_form_path, 'w') as f:
+                json.dump(self.new_form_dict, f)
+            old_syntax_path= os.path.join(temp_dir, 'old.sps')
+            with open(old_syntax_path, 'w') as f:
+                f.write(VariableMetadata.export_spss_syntax(self.old_variable_metadata_list))
+            syntax_path= os.path.join(temp_dir, 'new.sps')
+            
+            original_stderr= sys.stderr
+            sys.stderr= StringIO()
+            try:
+                main(['--diff', self.test_form_path, '--old-syntax', old_syntax_path, new_form_path, syntax_path])
+                error_output= sys.stderr.getvalue()
+            finally:
+                sys.stderr= original_stderr
+            
+            self.assertIn('1 added, 1 removed, 2 changed', error_output)
+            with open(syntax_path, 'r') as f:
+                self.assertEquals(f.read(), '* Import options: {"value_order": "numeric"}.\n\n'
+                                  + VariableMetadata.export_spss_syntax(self.new_variable_metadata_list))
+            
+            # Lines generated with another value order aren't reused.
+            sys.stderr= StringIO()
+            try:
+                with self.assertRaises(SystemExit):
+                    main(['--diff', self.test_form_path, '--old-syntax', old_syntax_path, '--value-order', 'form'
+                          , new_form_path, syntax_path])
+                self.assertIn('other import options', sys.stderr.getvalue())
+                
+                # A delta doesn't reuse any lines.
+                with self.assertRaises(SystemExit):
+                    main(['--diff', self.test_form_path, '--old-syntax', old_syntax_path, '--delta', new_form_path
+                          , syntax_path])
+                self.assertIn('cannot be combined with "--delta"', sys.stderr.getvalue())
+            finally:
+                sys.stderr= original_stderr
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    def test_import_options(self):
+        '''Test recording the import options in generated syntax and checking them before reusing its lines.'''
+        metadata_diff= form_diff.diff_metadata(self.old_variable_metadata_list, self.new_variable_metadata_list)
+        import_options= {'value_order': 'form', 'language': u'Français'}
+        syntax_file= StringIO()
+        form_diff.write_updated_spss_syntax(self.new_variable_metadata_list, metadata_diff, None, syntax_file
+                                            , import_options)
+        syntax_lines= syntax_file.getvalue().splitlines(True)
+        
+        self.assertEquals(form_diff.read_spss_syntax_options(syntax_lines), import_options)
+        self.assertEquals(form_diff.index_spss_syntax(syntax_lines, import_options)
+                          , form_diff.index_spss_syntax(syntax_lines))
+        self.assertRaises(ValueError, form_diff.index_spss_syntax, syntax_lines, {'value_order': 'form'})
+        # Syntax from a plain conversion used the default options.
+        old_syntax_lines= VariableMetadata.export_spss_syntax(self.old_variable_metadata_list).splitlines(True)
+        self.assertEquals(form_diff.read_spss_syntax_options(old_syntax_lines), {'value_order': 'numeric'})
+        self.assertRaises(ValueError, form_diff.index_spss_syntax, old_syntax_lines, import_options)
+    
+    def test_removed_variables_comment(self):
+        '''Test wrapping a long list of removed variables to SPSS's line length limit.'''
+        removed_variable_metadata_list= [VariableMetadata('removed_question_%03d' % number, None, None)
+                                         for number in range(100)]
+        metadata_diff= form_diff.diff_metadata(removed_variable_metadata_list, [])
+        delta_syntax_file= StringIO()
+        form_diff.write_delta_spss_syntax([], metadata_diff, delta_syntax_file)
+        
+        comment_lines= delta_syntax_file.getvalue().rstrip('\n').split('\n')
+        self.assertTrue(len(comment_lines) > 1)
+        self.assertTrue(all(len(line) <= 256 for line in comment_lines))
+        self.assertTrue(comment_lines[-1].endswith('removed_question_099.'))
+        self.assertEquals(' '.join(line.strip() for line in comment_lines).rstrip('.').split()[3:]
+                          , [variable_metadata.name for variable_metadata in removed_variable_metadata_list])
@@ -0,0 +1,81 @@
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+from collections import OrderedDict
+
+from ..variable_metadata import VariableMetadata
+from ..form_metadata import FormMetadata
+
+
+class TestFormMetadata(unittest.TestCase):
+    '''
+    Test looking up variables by name and group in a :py:class:`FormMetadata`.
+    '''
+
+    def setUp(self):
+        yes_no= [{'name': '1', 'label': 'Yes'}, {'name': '0', 'label': 'No'}]
+        self.form_dict= {'type': 'survey'
+                         , 'children': [{'name': 'village', 'type': 'text', 'label': 'Village'}
+                                        , {'name': 'household', 'type': 'group'
+                                           , 'children': [{'name': 'head', 'type': 'select one', 'itemset': 'yes_no'
+                                                           , 'label': 'Head present'}
+                                                          , {'name': 'member', 'type': 'repeat'
+                                                             , 'children': [{'name': 'age', 'type': 'integer'
+                                                                             , 'label': 'Age'}]}]}
+                                        , {'name': 'meta', 'type': 'group'
+                                           , 'children': [{'name': 'instanceID', 'type': 'calculate'
+                                                           , 'bind': {'calculate': "concat('uuid:', uuid())"}}]}]
+                         , 'choices': {'yes_no': yes_no}}
+
+    def test_import_form_metadata(self):
+        '''Test importing a form's metadata indexed by name and group path.'''
+        form_metadata= VariableMetadata.import_form_metadata(self.form_dict)
+
+        self.assertEquals(list(form_metadata), list(VariableMetadata.iter_import(self.form_dict)))
+        self.assertEquals(len(form_metadata), 5)
+        self.assertEquals(form_metadata.get('age'), VariableMetadata('age', 'Age', None))
+        self.assertEquals(form_metadata.get('uuid'), form_metadata[-1])
+        self.assertEquals(form_metadata.get('missing'), None)
+        self.assertEquals(form_metadata.index('head'), 1)
+        self.assertRaises(KeyError, form_metadata.index, 'missing')
+        self.assertIn('instanceID', form_metadata)
+        self.assertNotIn('missing', form_metadata)
+
+        self.assertEquals(form_metadata.group_path('age'), 'household/member')
+        self.assertEquals(form_metadata.group_path('village'), '')
+        self.assertEquals(form_metadata.group_paths(), ['', 'household', 'household/member', 'meta'])
+        self.assertEquals([variable_metadata.name for variable_metadata in form_metadata.in_group('household')]
+                          , ['head', 'age'])
+        self.assertEquals(form_metadata.in_group('meta'), form_metadata[3:])
+        self.assertEquals(form_metadata.in_group(''), list(form_metadata))
+        self.assertEquals(form_metadata.in_group('nowhere'), [])
+        self.assertEquals(form_metadata.duplicate_names(), [])
+
+    def test_duplicate_names(self):
+        '''Test detecting names shared by several variables.'''
+        form_metadata= FormMetadata([VariableMetadata('a', 'A', None), VariableMetadata('b', 'B', None)
+                                     , VariableMetadata('b', 'B again', None), VariableMetadata('a', 'A again', None)
+                                     , VariableMetadata('b', 'B once more', None)])
+
+        self.assertEquals(form_metadata.duplicate_names(), [('a', [0, 3]), ('b', [1, 2, 4])])
+        self.assertEquals(form_metadata.names(), ['a', 'b'])
+        self.assertEquals(form_metadata.get('b').label, 'B')
+        self.assertEquals(form_metadata.group_path('b'), '')
+        self.assertRaises(ValueError, FormMetadata, form_metadata, ['group'])
+
+    def test_import_dicts_orphan_value_labels(self):
+        '''Test importing value labels whose variable lacks a label, and variable labels given as a dict.'''
+        value_labels_dict= OrderedDict([('q2', {'1': 'Yes', '0': 'No'}), ('q3', [('b', 'B'), ('a', 'A')])
+                                        , ('q1', {'x': 'X'})])
+        variable_metadata_list= VariableMetadata.import_dicts([('q1', 'Q1')], value_labels_dict)
+
+        self.assertEquals(variable_metadata_list, [VariableMetadata('q1', 'Q1', {'x': 'X'})
+                                                   , VariableMetadata('q2', None, {'1': 'Yes', '0': 'No'})
+                                                   , VariableMetadata('q3', None, {'a': 'A', 'b': 'B'})])
+        self.assertEquals(VariableMetadata.import_dicts({'q1': 'Q1'}, value_labels_dict), variable_metadata_list)
+        self.assertIn('/q2 0 "No" 1 "Yes"\n'
+                      , VariableMetadata.export_spss_syntax(variable_metadata_list))
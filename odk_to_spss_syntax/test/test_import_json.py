@@ -6,8 +6,14 @@ Created on Jun 14, 2014
 
 import unittest
 import json
+import pickle
+import re
+import sys
+from StringIO import StringIO
 
 from ..variable_metadata import VariableMetadata
+from ..variable_metadata import ValueMapping
+from ..variable_metadata import ChoiceIndex
 
 class TestImportJson(unittest.TestCase):
     '''
@@ -47,3 +53,121 @@ class TestImportJson(unittest.TestCase):
             value_mappings[name]= label
         self.assertDictEqual(variable_metadata.value_mappings, value_mappings)
 
+
+    def test_iter_import_deep_nesting(self):
+        '''Test importing groups nested deeper than the recursion limit.'''
+        
+        depth= sys.getrecursionlimit() + 100
+        form_dict= {'type': 'survey', 'children': []}
+        group_dict= form_dict
+        for i in range(depth):
+            group_dict['children'].append({'name': 'q' + str(i), 'label': 'Question', 'type': 'text'})
+            nested_group_dict= {'name': 'g' + str(i), 'type': 'group', 'children': []}
+            group_dict['children'].append(nested_group_dict)
+            group_dict= nested_group_dict
+        
+        variable_metadata_list= list(VariableMetadata.iter_import(form_dict))
+        self.assertEquals([v.name for v in variable_metadata_list]
+                          , ['q' + str(i) for i in range(depth)])
+
+    def test_shared_value_mappings(self):
+        '''Test that questions with identical choice lists share one mapping object.'''
+        
+        question_dict= self.form_dict['children'][0]
+        self.form_dict['children'].append(dict(question_dict, name='var2'))
+        first_metadata, second_metadata= VariableMetadata.import_json(json.dumps(self.form_dict))
+        
+        self.assertIsInstance(first_metadata.value_mappings, ValueMapping)
+        self.assertIs(first_metadata.value_mappings, second_metadata.value_mappings)
+        self.assertIs(pickle.loads(pickle.dumps(first_metadata, 2)).value_mappings
+                      , first_metadata.value_mappings)
+        self.assertEquals(hash(first_metadata), hash(second_metadata._replace(name='var_name')))
+        with self.assertRaises(TypeError):
+            first_metadata.value_mappings['2']= 'Apple'
+
+    def test_shared_choice_lists(self):
+        '''Test resolving questions' choices from the form's shared choice lists.'''
+        
+        choices= {'yes_no': [{'name': '1', 'label': 'Yes'}, {'name': '0', 'label': 'No'}]}
+        form_dict= {'type': 'survey'
+                    , 'children': [{'name': 'q1', 'label': 'Q1', 'type': 'select one', 'itemset': 'yes_no'}
+                                   , {'name': 'group', 'type': 'group'
+                                      , 'children': [{'name': 'q2', 'label': 'Q2', 'type': 'select one'
+                                                      , 'list_name': 'yes_no'
+                                                      , 'children': choices['yes_no']}]}
+                                   , {'name': 'q3', 'label': 'Q3', 'type': 'select one', 'itemset': 'missing'}]
+                    , 'choices': choices}
+        
+        # Choices as a dictionary of lists, or as rows carrying their list name.
+        choice_rows= [dict(choice, list_name='yes_no') for choice in choices['yes_no']]
+        for form_choices in [choices, choice_rows]:
+            form_dict['choices']= form_choices
+            form_json= json.dumps(form_dict)
+            
+            for variable_metadata_list in [VariableMetadata.import_json(form_json)
+                                           , list(VariableMetadata.iter_import_json_stream(StringIO(form_json), 8))]:
+                q1_metadata, q2_metadata, q3_metadata= variable_metadata_list
+                self.assertDictEqual(q1_metadata.value_mappings, {'0': 'No', '1': 'Yes'})
+                self.assertIs(q1_metadata.value_mappings, q2_metadata.value_mappings)
+                self.assertEquals(q3_metadata.value_mappings, None)
+
+    def test_select_multiple(self):
+        '''Test expanding "select multiple" questions into a 0/1 variable per option.'''
+        
+        choices= {'colours': [{'name': 'red', 'label': 'Red'}, {'name': 'blue', 'label': 'Blue'}]}
+        form_dict= {'type': 'survey'
+                    , 'children': [{'name': 'q1', 'label': 'Q1', 'type': 'select all that apply', 'itemset': 'colours'}
+                                   , {'name': 'q2', 'type': 'select all that apply', 'list_name': 'colours'
+                                      , 'children': choices['colours']}
+                                   , {'name': 'q3', 'label': 'Q3', 'type': 'select all that apply'
+                                      , 'children': [{'name': '1', 'label': 'One'}]}]
+                    , 'choices': choices}
+        form_json= json.dumps(form_dict)
+        
+        for variable_metadata_list in [VariableMetadata.import_json(form_json)
+                                       , list(VariableMetadata.iter_import_json_stream(StringIO(form_json), 8))]:
+            selected= {'0': 'Not selected', '1': 'Selected'}
+            self.assertEquals(variable_metadata_list
+                              , [VariableMetadata('q1', 'Q1', None)
+                                 , VariableMetadata('q1_red', 'Q1: Red', selected)
+                                 , VariableMetadata('q1_blue', 'Q1: Blue', selected)
+                                 , VariableMetadata('q2', None, None)
+                                 , VariableMetadata('q2_red', 'q2: Red', selected)
+                                 , VariableMetadata('q2_blue', 'q2: Blue', selected)
+                                 , VariableMetadata('q3', 'Q3', None)
+                                 , VariableMetadata('q3_1', 'Q3: One', selected)])
+            # One set of 0/1 labels for every option.
+            self.assertEquals(len(set(id(variable_metadata.value_mappings) for variable_metadata in variable_metadata_list
+                                      if variable_metadata.value_mappings != None)), 1)
+        
+        # The exported names are legal SPSS names.
+        option_choices= {'options': [{'name': 'dont-know', 'label': 'Don\'t know'}, {'name': '1.', 'label': 'One'}]}
+        spss_syntax= VariableMetadata.export_spss_syntax(VariableMetadata.import_json(json.dumps(
+            {'type': 'survey', 'children': [{'name': 'q1', 'type': 'select all that apply', 'itemset': 'options'}]
+             , 'choices': option_choices})))
+        exported_names= re.findall(r'^/?(\S+) (?!LABELS)', spss_syntax, re.MULTILINE)
+        self.assertEquals(exported_names, ['q1', 'q1_dont_know', 'q1_1', 'q1_dont_know', 'q1_1'])
+        for exported_name in exported_names:
+            self.assertRegexpMatches(exported_name, r'^[A-Za-z@][A-Za-z0-9_.@#$]{0,63}(?<!\.)$')
+        
+        # Each choice list's option names are derived only once.
+        choice_index= ChoiceIndex(choices)
+        self.assertIs(choice_index.options('colours'), choice_index.options('colours'))
+        self.assertEquals(choice_index.options('colours'), (('_red', 'Red'), ('_blue', 'Blue')))
+    
+    def test_calculated_variables(self):
+        '''Test extracting the variables derived by "calculate" questions.'''
+        
+        calculated_var_names= lambda calculation_string: [var_metadata.name for var_metadata
+                                                          in VariableMetadata._iter_calculated_variables(calculation_string)]
+        self.assertEquals(calculated_var_names("concat('uuid:', uuid())"), ['uuid'])
+        self.assertEquals(calculated_var_names(u"concat('a:', ${x}, \"b:\", 'a:')"), ['a', 'b'])
+        # Expressions without derived variables are tolerated.
+        self.assertEquals(calculated_var_names('${age} * 12'), [])
+        self.assertEquals(calculated_var_names("'" * 100000), [])
+        
+        form_dict= {'type': 'survey'
+                    , 'children': [{'name': 'c1', 'type': 'calculate', 'bind': {'calculate': 'if(${x} > 1, 2, 3)'}}
+                                   , {'name': 'c2', 'type': 'calculate'}]}
+        self.assertEquals(VariableMetadata.import_json(json.dumps(form_dict))
+                          , [VariableMetadata('c1', None, None), VariableMetadata('c2', None, None)])
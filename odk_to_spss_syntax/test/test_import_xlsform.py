@@ -0,0 +1,158 @@
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import weakref
+import os
+import json
+
+from ..variable_metadata import VariableMetadata
+from ..variable_metadata import ValueMapping
+from ..xlsform import iter_import_xlsform_rows, _choice_tables
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl= None
+
+
+def xlsform_rows_from_form_dict(form_dict):
+    '''
+    Lay a pyxform JSON form out as the rows of the XLSForm it was generated
+    from, each "select one" question getting a choice list of its own name.
+    '''
+
+    survey_rows= [('type', 'name', 'label', 'calculation')]
+    choice_rows= [('list_name', 'name', 'label')]
+
+    children_iter_stack= [iter(form_dict['children'])]
+    while len(children_iter_stack) != 0:
+        form_var= next(children_iter_stack[-1], None)
+        if form_var == None:
+            children_iter_stack.pop()
+            if len(children_iter_stack) != 0:
+                survey_rows.append(('end group', None, None, None))
+            continue
+
+        var_type= form_var['type']
+        if var_type == 'group':
+            survey_rows.append(('begin group', form_var['name'], form_var.get('label'), None))
+            children_iter_stack.append(iter(form_var['children']))
+            continue
+        if var_type == 'select one':
+            var_type= 'select_one ' + form_var['name']
+            for choice in form_var['children']:
+                choice_rows.append((form_var['name'], choice['name'], choice['label']))
+        calculation= form_var.get('bind', dict()).get('calculate')
+        survey_rows.append((var_type, form_var['name'], form_var.get('label'), calculation))
+
+    return survey_rows, choice_rows
+
+
+class TestImportXlsform(unittest.TestCase):
+    '''
+    Test parsing variable metadata from the rows of an XLSForm into
+    :py:class:`VariableMetadata` objects.
+    '''
+
+    def setUp(self):
+        module_dir= os.path.dirname(os.path.realpath(__file__))
+        with open(os.path.join(module_dir, 'test_form.json'), 'r') as f:
+            form_text_json= f.read()
+        self.json_variable_metadata_list= VariableMetadata.import_json(form_text_json)
+        self.survey_rows, self.choice_rows= xlsform_rows_from_form_dict(json.loads(form_text_json))
+
+    def test_import_xlsform_rows_matches_json(self):
+        '''Test that the XLSForm and JSON versions of the test form import alike.'''
+        xlsform_variable_metadata_list= list(iter_import_xlsform_rows(self.survey_rows, self.choice_rows))
+
+        self.assertEquals(xlsform_variable_metadata_list, self.json_variable_metadata_list)
+        for var_metadata in xlsform_variable_metadata_list:
+            if var_metadata.value_mappings != None:
+                self.assertIsInstance(var_metadata.value_mappings, ValueMapping)
+
+    def test_import_xlsform_rows_cells(self):
+        '''Test numeric cells, blank rows, translated labels and shared choice lists.'''
+        survey_rows= [(None, None), ('Type', 'Name', 'Label::English', 'Label::French')
+                      , ('start', 'start', None, None)
+                      , ('select_one yn', 'q1', 'Question 1', 'Question 1 (fr)')
+                      , (None, None, None, None)
+                      , ('select_one yn', 'q2', 'Question 2', 'Question 2 (fr)')]
+        choice_rows= [('list_name', 'name', 'label::English', 'label::French')
+                      , ('yn', 0.0, 'No', 'Non'), ('yn', 1.0, 'Yes', 'Oui')]
+
+        variable_metadata_list= list(iter_import_xlsform_rows(survey_rows, choice_rows, language='French'))
+        self.assertEquals(variable_metadata_list
+                          , [VariableMetadata('start', None, None)
+                             , VariableMetadata('q1', 'Question 1 (fr)', {'0': 'Non', '1': 'Oui'})
+                             , VariableMetadata('q2', 'Question 2 (fr)', {'0': 'Non', '1': 'Oui'})])
+        self.assertIs(variable_metadata_list[1].value_mappings, variable_metadata_list[2].value_mappings)
+
+        # Without a language, the first translation is used.
+        self.assertEquals(list(iter_import_xlsform_rows(survey_rows, choice_rows))[1].label, 'Question 1')
+
+    def test_import_xlsform_rows_select_multiple(self):
+        '''Test expanding "select_multiple" questions into a 0/1 variable per option.'''
+        survey_rows= [('type', 'name', 'label'), ('select_multiple yn', 'q1', 'Question 1')
+                      , ('select_multiple missing', 'q2', 'Question 2')]
+        choice_rows= [('list_name', 'name', 'label'), ('yn', '0', 'No'), ('yn', '1', 'Yes')]
+
+        selected= {'0': 'Not selected', '1': 'Selected'}
+        self.assertEquals(list(iter_import_xlsform_rows(survey_rows, choice_rows))
+                          , [VariableMetadata('q1', 'Question 1', None)
+                             , VariableMetadata('q1_0', 'Question 1: No', selected)
+                             , VariableMetadata('q1_1', 'Question 1: Yes', selected)
+                             , VariableMetadata('q2', 'Question 2', None)])
+
+    def test_choice_tables(self):
+        '''Test indexing the choices sheet by list name in a single pass over its rows.'''
+        choice_rows= iter([('list_name', 'name', 'label'), ('yn', 1.0, 'Yes'), ('colours', 'red', None), (None, None, None)
+                           , ('yn', 0.0, 'No')])
+        self.assertEquals(_choice_tables(choice_rows, None)
+                          , {u'yn': [{'name': u'1', 'label': u'Yes'}, {'name': u'0', 'label': u'No'}]
+                             , u'colours': [{'name': u'red', 'label': u'red'}]})
+
+    def test_choice_rows_released(self):
+        '''Test that the choice rows aren't kept once they have been indexed.'''
+        choice_rows= (row for row in [('list_name', 'name', 'label'), ('yn', 1, 'Yes'), ('yn', 0, 'No')])
+        choice_rows_ref= weakref.ref(choice_rows)
+        variable_metadata_iter= iter_import_xlsform_rows([('type', 'name', 'label'), ('select_one yn', 'q1', 'Q1')
+                                                          , ('text', 'q2', 'Q2')], choice_rows)
+        del choice_rows
+        self.assertEquals(next(variable_metadata_iter).name, 'q1')
+        self.assertEquals(choice_rows_ref(), None)
+        self.assertEquals(next(variable_metadata_iter).name, 'q2')
+
+    def test_import_xlsform_rows_lazy_choices(self):
+        '''Test that the choices are only read if a question refers to them.'''
+        def choice_rows():
+            self.fail('The choices were read.')
+            yield
+
+        survey_rows= [('type', 'name', 'label'), ('text', 'q1', 'Question 1')]
+        self.assertEquals(list(iter_import_xlsform_rows(survey_rows, choice_rows()))
+                          , [VariableMetadata('q1', 'Question 1', None)])
+
+    @unittest.skipIf(openpyxl == None, 'The "openpyxl" package is not installed.')
+    def test_import_xlsx(self):
+        '''Test reading the test form from an ".xlsx" workbook.'''
+        from tempfile import TemporaryFile
+
+        workbook= openpyxl.Workbook()
+        survey_sheet= workbook.active
+        survey_sheet.title= 'survey'
+        choices_sheet= workbook.create_sheet('choices')
+        for row in self.survey_rows:
+            survey_sheet.append(row)
+        for row in self.choice_rows:
+            choices_sheet.append(row)
+
+        with TemporaryFile() as xlsx_file:
+            workbook.save(xlsx_file)
+            xlsx_file.seek(0)
+            xlsform_variable_metadata_list= list(VariableMetadata.iter_import_xls(xlsx_file))
+
+        self.assertEquals(xlsform_variable_metadata_list, self.json_variable_metadata_list)
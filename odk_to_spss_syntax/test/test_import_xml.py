@@ -0,0 +1,92 @@
+# encoding: utf-8
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import os
+from StringIO import StringIO
+
+from ..variable_metadata import VariableMetadata
+from ..variable_metadata import ValueMapping
+from ..main import main
+
+
+class TestImportXml(unittest.TestCase):
+    '''
+    Test parsing variable metadata from an XForm into :py:class:`VariableMetadata` 
+    objects.
+    '''
+    
+    def setUp(self):
+        module_dir= os.path.dirname(os.path.realpath(__file__))
+        self.test_form_xml_path= os.path.join(module_dir, 'test_form.xml')
+        with open(os.path.join(module_dir, 'test_form.json'), 'r') as f:
+            self.json_variable_metadata_list= VariableMetadata.import_json(f.read())
+    
+    def test_import_xml_matches_json(self):
+        '''Test that the XForm and JSON versions of the test form import alike.'''
+        xml_variable_metadata_list= VariableMetadata.import_xml(self.test_form_xml_path)
+        
+        # XForms don't carry labels for the metadata variables (e.g. "start").
+        expected_variable_metadata_list= list()
+        for var_metadata in self.json_variable_metadata_list:
+            if var_metadata.name in ['start', 'end', 'today', 'deviceid', 'username']:
+                var_metadata= var_metadata._replace(label=None)
+            expected_variable_metadata_list.append(var_metadata)
+        
+        self.assertEquals(xml_variable_metadata_list, expected_variable_metadata_list)
+        for var_metadata in xml_variable_metadata_list:
+            if var_metadata.value_mappings != None:
+                self.assertIsInstance(var_metadata.value_mappings, ValueMapping)
+    
+    def test_import_xml_language(self):
+        '''Test taking labels from a non-default itext translation.'''
+        with open(self.test_form_xml_path, 'r') as f:
+            xml_variable_metadata_list= VariableMetadata.import_xml(f, language='English')
+        
+        m01_metadata= xml_variable_metadata_list[0]
+        self.assertEquals(m01_metadata.label, 'M01 Name of the enumerator')
+        self.assertEquals(m01_metadata.value_mappings['anonymized1'], 'Anonymized label (en)')
+        # Plain labels are the same in every language.
+        self.assertEquals(xml_variable_metadata_list[1].label, 'M02 Numéro de la tablette')
+    
+    def test_import_xml_relative_refs(self):
+        '''Test a minimal form with relative references inside a group.'''
+        xml_text= ('<h:html xmlns="http://www.w3.org/2002/xforms" xmlns:h="http://www.w3.org/1999/xhtml">'
+                   '<h:head><model><instance><data><g><q/></g></data></instance></model></h:head>'
+                   '<h:body><group ref="/data/g"><select1 ref="q"><label>Q</label>'
+                   '<item><label>Yes</label><value>1</value></item></select1></group></h:body></h:html>')
+        self.assertEquals(VariableMetadata.import_xml(StringIO(xml_text))
+                          , [VariableMetadata('q', 'Q', {'1': 'Yes'})])
+
+    def test_import_xml_select_multiple(self):
+        '''Test expanding "select" (select multiple) questions, with items or an itemset, into 0/1 variables.'''
+        xml_text= ('<h:html xmlns="http://www.w3.org/2002/xforms" xmlns:h="http://www.w3.org/1999/xhtml">'
+                   '<h:head><model><instance><data><q1/><q2/></data></instance>'
+                   '<instance id="colours"><root><item><name>red</name><label>Red</label></item></root></instance>'
+                   '</model></h:head><h:body>'
+                   '<select ref="/data/q1"><label>Q1</label><item><label>Yes</label><value>1</value></item></select>'
+                   '<select ref="/data/q2"><label>Q2</label>'
+                   '<itemset nodeset="instance(\'colours\')/root/item"><value ref="name"/><label ref="label"/></itemset>'
+                   '</select></h:body></h:html>')
+        selected= {'0': 'Not selected', '1': 'Selected'}
+        self.assertEquals(VariableMetadata.import_xml(StringIO(xml_text))
+                          , [VariableMetadata('q1', 'Q1', None), VariableMetadata('q1_1', 'Q1: Yes', selected)
+                             , VariableMetadata('q2', 'Q2', None), VariableMetadata('q2_red', 'Q2: Red', selected)])
+    
+    def test_cli_xml(self):
+        '''Test converting an XForm from the command line.'''
+        exported_syntax_path= os.path.join(os.path.dirname(self.test_form_xml_path), 'exported_xml.sps')
+        try:
+            main(['--xml', self.test_form_xml_path, exported_syntax_path])
+            with open(exported_syntax_path, 'r') as f:
+                exported_spss_syntax= f.read()
+        finally:
+            if os.path.exists(exported_syntax_path):
+                os.remove(exported_syntax_path)
+        
+        expected_spss_syntax= VariableMetadata.export_spss_syntax(VariableMetadata.import_xml(self.test_form_xml_path))
+        self.assertEquals(exported_spss_syntax, expected_spss_syntax)
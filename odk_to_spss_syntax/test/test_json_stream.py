@@ -0,0 +1,116 @@
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import json
+import os
+from collections import OrderedDict
+from StringIO import StringIO
+
+from .. import json_stream
+from ..variable_metadata import VariableMetadata
+
+
+class UnseekableFile(object):
+    '''A file-like object that can only be read, recording how far it has been.'''
+    
+    def __init__(self, text):
+        self._file= StringIO(text)
+        self.bytes_read= 0
+    
+    def read(self, size):
+        data= self._file.read(size)
+        self.bytes_read+= len(data)
+        return data
+
+
+class TestJsonStream(unittest.TestCase):
+    '''
+    Test incrementally tokenizing JSON text and importing forms from it.
+    '''
+    
+    def setUp(self):
+        module_dir= os.path.dirname(os.path.realpath(__file__))
+        with open(os.path.join(module_dir, 'test_form.json'), 'r') as f:
+            self.form_text_json= f.read()
+    
+    def test_items_match_json_loads(self):
+        '''Test that streamed items match a full parse, even with tiny chunks.'''
+        expected_items= json.loads(self.form_text_json)['children']
+        for chunk_size in [1, 7, 4096]:
+            items= list(json_stream.iter_items(StringIO(self.form_text_json)
+                                               , ('children', 'item'), chunk_size))
+            self.assertEquals(items, expected_items)
+    
+    def test_scalars(self):
+        '''Test tokenizing numbers and literals at chunk boundaries.'''
+        json_text= '{"a": [1, -2.5e3, true, false, null, "x\\"y"], "b": 10}'
+        for chunk_size in [1, 2, 3, 64]:
+            root= list(json_stream.iter_items(StringIO(json_text), (), chunk_size))[0]
+            self.assertEquals(root, json.loads(json_text))
+    
+    def test_malformed(self):
+        '''Test that truncated or invalid documents are rejected.'''
+        for json_text in ['{"a": [1, 2', '{"a": "unterminated', '{"a": nope}']:
+            with self.assertRaises(ValueError):
+                list(json_stream.iter_events(StringIO(json_text), 4))
+    
+    def test_unbalanced_closers(self):
+        '''Test that stray or mismatched closing brackets are rejected.'''
+        for json_text in ['}', ']', '[1}', '{"a": 1]', '{"a": 1}}', '[[1]]]']:
+            with self.assertRaises(ValueError):
+                list(json_stream.iter_events(StringIO(json_text), 4))
+    
+    def test_malformed_structure(self):
+        '''Test that missing or misplaced commas and colons are rejected, as :py:func:`json.loads` rejects them.'''
+        for json_text in ['{"a": 1 "b": 2}', '[1 2]', '[{} {}]', '{"a" "b"}', '{"a" 1}', '{"a":: 1}', '[1,]'
+                          , '{"a": 1,}', '[,1]', '{,}', '{1: 2}', '[1: 2]', '{"a": 1 "b"}', '{} {}', '1 2', ''
+                          , '{"a": "b", "c"}']:
+            self.assertRaises(ValueError, json.loads, json_text)
+            for chunk_size in [1, 64]:
+                with self.assertRaises(ValueError):
+                    list(json_stream.iter_events(StringIO(json_text), chunk_size))
+    
+    def test_long_strings(self):
+        '''Test strings spanning many chunks, with escapes at the chunk boundaries.'''
+        for json_text in [json.dumps({'a': 'x' * 10000, 'b': ['\\' * 101 + '"' * 3]}), '"\\\\"', '"\\""']:
+            for chunk_size in [1, 2, 3, 256]:
+                self.assertEquals(list(json_stream.iter_items(StringIO(json_text), (), chunk_size))
+                                  , [json.loads(json_text)])
+        for json_text in ['"unterminated', '["escaped\\"]']:
+            with self.assertRaises(ValueError):
+                list(json_stream.iter_events(StringIO(json_text), 4))
+    
+    def test_tree_events(self):
+        '''Test walking nested children a node at a time.'''
+        json_text= '{"children": [{"name": "g", "children": [{"name": "q"}, 1], "type": "group"}, {"name": "r"}]}'
+        self.assertEquals(list(json_stream.iter_tree_events(StringIO(json_text), ('children', 'item'), 'children', 4))
+                          , [('start_node', None), ('start_node', None), ('end_node', {'name': 'q'})
+                             , ('start_node', None), ('end_node', 1), ('end_node', {'name': 'g', 'type': 'group'})
+                             , ('start_node', None), ('end_node', {'name': 'r'})])
+    
+    def test_import_json_stream_grouped_form(self):
+        '''Test that a form whose questions all sit in one group is still read a question at a time.'''
+        yes_no= [{'name': '1', 'label': 'Yes'}, {'name': '0', 'label': 'No'}]
+        # Groups and questions list their children before their type.
+        questions= [OrderedDict([('children', yes_no), ('name', 'q%d' % number), ('label', 'Question %d' % number)
+                                 , ('type', 'select one')])
+                    for number in range(2000)]
+        form_text_json= json.dumps({'type': 'survey', 'children': [OrderedDict([('children', questions)
+                                                                                 , ('name', 'everything')
+                                                                                 , ('type', 'group')])]})
+        form_file= UnseekableFile(form_text_json)
+        
+        variable_metadata_iter= VariableMetadata.iter_import_json_stream(form_file, 1024)
+        self.assertEquals(next(variable_metadata_iter), VariableMetadata.import_json(form_text_json)[0])
+        self.assertLess(form_file.bytes_read, 4 * 1024)
+        self.assertEquals(list(variable_metadata_iter)
+                          , VariableMetadata.import_json(form_text_json)[1:])
+    
+    def test_import_json_stream(self):
+        '''Test that streaming import agrees with :py:meth:`VariableMetadata.import_json`.'''
+        streamed_metadata= list(VariableMetadata.iter_import_json_stream(StringIO(self.form_text_json), 16))
+        self.assertEquals(streamed_metadata, VariableMetadata.import_json(self.form_text_json))
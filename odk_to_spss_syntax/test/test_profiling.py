@@ -0,0 +1,89 @@
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import os
+import sys
+import time
+import pstats
+from StringIO import StringIO
+
+from ..main import from_json
+from ..main import main
+from ..profiling import ConversionMetrics
+from ..profiling import add_metrics_callback
+from ..profiling import remove_metrics_callback
+from ..variable_metadata import VariableMetadata
+
+
+class TestProfiling(unittest.TestCase):
+    '''Test the collection of conversion metrics.'''
+    
+    def setUp(self):
+        self.module_dir= os.path.dirname(os.path.realpath(__file__))
+        self.test_form_path= os.path.join(self.module_dir, 'test_form.json')
+        with open(self.test_form_path, 'r') as f:
+            self.form_text_json= f.read()
+        self.exported_syntax_path= os.path.join(self.module_dir, 'exported_profile.sps')
+        self.stats_path= os.path.join(self.module_dir, 'exported_profile.prof')
+    
+    def tearDown(self):
+        for path in [self.exported_syntax_path, self.stats_path]:
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def test_from_json_metrics(self):
+        '''Test the stages and counters collected by :py:func:`from_json`.'''
+        metrics= ConversionMetrics()
+        spss_syntax_string= from_json(self.form_text_json, metrics=metrics)
+        
+        self.assertEquals(spss_syntax_string, from_json(self.form_text_json))
+        self.assertEquals(sorted(metrics.timings), ['calculate', 'export', 'import', 'parse'])
+        variable_metadata_list= VariableMetadata.import_json(self.form_text_json)
+        self.assertEquals(metrics.counters
+                          , {'variables': len(variable_metadata_list), 'groups': 1
+                             , 'choices': sum(len(var_metadata.value_mappings) for var_metadata in variable_metadata_list
+                                              if var_metadata.value_mappings != None)
+                             , 'bytes_in': len(self.form_text_json), 'bytes_out': len(spss_syntax_string)})
+        self.assertIn('Stage breakdown:', metrics.summary())
+    
+    def test_exclusive_timings(self):
+        '''Test that time spent in a nested stage isn't also counted toward the enclosing one.'''
+        metrics= ConversionMetrics()
+        with metrics.timer('outer'):
+            with metrics.timer('inner'):
+                time.sleep(0.05)
+        self.assertGreaterEqual(metrics.timings['inner'], 0.05)
+        self.assertLess(metrics.timings['outer'], 0.05)
+    
+    def test_metrics_callback(self):
+        '''Test that added callbacks receive the metrics of every conversion.'''
+        reported_metrics= list()
+        add_metrics_callback(reported_metrics.append)
+        try:
+            from_json(self.form_text_json)
+        finally:
+            remove_metrics_callback(reported_metrics.append)
+        from_json(self.form_text_json)
+        
+        self.assertEquals(len(reported_metrics), 1)
+        self.assertIn('variables', reported_metrics[0].counters)
+    
+    def test_cli_profile(self):
+        '''Test the "--profile" and "--cprofile" options.'''
+        stderr= sys.stderr
+        sys.stderr= StringIO()
+        try:
+            main(['--profile', '--stream', '--cprofile', self.stats_path, self.test_form_path
+                  , self.exported_syntax_path])
+            error_output= sys.stderr.getvalue()
+        finally:
+            sys.stderr= stderr
+        
+        self.assertIn('Stage breakdown:', error_output)
+        self.assertIn('variables=', error_output)
+        # The statistics can be loaded.
+        pstats.Stats(self.stats_path)
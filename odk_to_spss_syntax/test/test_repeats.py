@@ -0,0 +1,113 @@
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import os
+import json
+import shutil
+import tempfile
+
+from ..variable_metadata import VariableMetadata
+from ..exporters import export_tables
+from ..main import main
+
+
+class TestRepeats(unittest.TestCase):
+    '''Test importing and exporting the metadata of forms with repeats as a table per repeat.'''
+
+    def setUp(self):
+        yes_no= [{'name': '1', 'label': 'Yes'}, {'name': '0', 'label': 'No'}]
+        self.form_dict= {'type': 'survey'
+                         , 'children': [{'name': 'village', 'type': 'text', 'label': 'Village'}
+                                        , {'name': 'household', 'type': 'group'
+                                           , 'children': [{'name': 'head', 'type': 'select one', 'itemset': 'yes_no'
+                                                           , 'label': 'Head present'}
+                                                          , {'name': 'member', 'type': 'repeat'
+                                                             , 'children': [{'name': 'age', 'type': 'integer', 'label': 'Age'}
+                                                                            , {'name': 'visit', 'type': 'repeat'
+                                                                               , 'children': [{'name': 'ill', 'type': 'select one'
+                                                                                               , 'itemset': 'yes_no'
+                                                                                               , 'label': 'Ill'}]}
+                                                                            , {'name': 'details', 'type': 'group'
+                                                                               , 'children': [{'name': 'works', 'type': 'select one'
+                                                                                               , 'itemset': 'yes_no'
+                                                                                               , 'label': 'Works'}]}]}]}
+                                        , {'name': 'end', 'type': 'end'}]
+                         , 'choices': {'yes_no': yes_no}}
+        self.form_json= json.dumps(self.form_dict)
+
+    def test_import_repeat_tables(self):
+        '''Test partitioning the variables by repeat, with legal names after their group path.'''
+        tables= VariableMetadata.import_repeat_tables(self.form_dict)
+
+        yes_no= {'0': 'No', '1': 'Yes'}
+        self.assertEquals(tables.keys(), [None, 'household/member', 'household/member/visit'])
+        self.assertEquals(tables[None], [VariableMetadata('village', 'Village', None)
+                                         , VariableMetadata('household_head', 'Head present', yes_no)
+                                         , VariableMetadata('end', None, None)])
+        self.assertEquals(tables['household/member']
+                          , [VariableMetadata('household_member_age', 'Age', None)
+                             , VariableMetadata('household_member_details_works', 'Works', yes_no)])
+        self.assertEquals(tables['household/member/visit'], [VariableMetadata('household_member_visit_ill', 'Ill', yes_no)])
+        # Choice lists are still shared across tables.
+        self.assertIs(tables[None][1].value_mappings, tables['household/member/visit'][0].value_mappings)
+
+    def test_long_group_paths(self):
+        '''Test that names after deeply nested group paths are truncated and kept unique.'''
+        long_group_name= 'section_' + 'x' * 50
+        form_dict= {'type': 'survey'
+                    , 'children': [{'name': 'roster', 'type': 'repeat'
+                                    , 'children': [{'name': long_group_name, 'type': 'group'
+                                                    , 'children': [{'name': 'name_' + suffix, 'type': 'text'}
+                                                                   for suffix in ('first', 'family')]}
+                                                   , {'name': 'ALL', 'type': 'text'}]}]}
+        roster_names= [variable_metadata.name
+                       for variable_metadata in VariableMetadata.import_repeat_tables(form_dict)['roster']]
+
+        self.assertEquals(roster_names, ['roster_' + long_group_name[:57], 'roster_' + long_group_name[:55] + '_2'
+                                         , 'roster_ALL'])
+        for name in roster_names:
+            self.assertLessEqual(len(name), 64)
+            self.assertNotIn('/', name)
+
+    def test_import_flattens_repeats(self):
+        '''Test that the plain import includes the questions of repeats, under their own names.'''
+        self.assertEquals([variable_metadata.name for variable_metadata in VariableMetadata.import_json(self.form_json)]
+                          , ['village', 'head', 'age', 'ill', 'works', 'end'])
+
+    def test_export_tables(self):
+        '''Test writing each table's syntax file concurrently.'''
+        tables= VariableMetadata.import_repeat_tables(self.form_dict)
+        temp_dir= tempfile.mkdtemp()
+        try:
+            paths_by_table= dict((table_name, os.path.join(temp_dir, '%d.sps' % table_number))
+                                 for table_number, table_name in enumerate(tables))
+            self.assertEquals(export_tables(tables, paths_by_table, jobs=3)
+                              , {None: 3, 'household/member': 2, 'household/member/visit': 1})
+            for table_name, path in paths_by_table.iteritems():
+                with open(path, 'r') as f:
+                    self.assertEquals(f.read(), VariableMetadata.export_spss_syntax(tables[table_name]))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_cli_repeats(self):
+        '''Test writing a syntax file per repeat from the command line.'''
+        temp_dir= tempfile.mkdtemp()
+        try:
+            form_path= os.path.join(temp_dir, 'form.json')
+            with open(form_path, 'w') as f:
+                f.write(self.form_json)
+
+            self.assertEquals(main(['--repeats', form_path, os.path.join(temp_dir, 'syntax.sps')]), 0)
+
+            self.assertEquals(sorted(os.listdir(temp_dir))
+                              , ['form.json', 'syntax-household-member-visit.sps', 'syntax-household-member.sps'
+                                 , 'syntax.sps'])
+            tables= VariableMetadata.import_repeat_tables(self.form_dict)
+            with open(os.path.join(temp_dir, 'syntax-household-member.sps'), 'r') as f:
+                self.assertEquals(f.read(), VariableMetadata.export_spss_syntax(tables['household/member']))
+        finally:
+            shutil.rmtree(temp_dir)
@@ -0,0 +1,257 @@
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import os
+import struct
+import sys
+import tempfile
+from StringIO import StringIO
+
+from ..variable_metadata import VariableMetadata
+from ..variable_metadata import ValueMapping
+from ..sav_writer import write_sav, iter_csv_data_rows, _short_name
+from ..main import main
+
+
+def parse_sav(test_case, sav_bytes):
+    '''
+    Read back the parts of an SPSS system file that :py:func:`write_sav`
+    writes.
+
+    :param :py:class:`unittest.TestCase` test_case: The test case to check the file's structure with.
+    :param str sav_bytes: The contents of the file.
+    :returns: The header's case count; each variable's (long) name, width and label; the value labels of each variable, by name; and the cases, as lists of values.
+    :rtype: tuple(int, list(tuple(str, int, str)), dict(str, dict), list(list))
+    '''
+
+    test_case.assertEquals(sav_bytes[:4], '$FL2')
+    test_case.assertTrue(sav_bytes[4:64].startswith('@(#) SPSS DATA FILE'))
+    case_size, case_count= struct.unpack_from('<i4xi4xi', sav_bytes, 68)[0], struct.unpack_from('<i', sav_bytes, 80)[0]
+    position= 176
+
+    # [short name, width, label] of each variable; dictionary index -> short name.
+    variables= list()
+    variable_indexes= dict()
+    value_label_sets= list()
+    long_names= dict()
+    long_string_value_labels= dict()
+    while True:
+        record_type,= struct.unpack_from('<i', sav_bytes, position)
+        position+= 4
+        if record_type == 2:
+            width, has_label, _missing_count, _print_format, _write_format, short_name= \
+                struct.unpack_from('<5i8s', sav_bytes, position)
+            position+= 28
+            label= None
+            if has_label:
+                label_length,= struct.unpack_from('<i', sav_bytes, position)
+                label= sav_bytes[position + 4:position + 4 + label_length]
+                position+= 4 + label_length + (-label_length % 4)
+            if width != -1:
+                variable_indexes[len(variable_indexes) + 1]= short_name.rstrip()
+                variables.append([short_name.rstrip(), width, label])
+            else:
+                variable_indexes[len(variable_indexes) + 1]= None
+        elif record_type == 3:
+            label_count,= struct.unpack_from('<i', sav_bytes, position)
+            position+= 4
+            value_labels= list()
+            for _label_number in range(label_count):
+                value= sav_bytes[position:position + 8]
+                label_length= ord(sav_bytes[position + 8])
+                value_labels.append((value, sav_bytes[position + 9:position + 9 + label_length]))
+                position+= 8 + 1 + label_length + (-(1 + label_length) % 8)
+            test_case.assertEquals(struct.unpack_from('<i', sav_bytes, position)[0], 4)
+            variable_count,= struct.unpack_from('<i', sav_bytes, position + 4)
+            indexes= struct.unpack_from('<%di' % variable_count, sav_bytes, position + 8)
+            position+= 8 + 4 * variable_count
+            value_label_sets.append((value_labels, [variable_indexes[index] for index in indexes]))
+        elif record_type == 7:
+            subtype, size, count= struct.unpack_from('<3i', sav_bytes, position)
+            position+= 12
+            data= sav_bytes[position:position + size * count]
+            position+= size * count
+            if subtype == 13:
+                long_names.update(pair.split('=', 1) for pair in data.split('\t'))
+            elif subtype == 20:
+                test_case.assertEquals(data, 'UTF-8')
+            elif subtype == 21:
+                data_position= 0
+                while data_position < len(data):
+                    name_length,= struct.unpack_from('<i', data, data_position)
+                    name= data[data_position + 4:data_position + 4 + name_length]
+                    data_position+= 4 + name_length
+                    _width, label_count= struct.unpack_from('<2i', data, data_position)
+                    data_position+= 8
+                    value_labels= long_string_value_labels.setdefault(name, dict())
+                    for _label_number in range(label_count):
+                        value_length,= struct.unpack_from('<i', data, data_position)
+                        value= data[data_position + 4:data_position + 4 + value_length]
+                        data_position+= 4 + value_length
+                        label_length,= struct.unpack_from('<i', data, data_position)
+                        value_labels[value.rstrip()]= data[data_position + 4:data_position + 4 + label_length]
+                        data_position+= 4 + label_length
+        elif record_type == 999:
+            position+= 4
+            break
+        else:
+            test_case.fail('Unexpected record type %d.' % record_type)
+    test_case.assertEquals(case_size, len(variable_indexes))
+
+    widths= dict((short_name, width) for short_name, width, _label in variables)
+    all_value_labels= dict(long_string_value_labels)
+    for value_labels, short_names in value_label_sets:
+        for short_name in short_names:
+            decoded_labels= dict()
+            for value, label in value_labels:
+                if widths[short_name] == 0:
+                    value= '%g' % struct.unpack('<d', value)[0]
+                decoded_labels[value.rstrip()]= label
+            all_value_labels[long_names[short_name]]= decoded_labels
+
+    cases= list()
+    while position < len(sav_bytes):
+        case= list()
+        for _short_name, width, _label in variables:
+            if width == 0:
+                case.append(struct.unpack_from('<d', sav_bytes, position)[0])
+                position+= 8
+            else:
+                segment_size= 8 * ((width + 7) // 8)
+                case.append(sav_bytes[position:position + width].rstrip())
+                position+= segment_size
+        cases.append(case)
+
+    named_variables= [(long_names[short_name], width, label) for short_name, width, label in variables]
+    return case_count, named_variables, all_value_labels, cases
+
+
+class TestSavWriter(unittest.TestCase):
+    '''
+    Test writing SPSS system files from :py:class:`VariableMetadata`
+    objects.
+    '''
+
+    def setUp(self):
+        module_dir= os.path.dirname(os.path.realpath(__file__))
+        self.test_form_path= os.path.join(module_dir, 'test_form.json')
+        with open(self.test_form_path, 'r') as f:
+            self.variable_metadata_list= VariableMetadata.import_json(f.read())
+
+    def test_write_dictionary(self):
+        '''Test that the test form's names and labels survive the round trip.'''
+        sav_file= StringIO()
+        variable_count, case_count= VariableMetadata.write_sav(self.variable_metadata_list, sav_file)
+        self.assertEquals((variable_count, case_count), (len(self.variable_metadata_list), 0))
+
+        header_case_count, variables, all_value_labels, cases= parse_sav(self, sav_file.getvalue())
+        self.assertEquals(header_case_count, -1)
+        self.assertEquals(cases, [])
+        self.assertEquals([name for name, _width, _label in variables]
+                          , [var_metadata.name for var_metadata in self.variable_metadata_list])
+        for (_name, _width, label), var_metadata in zip(variables, self.variable_metadata_list):
+            self.assertEquals(label, (var_metadata.label or var_metadata.name)[:255])
+        self.assertEquals(all_value_labels
+                          , dict((var_metadata.name, dict((value_name, value_label[:120]) for value_name, value_label
+                                                          in var_metadata.value_mappings.iteritems()))
+                                 for var_metadata in self.variable_metadata_list
+                                 if var_metadata.value_mappings != None))
+
+    def test_shared_value_labels(self):
+        '''Test that variables sharing a :py:class:`ValueMapping` share a value label record.'''
+        yes_no= ValueMapping.intern([('0', 'No'), ('1', 'Yes')])
+        variable_metadata_list= [VariableMetadata('q1', 'Question 1', yes_no), VariableMetadata('q2', 'Question 2', yes_no)
+                                 , VariableMetadata('colour', 'Colour', {'red': 'Red', 'green_and_blue': 'Green and blue'})]
+        sav_file= StringIO()
+        write_sav(variable_metadata_list, sav_file)
+        sav_bytes= sav_file.getvalue()
+
+        self.assertEquals(sav_bytes.count(struct.pack('<2i', 4, 2)), 1)
+        _case_count, variables, all_value_labels, _cases= parse_sav(self, sav_bytes)
+        self.assertEquals([width for _name, width, _label in variables], [0, 0, 14])
+        self.assertEquals(all_value_labels, {'q1': {'0': 'No', '1': 'Yes'}, 'q2': {'0': 'No', '1': 'Yes'}
+                                             , 'colour': {'red': 'Red', 'green_and_blue': 'Green and blue'}})
+
+    def test_illegal_long_names(self):
+        '''Test that names that would break the long names record are made legal (and unique).'''
+        variable_metadata_list= [VariableMetadata('a=b', 'A equals B', {'1': 'One'}), VariableMetadata('a\tb', 'A tab B', {'2': 'Two'})
+                                 , VariableMetadata('colour=x', 'Colour', {'red': 'Red', 'green_and_blue': 'Green and blue'})]
+        sav_file= StringIO()
+        write_sav(variable_metadata_list, sav_file, [{'a=b': '1', 'a\tb': '2', 'colour=x': 'red'}])
+
+        _case_count, variables, all_value_labels, cases= parse_sav(self, sav_file.getvalue())
+        self.assertEquals(variables, [('a_b', 0, 'A equals B'), ('a_b_2', 0, 'A tab B'), ('colour_x', 14, 'Colour')])
+        self.assertEquals(all_value_labels, {'a_b': {'1': 'One'}, 'a_b_2': {'2': 'Two'}
+                                             , 'colour_x': {'red': 'Red', 'green_and_blue': 'Green and blue'}})
+        self.assertEquals(cases, [[1., 2., 'red']])
+
+    def test_write_data(self):
+        '''Test writing cases from a CSV export, with group-prefixed column names.'''
+        variable_metadata_list= [VariableMetadata('name', 'Name', None)
+                                 , VariableMetadata('age_group', 'Age group', {'1': 'Child', '2': 'Adult'})]
+        csv_text= 'grp-name,grp-age_group\nAlice,2\nBob,\n'
+        sav_file= StringIO()
+        self.assertEquals(write_sav(variable_metadata_list, sav_file, iter_csv_data_rows(StringIO(csv_text))
+                                    , string_width=10)
+                          , (2, 2))
+
+        case_count, variables, _all_value_labels, cases= parse_sav(self, sav_file.getvalue())
+        self.assertEquals(case_count, 2)
+        self.assertEquals([width for _name, width, _label in variables], [10, 0])
+        self.assertEquals(cases[0], ['Alice', 2.])
+        self.assertEquals(cases[1][0], 'Bob')
+        self.assertLess(cases[1][1], -1e300)
+
+    def test_cli(self):
+        '''Test the "--sav" and "--data" command line options.'''
+        sav_path= tempfile.mktemp(suffix='.sav')
+        csv_path= tempfile.mktemp(suffix='.csv')
+        with open(csv_path, 'w') as csv_file:
+            csv_file.write('M01,M11\nAbc,3\n')
+        try:
+            self.assertEquals(main([self.test_form_path, sav_path, '--sav', '--data', csv_path]), 0)
+            with open(sav_path, 'rb') as sav_file:
+                case_count, variables, _all_value_labels, cases= parse_sav(self, sav_file.read())
+        finally:
+            for path in (sav_path, csv_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        self.assertEquals(case_count, 1)
+        self.assertEquals(len(variables), len(self.variable_metadata_list))
+        self.assertEquals(cases[0][0], 'Abc')
+        self.assertIn(3., cases[0])
+
+    def test_short_names(self):
+        '''Test that short names are legal and unique, with no trailing period.'''
+        used_short_names= set()
+        self.assertEquals([_short_name(name, used_short_names) for name in ['abcdef..z', 'abcdef.._y', 'q/1', '1st', 'all']]
+                          , ['ABCDEF', 'V2', 'Q_1', 'V4', 'V5'])
+
+    def test_cli_stdout(self):
+        '''Test writing a system file to stdout, and refusing "-" where output is written by file name.'''
+        original_stdout, original_stderr= sys.stdout, sys.stderr
+        sys.stdout, sys.stderr= StringIO(), StringIO()
+        try:
+            self.assertEquals(main([self.test_form_path, '-', '--sav']), 0)
+            sav_bytes= sys.stdout.getvalue()
+            self.assertRaises(SystemExit, main, [self.test_form_path, '-', '--format', 'sps,do'])
+            self.assertIn('"outfile" can\'t be "-"', sys.stderr.getvalue())
+        finally:
+            sys.stdout, sys.stderr= original_stdout, original_stderr
+
+        self.assertEquals(len(parse_sav(self, sav_bytes)[1]), len(self.variable_metadata_list))
+        self.assertFalse(os.path.exists('<stdout>'))
+
+    def test_cli_data_requires_sav(self):
+        '''Test that "--data" is rejected without "--sav".'''
+        original_stderr= sys.stderr
+        sys.stderr= StringIO()
+        try:
+            self.assertRaises(SystemExit, main, [self.test_form_path, os.devnull, '--data', self.test_form_path])
+        finally:
+            sys.stderr= original_stderr
@@ -0,0 +1,162 @@
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import httplib
+import json
+import os
+import threading
+
+from ..main import from_json, from_dicts
+from ..service import make_server, ServiceMetrics, ConversionServer, ConversionService, ConversionTimeout
+
+
+class TestService(unittest.TestCase):
+    '''
+    Test the conversion service over HTTP.
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server= make_server(port=0, jobs=2)
+        cls.server_thread= threading.Thread(target=cls.server.serve_forever)
+        cls.server_thread.daemon= True
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.server.service.close()
+
+    def setUp(self):
+        module_dir= os.path.dirname(os.path.realpath(__file__))
+        with open(os.path.join(module_dir, 'test_form.json'), 'r') as f:
+            self.form_text_json= f.read()
+
+    def request(self, method, path, body=None):
+        connection= httplib.HTTPConnection(*self.server.server_address[:2])
+        try:
+            connection.request(method, path, body)
+            response= connection.getresponse()
+            return response.status, response.read()
+        finally:
+            connection.close()
+
+    def test_convert(self):
+        '''Test converting a JSON form, with and without options.'''
+        self.assertEquals(self.request('POST', '/convert', self.form_text_json), (200, from_json(self.form_text_json)))
+        self.assertEquals(self.request('POST', '/convert?value_order=form', self.form_text_json)
+                          , (200, from_json(self.form_text_json, value_order='form')))
+
+    def test_convert_dicts(self):
+        '''Test converting variable and value labels given as dictionaries.'''
+        request_body= json.dumps({'variable_labels': {'q1': u'Question 1'}, 'value_labels': {'q1': {'1': 'Yes', '0': 'No'}}})
+        self.assertEquals(self.request('POST', '/convert/dicts', request_body)
+                          , (200, from_dicts([('q1', 'Question 1')], {'q1': [('1', 'Yes'), ('0', 'No')]})))
+        # Value labels of a variable without a label are exported too.
+        request_body= json.dumps({'variable_labels': {'q1': u'Question 1'}, 'value_labels': {'q2': {'1': 'Yes'}}})
+        self.assertEquals(self.request('POST', '/convert/dicts', request_body)
+                          , (200, from_dicts([('q1', 'Question 1')], {'q2': [('1', 'Yes')]})))
+
+    def test_concurrent_requests(self):
+        '''Test that concurrent requests are all answered correctly.'''
+        expected_response= (200, from_json(self.form_text_json))
+        responses= list()
+
+        def convert():
+            responses.append(self.request('POST', '/convert', self.form_text_json))
+
+        threads= [threading.Thread(target=convert) for _thread_number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEquals(responses, [expected_response] * len(threads))
+
+    def test_errors(self):
+        '''Test the responses to bad requests.'''
+        self.assertEquals(self.request('POST', '/convert', '{not json')[0], 400)
+        self.assertEquals(self.request('POST', '/convert?value_order=random', self.form_text_json)[0], 400)
+        self.assertEquals(self.request('POST', '/convert/dicts', '[]')[0], 400)
+        self.assertEquals(self.request('POST', '/nowhere', '')[0], 404)
+        self.assertEquals(self.request('GET', '/nowhere')[0], 404)
+        self.assertEquals(self.request('GET', '/health'), (200, 'ok\n'))
+
+    def test_invalid_content_length(self):
+        '''Test that a negative "Content-Length" is refused instead of read until the connection closes.'''
+        connection= httplib.HTTPConnection(*self.server.server_address[:2])
+        try:
+            connection.putrequest('POST', '/convert')
+            connection.putheader('Content-Length', '-1')
+            connection.endheaders()
+            response= connection.getresponse()
+            response.read()
+            self.assertEquals(response.status, 400)
+        finally:
+            connection.close()
+    
+    def test_error_statuses(self):
+        '''Test telling malformed forms from internal errors and timeouts.'''
+        class FailingService(object):
+            def convert_json(self, json_text, **import_options):
+                raise {'value': ValueError, 'key': KeyError, 'attribute': AttributeError
+                       , 'timeout': ConversionTimeout}[json_text]('Failed.')
+        
+        server= ConversionServer(('127.0.0.1', 0), FailingService())
+        server_thread= threading.Thread(target=server.serve_forever)
+        server_thread.daemon= True
+        server_thread.start()
+        try:
+            statuses= list()
+            for error_name in ['value', 'key', 'attribute', 'timeout']:
+                connection= httplib.HTTPConnection(*server.server_address[:2])
+                try:
+                    connection.request('POST', '/convert', error_name)
+                    response= connection.getresponse()
+                    response.read()
+                    statuses.append(response.status)
+                finally:
+                    connection.close()
+            self.assertEquals(statuses, [400, 400, 500, 504])
+        finally:
+            server.shutdown()
+            server.server_close()
+    
+    def test_conversion_timeout(self):
+        '''Test giving up on conversions that take longer than the timeout.'''
+        service= ConversionService(jobs=1, timeout=0)
+        try:
+            self.assertRaises(ConversionTimeout, service.convert_json, self.form_text_json)
+        finally:
+            service.close()
+    
+    def test_metrics(self):
+        '''Test that the metrics endpoint reports the requests handled.'''
+        self.request('POST', '/convert', self.form_text_json)
+        status, metrics_json= self.request('GET', '/metrics')
+        self.assertEquals(status, 200)
+
+        metrics= json.loads(metrics_json)
+        self.assertGreaterEqual(metrics['requests'], 1)
+        self.assertGreater(metrics['bytes_out'], 0)
+        self.assertGreater(metrics['throughput'], 0)
+        self.assertIn('p99', metrics['latency_ms'])
+        self.assertIn('export', metrics['stage_seconds'])
+
+    def test_service_metrics(self):
+        '''Test the latency percentiles of :py:class:`ServiceMetrics`.'''
+        service_metrics= ServiceMetrics(latency_window=100)
+        for latency_ms in range(1, 201):
+            service_metrics.record(latency_ms / 1000., {'import': latency_ms / 2000., 'export': latency_ms / 2000.})
+        service_metrics.record(1., error=True)
+
+        snapshot= service_metrics.snapshot()
+        self.assertEquals((snapshot['requests'], snapshot['errors']), (201, 1))
+        self.assertAlmostEqual(snapshot['latency_ms']['p50'], 151.)
+        self.assertAlmostEqual(snapshot['latency_ms']['max'], 1000.)
+        self.assertAlmostEqual(snapshot['conversion_ms']['max'], 200.)
+        self.assertAlmostEqual(snapshot['stage_seconds']['import'], sum(range(1, 201)) / 2000.)
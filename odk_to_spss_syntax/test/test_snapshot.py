@@ -0,0 +1,115 @@
+# encoding: utf-8
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from ..variable_metadata import VariableMetadata
+from ..variable_metadata import ValueMapping
+from ..snapshot import Snapshot, MAGIC
+from ..main import main
+
+
+class TestSnapshot(unittest.TestCase):
+    '''
+    Test writing :py:class:`VariableMetadata` lists to binary snapshots and
+    reloading them.
+    '''
+
+    def setUp(self):
+        module_dir= os.path.dirname(os.path.realpath(__file__))
+        self.form_path= os.path.join(module_dir, 'test_form.json')
+        with open(self.form_path, 'r') as f:
+            self.form_variable_metadata_list= VariableMetadata.import_json(f.read())
+        self.temp_dir= tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def round_trip(self, variable_metadata_list):
+        snapshot_file= StringIO()
+        self.assertEquals(VariableMetadata.dump_snapshot(iter(variable_metadata_list), snapshot_file)
+                          , len(variable_metadata_list))
+        snapshot_file.seek(0)
+        return VariableMetadata.load_snapshot(snapshot_file)
+
+    def test_round_trip(self):
+        '''Test reloading the test form's metadata, with shared value mappings still shared.'''
+        snapshot= self.round_trip(self.form_variable_metadata_list)
+
+        self.assertEquals(list(snapshot), self.form_variable_metadata_list)
+        self.assertEquals(VariableMetadata.export_spss_syntax(snapshot)
+                          , VariableMetadata.export_spss_syntax(self.form_variable_metadata_list))
+        for variable_metadata in snapshot:
+            if variable_metadata.value_mappings != None:
+                self.assertIsInstance(variable_metadata.value_mappings, ValueMapping)
+
+    def test_strings_and_mappings(self):
+        '''Test unicode and missing labels, plain dictionaries and value order.'''
+        yes_no= ValueMapping.intern([('1', 'Oui, très'), ('0', 'Non')], 'form')
+        variable_metadata_list= [VariableMetadata('q1', u'Quéstion', yes_no)
+                                 , VariableMetadata('q2', None, yes_no)
+                                 , VariableMetadata('q3', 'Q3', {'b': 'B', 'a': 'A'})
+                                 , VariableMetadata('q4', 'Q4', None)]
+        snapshot= self.round_trip(variable_metadata_list)
+
+        self.assertEquals(len(snapshot), 4)
+        self.assertEquals(snapshot[0].label, u'Quéstion')
+        self.assertIsInstance(snapshot[0].label, unicode)
+        self.assertIsInstance(snapshot[0].name, str)
+        self.assertIs(snapshot[0].value_mappings, snapshot[1].value_mappings)
+        self.assertEquals(snapshot[1].value_mappings.ordered_names, ('1', '0'))
+        self.assertEquals(snapshot[1].label, None)
+        self.assertEquals(snapshot[2].value_mappings, {'a': 'A', 'b': 'B'})
+        self.assertEquals(snapshot[-1], variable_metadata_list[-1])
+        self.assertEquals(snapshot[1:3], variable_metadata_list[1:3])
+        self.assertRaises(IndexError, snapshot.__getitem__, 4)
+
+    def test_memory_mapped_file(self):
+        '''Test loading a snapshot from a path, and rejecting other files.'''
+        snapshot_path= os.path.join(self.temp_dir, 'form.odksnap')
+        with open(snapshot_path, 'wb') as snapshot_file:
+            VariableMetadata.dump_snapshot(self.form_variable_metadata_list, snapshot_file)
+
+        with VariableMetadata.load_snapshot(snapshot_path) as snapshot:
+            self.assertEquals(snapshot[3], self.form_variable_metadata_list[3])
+            self.assertEquals(list(snapshot), self.form_variable_metadata_list)
+
+        self.assertRaises(ValueError, VariableMetadata.load_snapshot, self.form_path)
+        self.assertRaises(ValueError, Snapshot, MAGIC + '\x02' + '\0' * 31)
+
+    def test_corrupt_snapshot(self):
+        '''Test that truncated or corrupt snapshots raise :py:class:`ValueError`.'''
+        snapshot_file= StringIO()
+        VariableMetadata.dump_snapshot(self.form_variable_metadata_list, snapshot_file)
+        snapshot_bytes= snapshot_file.getvalue()
+
+        for length in [len(snapshot_bytes) - 1, len(snapshot_bytes) // 2, 41]:
+            self.assertRaises(ValueError, Snapshot, snapshot_bytes[:length])
+        # A variable count past the end of the file.
+        self.assertRaises(ValueError, Snapshot, snapshot_bytes[:16] + '\xff\xff\x00\x00' + snapshot_bytes[20:])
+
+        # A variable whose string index is out of range is rejected when read.
+        corrupt_bytes= snapshot_bytes[:-12] + '\xfe\xff\x00\x00' + snapshot_bytes[-8:]
+        snapshot= Snapshot(corrupt_bytes)
+        self.assertEquals(snapshot[0], self.form_variable_metadata_list[0])
+        self.assertRaises(ValueError, snapshot.__getitem__, -1)
+
+    def test_cli(self):
+        '''Test the "--snapshot" and "--from-snapshot" command line options.'''
+        syntax_path= os.path.join(self.temp_dir, 'syntax.sps')
+        self.assertEquals(main([self.form_path, syntax_path, '--snapshot']), 0)
+        self.assertEquals(sorted(os.listdir(self.temp_dir)), ['syntax.odksnap', 'syntax.sps'])
+
+        reloaded_syntax_path= os.path.join(self.temp_dir, 'reloaded.sps')
+        self.assertEquals(main(['--from-snapshot', os.path.join(self.temp_dir, 'syntax.odksnap'), reloaded_syntax_path]), 0)
+        with open(syntax_path, 'r') as syntax_file:
+            with open(reloaded_syntax_path, 'r') as reloaded_syntax_file:
+                self.assertEquals(reloaded_syntax_file.read(), syntax_file.read())
@@ -0,0 +1,99 @@
+# encoding: utf-8
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import pickle
+
+from ..variable_metadata import VariableMetadata
+from ..variable_metadata import ValueMapping
+from ..spss_labels import truncate_utf8, spss_variable_name, spss_string_literal, format_value_labels
+from ..spss_labels import VARIABLE_LABEL_MAX_BYTES, VALUE_LABEL_MAX_BYTES, LINE_MAX_BYTES, VARIABLE_NAME_MAX_BYTES
+from .test_export_spss_syntax import parse_spss_syntax
+
+
+class TestSpssLabels(unittest.TestCase):
+    '''
+    Test escaping, truncating and continuing labels in exported SPSS syntax.
+    '''
+
+    def test_escape_quotes(self):
+        '''Test that embedded quotes are doubled and line breaks flattened.'''
+        self.assertEquals(spss_string_literal('Say "hi"'), '"Say ""hi"""')
+        self.assertEquals(spss_string_literal('Line 1\r\nLine 2'), '"Line 1 Line 2"')
+        self.assertEquals(spss_string_literal(u'Caf\xe9 "x"'), u'"Caf\xe9 ""x"""')
+
+        variable_metadata= VariableMetadata('v', 'A "quoted" label', {'1': 'It\'s "one"'})
+        variable_mappings, all_value_mappings= parse_spss_syntax(self, VariableMetadata.export_spss_syntax([variable_metadata]))
+        self.assertEquals(variable_mappings, {'v': 'A "quoted" label'})
+        self.assertEquals(all_value_mappings, {'v': {'1': 'It\'s "one"'}})
+
+    def test_spss_variable_name(self):
+        '''Test making generated names legal SPSS variable names.'''
+        self.assertEquals(spss_variable_name('colours/red'), 'colours_red')
+        self.assertEquals(spss_variable_name('grp-q1/dont know'), 'grp_q1_dont_know')
+        self.assertEquals(spss_variable_name('q1_ok'), 'q1_ok')
+        self.assertEquals(spss_variable_name('1st'), 'v1st')
+        self.assertEquals(spss_variable_name('_x'), 'v_x')
+        self.assertEquals(spss_variable_name('all'), 'all_')
+        self.assertEquals(spss_variable_name('q.'), 'q')
+        self.assertEquals(spss_variable_name(u'caf\xe9/cr\xe8me'), 'caf\xc3\xa9_cr\xc3\xa8me')
+        # Non-ASCII letters are kept, but not non-ASCII punctuation or spaces.
+        self.assertEquals(spss_variable_name(u'\u0627\u0633\u0645\u060c\u00a0\u2013x'), '\xd8\xa7\xd8\xb3\xd9\x85___x')
+        self.assertEquals(spss_variable_name(u'\u00bfq'), 'v_q')
+        self.assertEquals(spss_variable_name('\xc3\xa9t\xc3\xa9\xe2\x80\xa6'), '\xc3\xa9t\xc3\xa9_')
+        long_name= spss_variable_name('g' * 60 + '/' + '\xc3\xa9' * 4)
+        self.assertEquals(long_name, 'g' * 60 + '_' + '\xc3\xa9')
+        self.assertLessEqual(len(long_name), VARIABLE_NAME_MAX_BYTES)
+
+    def test_truncate_utf8(self):
+        '''Test that truncation counts bytes and never splits a character.'''
+        text= 'é' * 100 # 200 bytes.
+        self.assertEquals(truncate_utf8(text, 200), text)
+        self.assertEquals(truncate_utf8(text, 121), 'é' * 60)
+        self.assertEquals(truncate_utf8(text, 120), 'é' * 60)
+        self.assertEquals(truncate_utf8('abc', 2), 'ab')
+
+        variable_metadata= VariableMetadata('v', 'x' * 300, {'1': 'é' * 100})
+        variable_mappings, all_value_mappings= parse_spss_syntax(self, VariableMetadata.export_spss_syntax([variable_metadata]))
+        self.assertEquals(variable_mappings['v'], 'x' * VARIABLE_LABEL_MAX_BYTES)
+        self.assertEquals(all_value_mappings['v']['1'], 'é' * (VALUE_LABEL_MAX_BYTES // 2))
+        all_value_mappings['v']['1'].decode('utf-8')
+
+    def test_long_line_continuation(self):
+        '''Test that long labels and many values are continued over lines SPSS accepts.'''
+        value_pairs= [(str(value_number), 'Value label number %d "quoted"' % value_number)
+                      for value_number in range(50)]
+        variable_metadata= VariableMetadata('v' * 64, 'Long label "quoted" ' * 12, dict(value_pairs))
+        spss_syntax= VariableMetadata.export_spss_syntax([variable_metadata])
+
+        for line in spss_syntax.splitlines():
+            self.assertLessEqual(len(line), LINE_MAX_BYTES)
+        variable_mappings, all_value_mappings= parse_spss_syntax(self, spss_syntax)
+        self.assertEquals(variable_mappings, {variable_metadata.name: variable_metadata.label})
+        self.assertEquals(all_value_mappings, {variable_metadata.name: dict(value_pairs)})
+
+    def test_unicode_line_continuation(self):
+        '''Test that lines of non-ASCII value labels are measured in UTF-8 bytes.'''
+        value_pairs= [(str(value_number), u'\u0642\u064a\u0645\u0629 %d' % value_number + u'\u00e9' * 30)
+                      for value_number in range(20)]
+        value_labels= format_value_labels(value_pairs)
+
+        self.assertIsInstance(value_labels, unicode)
+        lines= ('/' + 'v' * 64 + ' ' + value_labels).split(u'\n')
+        self.assertTrue(len(lines) > 1)
+        for line in lines:
+            self.assertLessEqual(len(line.encode('utf-8')), LINE_MAX_BYTES)
+
+    def test_shared_value_labels_formatted_once(self):
+        '''Test that variables sharing a :py:class:`ValueMapping` share its formatted value labels.'''
+        value_mappings= ValueMapping.intern([('0', 'No'), ('1', 'Yes')])
+        self.assertIs(value_mappings.spss_value_labels(), value_mappings.spss_value_labels())
+        self.assertEquals(value_mappings.spss_value_labels(), format_value_labels(value_mappings.ordered_items()))
+        self.assertEquals(VariableMetadata('q1', 'Question 1', value_mappings)._to_spss_syntax()[1]
+                          , '/q1 0 "No" 1 "Yes"')
+        # The cache isn't pickled along with the mapping.
+        self.assertEquals(pickle.loads(pickle.dumps(value_mappings)), value_mappings)
@@ -0,0 +1,42 @@
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import os
+import subprocess
+import sys
+
+
+# Modules that importing the package, or asking the command line for its
+#   version, mustn't load.
+DEFERRED_MODULES= ('argparse', 'multiprocessing', 'tempfile', 'hashlib', 'odk_to_spss_syntax.cache'
+                   , 'odk_to_spss_syntax.exporters', 'odk_to_spss_syntax.xform', 'odk_to_spss_syntax.xlsform'
+                   , 'odk_to_spss_syntax.sav_writer', 'csv', 'odk_to_spss_syntax.data_labels'
+                   , 'odk_to_spss_syntax.json_stream')
+
+
+class TestStartup(unittest.TestCase):
+    '''
+    Test that the package's heavier dependencies are only loaded when used.
+    (See "benchmarks/startup.py" for the start up times themselves.)
+    '''
+
+    def loaded_modules(self, script):
+        '''The deferred modules a fresh interpreter has loaded after running a script.'''
+        package_parent_dir= os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+        script+= ('\nimport sys\nsys.stdout.write(" ".join(name for name in %r if sys.modules.get(name)))'
+                  % (DEFERRED_MODULES,))
+        with open(os.devnull, 'w') as devnull:
+            output= subprocess.check_output([sys.executable, '-c', script], cwd=package_parent_dir, stderr=devnull)
+        return output.split()
+
+    def test_import_package(self):
+        '''Test importing the package.'''
+        self.assertEquals(self.loaded_modules('import odk_to_spss_syntax'), [])
+
+    def test_version(self):
+        '''Test that "--version" is answered without building the argument parser.'''
+        self.assertEquals(self.loaded_modules('from odk_to_spss_syntax.main import main\nmain(["--version"])'), [])
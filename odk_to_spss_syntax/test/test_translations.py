@@ -0,0 +1,111 @@
+'''
+Created on Oct 18, 2026
+
+@author: Esmail Fadae
+'''
+
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from ..variable_metadata import VariableMetadata
+from ..main import from_json_translations
+from ..main import main
+
+
+class TestTranslations(unittest.TestCase):
+    '''Test importing and exporting the labels of multilingual forms.'''
+    
+    def setUp(self):
+        yes_no= [{'name': '1', 'label': {'English': 'Yes', 'French': 'Oui'}}
+                 , {'name': '0', 'label': {'English': 'No', 'French': 'Non'}}]
+        self.form_dict= {'type': 'survey', 'default_language': 'French'
+                         , 'children': [{'name': 'q1', 'type': 'select one', 'itemset': 'yes_no'
+                                         , 'label': {'English': 'Question 1', 'French': 'Question 1 (fr)'}}
+                                        , {'name': 'g', 'type': 'group'
+                                           , 'children': [{'name': 'q2', 'type': 'select one', 'itemset': 'yes_no'
+                                                           , 'label': {'English': 'Question 2', 'French': 'Question 2 (fr)'}}
+                                                          , {'name': 'q3', 'type': 'select one', 'label': 'Untranslated'
+                                                             , 'children': [{'name': '1', 'label': {'English': 'One'}}]}]}
+                                        , {'name': 'start', 'type': 'start'}]
+                         , 'choices': {'yes_no': yes_no}}
+        self.form_json= json.dumps(self.form_dict)
+        
+        self.french_variable_metadata_list= [VariableMetadata('q1', 'Question 1 (fr)', {'0': 'Non', '1': 'Oui'})
+                                             , VariableMetadata('q2', 'Question 2 (fr)', {'0': 'Non', '1': 'Oui'})
+                                             , VariableMetadata('q3', 'Untranslated', {'1': 'One'})
+                                             , VariableMetadata('start', None, None)]
+        self.english_variable_metadata_list= [VariableMetadata('q1', 'Question 1', {'0': 'No', '1': 'Yes'})
+                                              , VariableMetadata('q2', 'Question 2', {'0': 'No', '1': 'Yes'})
+                                              , VariableMetadata('q3', 'Untranslated', {'1': 'One'})
+                                              , VariableMetadata('start', None, None)]
+    
+    def test_import_json_language(self):
+        '''Test selecting the language of translated labels.'''
+        self.assertEquals(VariableMetadata.import_json(self.form_json), self.french_variable_metadata_list)
+        self.assertEquals(VariableMetadata.import_json(self.form_json, language='English')
+                          , self.english_variable_metadata_list)
+        self.assertEquals(list(VariableMetadata.iter_import_json_stream(StringIO(self.form_json), language='English'))
+                          , self.english_variable_metadata_list)
+    
+    def test_import_json_stream_default_language(self):
+        '''Test that streamed imports take untranslated labels from the form's default language too.'''
+        for form_json in [self.form_json, json.dumps(self.form_dict, sort_keys=True)]:
+            for chunk_size in [8, 4096]:
+                self.assertEquals(list(VariableMetadata.iter_import_json_stream(StringIO(form_json), chunk_size))
+                                  , VariableMetadata.import_json(form_json))
+        self.assertEquals(VariableMetadata.import_json(self.form_json), self.french_variable_metadata_list)
+        
+        temp_dir= tempfile.mkdtemp()
+        try:
+            form_path= os.path.join(temp_dir, 'form.json')
+            with open(form_path, 'w') as f:
+                f.write(self.form_json)
+            syntax_paths= [os.path.join(temp_dir, 'stream.sps'), os.path.join(temp_dir, 'syntax.sps')]
+            cache_dir= os.path.join(temp_dir, 'cache')
+            self.assertEquals(main(['--stream', '--cache-dir', cache_dir, form_path, syntax_paths[0]]), 0)
+            self.assertEquals(main(['--cache-dir', cache_dir, form_path, syntax_paths[1]]), 0)
+            syntax_texts= list()
+            for syntax_path in syntax_paths:
+                with open(syntax_path, 'r') as f:
+                    syntax_texts.append(f.read())
+            self.assertEquals(syntax_texts[0], syntax_texts[1])
+            self.assertIn('Question 1 (fr)', syntax_texts[0])
+        finally:
+            shutil.rmtree(temp_dir)
+    
+    def test_import_json_translations(self):
+        '''Test importing every language from a single parse.'''
+        translations= VariableMetadata.import_json_translations(self.form_json)
+        
+        self.assertEquals(translations.keys(), ['English', 'French'])
+        self.assertEquals(translations['English'], self.english_variable_metadata_list)
+        self.assertEquals(translations['French'], self.french_variable_metadata_list)
+        # Shared choice lists are still shared within each language.
+        self.assertIs(translations['English'][0].value_mappings, translations['English'][1].value_mappings)
+        
+        self.assertEquals(VariableMetadata.import_json_translations(self.form_json, ['French']).keys(), ['French'])
+        untranslated_form_json= json.dumps({'type': 'survey', 'children': [{'name': 'q', 'type': 'text', 'label': 'Q'}]})
+        self.assertEquals(VariableMetadata.import_json_translations(untranslated_form_json)
+                          , {None: [VariableMetadata('q', 'Q', None)]})
+    
+    def test_cli_languages(self):
+        '''Test writing a syntax file per language from the command line.'''
+        temp_dir= tempfile.mkdtemp()
+        try:
+            form_path= os.path.join(temp_dir, 'form.json')
+            with open(form_path, 'w') as f:
+                f.write(self.form_json)
+            
+            main(['--language', 'all', form_path, os.path.join(temp_dir, 'syntax.sps')])
+            
+            self.assertEquals(sorted(os.listdir(temp_dir)), ['form.json', 'syntax.English.sps', 'syntax.French.sps'])
+            expected_translations= from_json_translations(self.form_json)
+            for language in ['English', 'French']:
+                with open(os.path.join(temp_dir, 'syntax.%s.sps' % language), 'r') as f:
+                    self.assertEquals(f.read(), expected_translations[language])
+        finally:
+            shutil.rmtree(temp_dir)
@@ -4,9 +4,462 @@ Created on Jun 13, 2014
 .. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
 '''
 
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
+from StringIO import StringIO
+import cStringIO
 import json
 import re
+import weakref
+
+from profiling import NULL_METRICS
+from spss_labels import VARIABLE_LABEL_MAX_BYTES, spss_variable_name, unique_variable_name, spss_string_literal
+from spss_labels import format_value_labels
+
+
+def _is_seekable(fileobj):
+    '''Whether a file-like object supports random access.'''
+    try:
+        fileobj.seek(fileobj.tell())
+    except (AttributeError, IOError, OSError):
+        return False
+    return True
+
+
+def _write_text(fileobj, text):
+    '''
+    Write to a binary file object (e.g. a temporary file), encoding any 
+    :py:class:`unicode` text as UTF-8 first.
+    '''
+    
+    if isinstance(text, unicode):
+        text= text.encode('utf-8')
+    fileobj.write(text)
+
+
+def _spool_to_disk(memory_spool):
+    '''
+    Move a spool's content from memory to a temporary file, importing 
+    ``tempfile`` only now so that small exports (and importing the package) 
+    don't pay for it.
+    
+    :param memory_spool: A :py:mod:`cStringIO` buffer of encoded text.
+    :returns: The temporary file, positioned after the content.
+    '''
+    
+    import tempfile
+    
+    disk_spool= tempfile.TemporaryFile()
+    disk_spool.write(memory_spool.getvalue())
+    memory_spool.close()
+    return disk_spool
+
+
+# A derived variable's name in a "calculate" expression, quoted and followed 
+#   by a colon (e.g. "concat('uuid:', uuid())"). Neither the name nor its 
+#   delimiters can overlap, so scanning is linear in the expression's length.
+_CALCULATED_VAR_NAME_RE= re.compile(r'''['"]([^'":\s]+):''')
+
+# The orders in which value labels can be exported.
+VALUE_ORDERS= ('form', 'lexicographic', 'numeric')
+DEFAULT_VALUE_ORDER= 'numeric'
+
+# The value labels of the 0/1 variable of each option of a "select multiple" 
+#   question.
+SELECTED_VALUE_PAIRS= (('0', 'Not selected'), ('1', 'Selected'))
+# Joins the names of a "select multiple" question and of one of its options 
+#   in the name of the option's variable (e.g. "colours_red"); ODK's CSV 
+#   exports join them with "/", which SPSS doesn't allow in names.
+OPTION_NAME_SEPARATOR= '_'
+# Joins the names of the groups (and repeats) enclosing a question in its 
+#   group path, as in ODK's CSV exports (e.g. "household/member"). Variables 
+#   named after their group path get the legal SPSS form of the path 
+#   (e.g. "household_member_age").
+GROUP_PATH_SEPARATOR= '/'
+
+
+def _numeric_sort_key(value_name):
+    '''
+    Sort numeric value names (e.g. "2", "10") numerically and ahead of any 
+    others, which are sorted lexicographically.
+    '''
+    
+    try:
+        return (0, float(value_name), value_name)
+    except ValueError:
+        return (1, 0, value_name)
+
+
+def sort_value_names(value_names, value_order=DEFAULT_VALUE_ORDER):
+    '''
+    :param value_names: Encoded value names, in form order.
+    :param str value_order: One of :py:data:`VALUE_ORDERS`.
+    :returns: The value names in the requested order.
+    :rtype: list(str)
+    '''
+    
+    if value_order == 'form':
+        return list(value_names)
+    elif value_order == 'lexicographic':
+        return sorted(value_names)
+    elif value_order == 'numeric':
+        return sorted(value_names, key=_numeric_sort_key)
+    raise ValueError('Unknown value order "%s"; expected one of %s.' % (value_order, ', '.join(VALUE_ORDERS)))
+
+
+class ValueMapping(dict):
+    '''
+    An immutable, hashable :py:class:`dict` mapping encoded value names to 
+    value labels, which also records the order in which to export them. Use 
+    :py:meth:`intern` to obtain instances, so that every question using the 
+    same choice list (e.g. "yes"/"no") shares a single object, sorted once, 
+    instead of carrying its own copy of the labels.
+    
+    :param value_pairs: The value mappings, as a :py:class:`dict` or as (value name, value label) pairs in form order.
+    :param str value_order: One of :py:data:`VALUE_ORDERS`.
+    '''
+    
+    __slots__= ('value_order', 'ordered_names', '_hash', '_spss_value_labels', '__weakref__')
+    
+    # The canonical instance for each distinct content and order; entries 
+    #   disappear once no metadata refers to them any more.
+    _interned= weakref.WeakValueDictionary()
+    
+    def __init__(self, value_pairs=(), value_order=DEFAULT_VALUE_ORDER):
+        value_pairs= _value_pair_list(value_pairs)
+        dict.__init__(self, value_pairs)
+        self.value_order= value_order
+        #: The value names in export order.
+        self.ordered_names= tuple(sort_value_names([value_name for value_name, _label in value_pairs]
+                                                   , value_order))
+        self._hash= None
+        self._spss_value_labels= None
+    
+    @classmethod
+    def intern(cls, value_pairs, value_order=DEFAULT_VALUE_ORDER):
+        '''
+        :param value_pairs: The value mappings to look up, as a :py:class:`dict` or as (value name, value label) pairs in form order.
+        :param str value_order: One of :py:data:`VALUE_ORDERS`.
+        :returns: The shared :py:class:`ValueMapping` with the same content and order, created (and sorted) if necessary.
+        :rtype: :py:class:`ValueMapping`
+        '''
+        
+        value_pairs= _value_pair_list(value_pairs)
+        if value_order == 'form':
+            content_key= (value_order, tuple(value_pairs))
+        else:
+            content_key= (value_order, frozenset(value_pairs))
+        value_mapping= cls._interned.get(content_key)
+        if value_mapping == None:
+            value_mapping= cls(value_pairs, value_order)
+            cls._interned[content_key]= value_mapping
+        return value_mapping
+    
+    def ordered_items(self):
+        '''
+        :returns: (value name, value label) pairs in export order.
+        :rtype: list(tuple(str, str))
+        '''
+        
+        return [(value_name, self[value_name]) for value_name in self.ordered_names]
+    
+    def spss_value_labels(self):
+        '''
+        :returns: The value labels formatted for a "VALUE LABELS" line, as by :py:func:`format_value_labels`; formatted only once however many variables share this object.
+        :rtype: str
+        '''
+        
+        if self._spss_value_labels == None:
+            self._spss_value_labels= format_value_labels(self.ordered_items())
+        return self._spss_value_labels
+    
+    def __hash__(self):
+        if self._hash == None:
+            self._hash= hash(frozenset(self.iteritems()))
+        return self._hash
+    
+    def __reduce__(self):
+        # Unpickled copies are interned too.
+        return (_intern_value_mapping, (self.ordered_items(), self.value_order))
+    
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('%s objects are immutable.' % type(self).__name__)
+    
+    __setitem__= __delitem__= clear= pop= popitem= setdefault= update= _immutable
+
+
+def _value_pair_list(value_pairs):
+    '''Normalize a :py:class:`dict` or iterable of pairs to a list of pairs.'''
+    if isinstance(value_pairs, ValueMapping):
+        return value_pairs.ordered_items()
+    elif isinstance(value_pairs, dict):
+        return value_pairs.items()
+    return list(value_pairs)
+
+
+def _intern_value_mapping(value_pairs, value_order):
+    '''Module-level (and so picklable) alias of :py:meth:`ValueMapping.intern`.'''
+    return ValueMapping.intern(value_pairs, value_order)
+
+
+def _translate_label(label, language=None, default_language=None):
+    '''
+    Pick the text of an ODK label, which in multilingual forms is a 
+    :py:class:`dict` keyed by language (e.g. ``{"English": "Yes", "French": "Oui"}``).
+    
+    :param label: The label, or ``None``.
+    :param str language: The language wanted; falls back on ``default_language``, then "default", then the first language in sorted order if the label lacks it.
+    :param str default_language: The form's default language.
+    :returns: The encoded label text, or ``None``.
+    :rtype: str
+    '''
+    
+    if isinstance(label, dict):
+        for candidate_language in (language, default_language, 'default'):
+            if candidate_language != None and candidate_language in label:
+                label= label[candidate_language]
+                break
+        else:
+            if len(label) == 0:
+                return None
+            label= label[sorted(label)[0]]
+    if label == None:
+        return None
+    return label.encode('utf-8')
+
+
+def _label_languages(label):
+    '''The languages a label has translations for, if any.'''
+    if isinstance(label, dict):
+        return label.keys()
+    return ()
+
+
+def _choice_value_pairs(choice_dicts, language=None, default_language=None):
+    '''
+    :param list choice_dicts: ODK choices (e.g. ``{"name": "1", "label": "Yes"}``).
+    :param str language: The language of the labels to take, as for :py:func:`_translate_label`.
+    :param str default_language: The form's default language.
+    :returns: (value name, value label) pairs in form order.
+    :rtype: list(tuple(str, str))
+    '''
+    
+    value_pairs= list()
+    for choice in choice_dicts:
+        value_name= choice['name'].encode('utf-8')
+        value_label= _translate_label(choice.get('label'), language, default_language)
+        if value_label == None:
+            value_label= value_name
+        value_pairs.append((value_name, value_label))
+    return value_pairs
+
+
+def option_name_suffixes(value_pairs):
+    '''
+    :param value_pairs: A "select multiple" question's (value name, value label) pairs in form order.
+    :returns: The (variable name suffix, label) of each option's 0/1 variable, in form order; appended to the question's name and label, they name and label the variables.
+    :rtype: tuple(tuple(str, str))
+    '''
+    
+    return tuple((OPTION_NAME_SEPARATOR + value_name, value_label) for value_name, value_label in value_pairs)
+
+
+def _iter_form_vars(odk_form_dict, metrics):
+    '''
+    :param dict odk_form_dict: The ODK form parsed into a :py:class:`dict`.
+    :param metrics: Counts the groups and repeats walked.
+    :returns: The form's questions (i.e. everything but its groups and repeats), in form order.
+    :rtype: generator(dict)
+    '''
+    
+    for form_var, _group_path, _repeat_path in _iter_scoped_form_vars(odk_form_dict, metrics):
+        yield form_var
+
+
+def _iter_scoped_form_vars(odk_form_dict, metrics):
+    '''
+    Walk a form's groups and repeats with an explicit stack rather than 
+    recursion, so arbitrarily deep nesting neither copies intermediate 
+    results nor hits the interpreter's recursion limit.
+    
+    :param dict odk_form_dict: The ODK form parsed into a :py:class:`dict`.
+    :param metrics: Counts the groups and repeats walked.
+    :returns: The form's questions (i.e. everything but its groups and repeats), in form order, each with the names of the groups and repeats enclosing it and the path of the innermost repeat among them (or ``()``). The paths are shared by the questions of a group, not built for each.
+    :rtype: generator(tuple(dict, tuple(unicode), tuple(unicode)))
+    '''
+    
+    # One (iterator, group path, repeat path) per group currently being 
+    #   walked, innermost last.
+    children_iter_stack= [(iter(odk_form_dict['children']), (), ())]
+    while len(children_iter_stack) != 0:
+        children_iter, group_path, repeat_path= children_iter_stack[-1]
+        form_var= next(children_iter, None)
+        if form_var == None:
+            # Finished with this group.
+            children_iter_stack.pop()
+            continue
+        
+        if form_var['type'] == 'group':
+            # Descend into groups.
+            children_iter_stack.append((iter(form_var['children']), group_path + (form_var['name'],), repeat_path))
+            metrics.count('groups')
+            continue
+        if form_var['type'] == 'repeat':
+            # Repeats are groups whose questions are exported as tables of 
+            #   their own.
+            repeat_group_path= group_path + (form_var['name'],)
+            children_iter_stack.append((iter(form_var.get('children', ())), repeat_group_path, repeat_group_path))
+            metrics.count('repeats')
+            continue
+        
+        yield form_var, group_path, repeat_path
+
+
+def _iter_streamed_form_vars(tree_events, metrics):
+    '''
+    Like :py:func:`_iter_form_vars`, but walk a form as it is read, from the 
+    events of :py:func:`odk_to_spss_syntax.json_stream.iter_tree_events` 
+    over its "children". Groups and repeats are never built: each question 
+    is yielded as soon as it ends, so only the current question (and the 
+    groups enclosing it, without their children) is held in memory.
+    
+    A node's "type" may come after its "children", so whether a node is a 
+    question or a choice is only known when it ends: choices are those 
+    without a "type", and are gathered into their question's "children".
+    
+    :param tree_events: The events of the form's "children".
+    :param metrics: Counts the groups and repeats walked.
+    :returns: The form's questions (i.e. everything but its groups and repeats), in form order.
+    :rtype: generator(dict)
+    '''
+    
+    # The choices gathered so far for each node currently open, innermost 
+    #   last.
+    choices_stack= list()
+    for event, node in tree_events:
+        if event == 'start_node':
+            choices_stack.append(list())
+            continue
+        
+        choices= choices_stack.pop()
+        if not isinstance(node, dict) or 'type' not in node:
+            # A choice, if it belongs to anything.
+            if len(choices_stack) != 0:
+                choices_stack[-1].append(node)
+            continue
+        if node['type'] == 'group':
+            metrics.count('groups')
+            continue
+        if node['type'] == 'repeat':
+            metrics.count('repeats')
+            continue
+        if len(choices) != 0:
+            node['children']= choices
+        yield node
+
+
+class ChoiceIndex(object):
+    '''
+    An index of a form's shared choice lists (the survey-level "choices" of 
+    pyxform JSON, i.e. an XLSForm's "choices" sheet), by list name. Each list 
+    is converted to a :py:class:`ValueMapping` the first time it is 
+    referenced and then reused by every question that refers to it.
+    
+    :param choice_tables: The form's "choices", either a :py:class:`dict` from list name to choices or a list of choices that each carry a "list_name".
+    :param str value_order: One of :py:data:`VALUE_ORDERS`.
+    :param load_choice_tables: Optionally, a function to call (once) for the form's "choices" if a list isn't found in ``choice_tables``.
+    :param str default_language: The form's default language, for choices with translated labels.
+    '''
+    
+    def __init__(self, choice_tables=None, value_order=DEFAULT_VALUE_ORDER, load_choice_tables=None
+                 , default_language=None):
+        self._choice_tables= self._by_list_name(choice_tables)
+        self._value_order= value_order
+        self._load_choice_tables= load_choice_tables
+        self._default_language= default_language
+        # (List name, language) -> :py:class:`ValueMapping`.
+        self._value_mappings= dict()
+        # (List name, language) -> :py:func:`option_name_suffixes`.
+        self._options= dict()
+        #: The value labels shared by every option variable of "select multiple" questions.
+        self.selected_value_mappings= ValueMapping.intern(SELECTED_VALUE_PAIRS, value_order)
+    
+    @staticmethod
+    def _by_list_name(choice_tables):
+        if choice_tables == None:
+            return dict()
+        if isinstance(choice_tables, dict):
+            return choice_tables
+        by_list_name= dict()
+        for choice in choice_tables:
+            by_list_name.setdefault(choice['list_name'], list()).append(choice)
+        return by_list_name
+    
+    def _load(self):
+        if self._load_choice_tables != None:
+            self._choice_tables= self._by_list_name(self._load_choice_tables())
+            self._load_choice_tables= None
+    
+    def get(self, list_name, language=None):
+        '''
+        :param str list_name: The name of the choice list.
+        :param str language: The language of the labels to take, if they are translated.
+        :returns: The list's value mappings, or ``None`` if the form has no such list.
+        :rtype: :py:class:`ValueMapping`
+        '''
+        
+        value_mappings= self._value_mappings.get((list_name, language))
+        if value_mappings != None:
+            return value_mappings
+        
+        value_pairs= self._value_pairs(list_name, language)
+        if value_pairs == None:
+            return None
+        
+        value_mappings= ValueMapping.intern(value_pairs, self._value_order)
+        self._value_mappings[(list_name, language)]= value_mappings
+        return value_mappings
+    
+    def options(self, list_name, language=None):
+        '''
+        :param str list_name: The name of the choice list.
+        :param str language: The language of the labels to take, if they are translated.
+        :returns: The list's option variable name suffixes and labels, as by :py:func:`option_name_suffixes`; built only once however many "select multiple" questions use the list. ``None`` if the form has no such list.
+        :rtype: tuple(tuple(str, str))
+        '''
+        
+        options= self._options.get((list_name, language))
+        if options != None:
+            return options
+        
+        value_pairs= self._value_pairs(list_name, language)
+        if value_pairs == None:
+            return None
+        
+        options= option_name_suffixes(value_pairs)
+        self._options[(list_name, language)]= options
+        return options
+    
+    def _value_pairs(self, list_name, language):
+        if list_name not in self._choice_tables:
+            self._load()
+        choice_dicts= self._choice_tables.get(list_name)
+        if choice_dicts == None:
+            return None
+        return _choice_value_pairs(choice_dicts, language, self._default_language)
+    
+    def languages(self):
+        '''
+        :returns: The languages that any choice's label is translated into.
+        :rtype: set(str)
+        '''
+        
+        self._load()
+        languages= set()
+        for choice_dicts in self._choice_tables.itervalues():
+            for choice in choice_dicts:
+                languages.update(_label_languages(choice.get('label')))
+        return languages
+
 
 class VariableMetadata(namedtuple('_VariableMetadata', 'name, label, value_mappings')):
     '''
@@ -17,8 +470,15 @@ class VariableMetadata(namedtuple('_VariableMetadata', 'name, label, value_mappi
     
     :param str name: The encoded name of the variable (e.g. "a01")
     :param str label: The variable's readable label (e.g. "What is your sex?")
-    :param dict value_mappings: A dictionary that maps encoded value names (e.g. "0", "1") to value labels (e.g. "Female", "Male")
+    :param dict value_mappings: A dictionary that maps encoded value names (e.g. "0", "1") to value labels (e.g. "Female", "Male"). Imported metadata uses shared :py:class:`ValueMapping` objects.
     '''
+    
+    # Don't give every instance its own attribute dictionary.
+    __slots__= ()
+    
+    # Bytes of value label lines held in memory by :py:meth:`write_spss_syntax` 
+    #   before spilling over to disk.
+    VALUE_LABEL_SPOOL_SIZE= 4 * 1024 * 1024
 
     def _to_spss_syntax(self):
         '''
@@ -28,34 +488,109 @@ class VariableMetadata(namedtuple('_VariableMetadata', 'name, label, value_mappi
         :rtype: tuple(str, str)
         '''
         
-        # TODO: Should labels be truncated to 116 characters?
+        # Labels are escaped, truncated to SPSS's limits and split over 
+        #   continuation lines if need be (see :py:mod:`spss_labels`).
         
         # Variable labels aren't always specified.
-        variable_label_line= '/' + self.name + ' "'
         if self.label == None:
-            variable_label_line+= self.name + '"'
+            variable_label_line= '/' + self.name + ' ' + spss_string_literal(self.name, VARIABLE_LABEL_MAX_BYTES)
         else:
-            variable_label_line+= self.label + '"'
+            variable_label_line= '/' + self.name + ' ' + spss_string_literal(self.label, VARIABLE_LABEL_MAX_BYTES)
         
         # There aren't always value labels to report.
         if self.value_mappings == None:
             value_label_line= None
-        else:        
-            value_label_line= '/' + self.name
-            sorted_value_names= self.value_mappings.keys()
-            sorted_value_names.sort()
-            for value_name in sorted_value_names:
-                value_label= self.value_mappings[value_name]
-                value_label_line+= ' ' + value_name + ' "' + value_label + '"'
+        elif isinstance(self.value_mappings, ValueMapping):
+            # Already sorted, and formatted the first time it was exported.
+            value_label_line= '/' + self.name + ' ' + self.value_mappings.spss_value_labels()
+        else:
+            sorted_value_names= sort_value_names(self.value_mappings.keys())
+            value_label_line= '/' + self.name + ' ' + format_value_labels(
+                (value_name, self.value_mappings[value_name]) for value_name in sorted_value_names)
         
         return variable_label_line, value_label_line
 
 
+    @classmethod
+    def write_spss_syntax(cls, variable_metadata_iter, fileobj):
+        '''
+        Stream the supplied :py:class:`VariableMetadata` objects to a 
+        file-like object as SPSS syntax. Variable label lines are written as 
+        soon as each object is consumed; value label lines are spooled to a 
+        temporary file (kept in memory while small) and appended once the 
+        "VARIABLE LABELS" section is complete, so the input is traversed only 
+        once and may be any iterable, including a generator.
+        
+        :param variable_metadata_iter: The metadata to export.
+        :type variable_metadata_iter: iterable(:py:class:`VariableMetadata`)
+        :param fileobj: A writable file-like object to receive the syntax.
+        :returns: The number of variables written.
+        :rtype: int
+        '''
+        
+        syntax_line_pairs= (var_metadata._to_spss_syntax() for var_metadata in variable_metadata_iter)
+        return cls.write_spss_syntax_lines(syntax_line_pairs, fileobj)
+
+
+    @classmethod
+    def write_spss_syntax_lines(cls, syntax_line_pairs, fileobj):
+        '''
+        The workhorse of :py:meth:`write_spss_syntax`, taking the already 
+        formatted lines of each variable (as returned by 
+        :py:meth:`_to_spss_syntax`) so that lines generated earlier can be 
+        reused.
+        
+        :param syntax_line_pairs: Pairs of variable label line and value label line (or ``None``).
+        :type syntax_line_pairs: iterable(tuple(str, str))
+        :param fileobj: A writable file-like object to receive the syntax.
+        :returns: The number of variables written.
+        :rtype: int
+        '''
+        
+        variable_count= 0
+        # Kept in memory until it outgrows ``VALUE_LABEL_SPOOL_SIZE``.
+        value_label_spool= cStringIO.StringIO()
+        is_spooled_to_disk= False
+        try:
+            has_value_labels= False
+            has_unicode_value_labels= False
+            for var_label_line, val_label_line in syntax_line_pairs:
+                if variable_count == 0:
+                    fileobj.write('VARIABLE LABELS\n')
+                    # No prepending "/" on the first variable label line.
+                    var_label_line= var_label_line[1:]
+                fileobj.write(var_label_line + '\n')
+                variable_count+= 1
+                
+                if val_label_line != None:
+                    _write_text(value_label_spool, val_label_line + '\n')
+                    if not is_spooled_to_disk and value_label_spool.tell() > cls.VALUE_LABEL_SPOOL_SIZE:
+                        value_label_spool= _spool_to_disk(value_label_spool)
+                        is_spooled_to_disk= True
+                    has_value_labels= True
+                    if isinstance(val_label_line, unicode):
+                        has_unicode_value_labels= True
+            
+            # There aren't always value labels to report.
+            if has_value_labels:
+                fileobj.write('\nVALUE LABELS\n')
+                value_label_spool.seek(0)
+                for val_label_line in value_label_spool:
+                    if has_unicode_value_labels:
+                        val_label_line= val_label_line.decode('utf-8')
+                    fileobj.write(val_label_line)
+        finally:
+            value_label_spool.close()
+        
+        return variable_count
+
+
     @classmethod
     def export_spss_syntax(cls, variable_metadata_list):
         '''
         Export the supplied :py:class:`VariableMetadata` objects to a string for 
-        use in an SPSS syntax file.
+        use in an SPSS syntax file. A convenience wrapper around 
+        :py:meth:`write_spss_syntax`.
         
         :param variable_metadata_list: The metadata to export.
         :type variable_metadata_list: list(:py:class:`VariableMetadata`)
@@ -63,109 +598,495 @@ class VariableMetadata(namedtuple('_VariableMetadata', 'name, label, value_mappi
         :rtype: :py:class:`String`
         '''
         
-        if len(variable_metadata_list) == 0:
-            return ''
+        syntax_buffer= StringIO()
+        cls.write_spss_syntax(variable_metadata_list, syntax_buffer)
+        return syntax_buffer.getvalue()
+
 
-        variable_label_lines= list()
-        value_label_lines= list()
-        for var_metadata in variable_metadata_list:
-            var_label_line,  val_label_line= var_metadata._to_spss_syntax()
-            if var_label_line != None:
-                variable_label_lines.append(var_label_line)
-            if val_label_line != None:
-                value_label_lines.append(val_label_line)
+    @classmethod
+    def write_sav(cls, variable_metadata_iter, sav_file, data_rows=None, **sav_options):
+        '''
+        An alternative to :py:meth:`write_spss_syntax`: write the supplied 
+        metadata directly to the dictionary of an SPSS system (".sav") file, 
+        optionally followed by data. See 
+        :py:func:`odk_to_spss_syntax.sav_writer.write_sav`.
         
-        # Remove the prepending "/" from the first variable label line.
-        variable_label_lines[0]= variable_label_lines[0].split('/')[1]
+        :param variable_metadata_iter: The metadata to write.
+        :type variable_metadata_iter: iterable(:py:class:`VariableMetadata`)
+        :param sav_file: A writable binary file-like object.
+        :param data_rows: If supplied, the cases to write, each a mapping from variable names to values.
+        :type data_rows: iterable(dict)
+        :returns: The number of variables and the number of cases written.
+        :rtype: tuple(int, int)
+        '''
         
-        syntax_string= 'VARIABLE LABELS\n'
-        for var_label_line in variable_label_lines:
-            syntax_string+= var_label_line + '\n'
+        import sav_writer
+        return sav_writer.write_sav(variable_metadata_iter, sav_file, data_rows, **sav_options)
+
+
+    @classmethod
+    def dump_snapshot(cls, variable_metadata_iter, snapshot_file):
+        '''
+        Write the supplied metadata to a compact binary snapshot, which 
+        :py:meth:`load_snapshot` reloads without parsing the form again. See 
+        :py:mod:`odk_to_spss_syntax.snapshot`.
         
-        # There aren't always value labels to report.
-        if len(value_label_lines) != 0:
-            syntax_string+= '\nVALUE LABELS\n'
-            for val_label_line in value_label_lines:
-                syntax_string+= val_label_line + '\n'
+        :param variable_metadata_iter: The metadata to write.
+        :type variable_metadata_iter: iterable(:py:class:`VariableMetadata`)
+        :param snapshot_file: A writable binary file-like object.
+        :returns: The number of variables written.
+        :rtype: int
+        '''
         
+        import snapshot
+        return snapshot.dump_snapshot(variable_metadata_iter, snapshot_file)
+
+
+    @classmethod
+    def load_snapshot(cls, snapshot_file):
+        '''
+        Open a snapshot written by :py:meth:`dump_snapshot`. The file is 
+        memory-mapped where possible and each variable decoded only when it 
+        is accessed.
         
-        return syntax_string
+        :param snapshot_file: The path of a snapshot or a readable binary file-like object containing one.
+        :returns: A read-only sequence of the snapshot's metadata.
+        :rtype: :py:class:`odk_to_spss_syntax.snapshot.Snapshot`
+        :raises ValueError: If the file isn't a snapshot of a supported version.
+        '''
+        
+        import snapshot
+        return snapshot.load_snapshot(snapshot_file, cls)
 
 
     @classmethod
-    def import_dicts(cls, variable_labels_dict, value_labels_dict):
+    def import_dicts(cls, variable_labels_dict, value_labels_dict, value_order=DEFAULT_VALUE_ORDER):
+        '''
+        Build metadata from mappings of variable labels and value labels, 
+        e.g. those of an existing dataset.
+        
+        :param variable_labels_dict: The variable labels, as a :py:class:`dict` from variable names or as (variable name, variable label) pairs in variable order.
+        :param dict value_labels_dict: A mapping from variable names to value mappings, each a :py:class:`dict` or (value name, value label) pairs.
+        :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+        :returns: A :py:class:`VariableMetadata` object per labelled variable, followed by one per variable with value labels but no variable label (in the order of ``value_labels_dict``).
+        :rtype: list(:py:class:`VariableMetadata`)
+        '''
+        
         variable_metadata_list= list()
         
-        # TODO: This doesn't address the (rare) cases of labeled values whose corresponding variable lacks a label.
-        for variable_name, variable_label in variable_labels_dict:
+        labelled_var_names= set()
+        for variable_name, variable_label in _value_pair_list(variable_labels_dict):
+            labelled_var_names.add(variable_name)
             value_mappings= value_labels_dict.get(variable_name)
+            if value_mappings != None:
+                value_mappings= ValueMapping.intern(value_mappings, value_order)
             variable_metadata_list.append(cls(variable_name, variable_label, value_mappings))
         
+        # Labelled values whose variable lacks a label.
+        for variable_name, value_mappings in value_labels_dict.iteritems():
+            if variable_name not in labelled_var_names and value_mappings != None:
+                variable_metadata_list.append(cls(variable_name, None, ValueMapping.intern(value_mappings, value_order)))
+        
         return variable_metadata_list
 
 
     @classmethod
-    def import_json(cls, odk_json_text):
+    def import_json(cls, odk_json_text, value_order=DEFAULT_VALUE_ORDER, language=None):
         '''
         Parse question metadata (e.g. names, labels, value mappings) from the 
         supplied JSON-formatted ODK form text.
         
         :param str odk_json_text: The JSON-formatted text of the form being imported.
+        :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+        :param str language: The language to take translated labels from; by default, the form's default language.
         :returns: :py:class:`VariableMetadata` objects that correspond to the JSON form's questions.
         :rtype: list(:py:class:`VariableMetadata`) 
         '''
         
         form_dict= json.loads(odk_json_text)
-        return cls._import(form_dict)
+        return list(cls.iter_import(form_dict, value_order, language=language))
+
+
+    @classmethod
+    def import_json_translations(cls, odk_json_text, languages=None, value_order=DEFAULT_VALUE_ORDER):
+        '''
+        Like :py:meth:`import_json`, but import the metadata in several 
+        languages at once from a single parse of the form. See 
+        :py:meth:`import_translations`.
+        
+        :param str odk_json_text: The JSON-formatted text of the form being imported.
+        :param languages: The languages to import; by default, every language the form's labels are translated into.
+        :type languages: list(str)
+        :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+        :returns: The :py:class:`VariableMetadata` objects of each language, in the order of ``languages``.
+        :rtype: :py:class:`collections.OrderedDict`
+        '''
+        
+        return cls.import_translations(json.loads(odk_json_text), languages, value_order)
+
+
+    @classmethod
+    def iter_import_json_stream(cls, odk_json_file, chunk_size=None
+                                , value_order=DEFAULT_VALUE_ORDER, metrics=None, language=None):
+        '''
+        Like :py:meth:`import_json`, but read the form incrementally from a 
+        file-like object and yield each :py:class:`VariableMetadata` object as 
+        soon as the question it corresponds to has been read. Groups and 
+        repeats are walked as they are read rather than built, so only one 
+        question of the form is held in memory at a time, along with the 
+        form's shared choice lists. If the file is seekable, 
+        the form's default language and shared choice lists (which may come 
+        anywhere in the form, often after the questions) are read first, in 
+        a separate pass; otherwise shared choice lists are unavailable and 
+        untranslated labels fall back on the "default" language.
+        
+        :param odk_json_file: A readable file-like object containing the JSON-formatted form.
+        :param int chunk_size: The number of bytes to read from the file at a time; by default, :py:data:`odk_to_spss_syntax.json_stream.CHUNK_SIZE`.
+        :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+        :param metrics: If supplied, count the groups, choices and "calculate" scans of the walk.
+        :type metrics: :py:class:`odk_to_spss_syntax.profiling.ConversionMetrics`
+        :param str language: The language to take translated labels from.
+        :returns: :py:class:`VariableMetadata` objects that correspond to the JSON form's questions.
+        :rtype: generator(:py:class:`VariableMetadata`)
+        '''
+        
+        import json_stream
+        
+        if chunk_size == None:
+            chunk_size= json_stream.CHUNK_SIZE
+        top_level_values= dict()
+        if _is_seekable(odk_json_file):
+            start_position= odk_json_file.tell()
+            for prefix, value in json_stream.iter_prefixed_items(odk_json_file, [('default_language',), ('choices',)]
+                                                                 , chunk_size):
+                top_level_values.setdefault(prefix[0], value)
+                if len(top_level_values) == 2:
+                    break
+            odk_json_file.seek(start_position)
+        default_language= top_level_values.get('default_language')
+        choice_index= ChoiceIndex(top_level_values.get('choices'), value_order, default_language=default_language)
+        
+        if metrics == None:
+            metrics= NULL_METRICS
+        
+        tree_events= json_stream.iter_tree_events(odk_json_file, ('children', 'item'), 'children', chunk_size)
+        for form_var in _iter_streamed_form_vars(tree_events, metrics):
+            for variable_metadata in cls._iter_from_form_var(form_var, value_order, choice_index, metrics, language
+                                                             , default_language):
+                yield variable_metadata
+
+
+    @classmethod
+    def import_xml(cls, odk_xml_file, value_order=DEFAULT_VALUE_ORDER, language=None):
+        '''
+        Parse question metadata from an XForm (XML-formatted ODK form) 
+        document in a single streaming pass. See 
+        :py:func:`odk_to_spss_syntax.xform.iter_import_xml`.
+        
+        :param odk_xml_file: The path of the XForm document or a readable file-like object containing it.
+        :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+        :param str language: The itext language to take labels from; by default, the form's default language.
+        :returns: :py:class:`VariableMetadata` objects that correspond to the form's variables.
+        :rtype: list(:py:class:`VariableMetadata`)
+        '''
+        
+        import xform
+        return list(xform.iter_import_xml(odk_xml_file, value_order, language, cls))
+
+
+    @classmethod
+    def iter_import_xls(cls, odk_xls_file, value_order=DEFAULT_VALUE_ORDER, language=None):
+        '''
+        Parse question metadata from an XLSForm workbook, reading its sheets 
+        a row at a time. See 
+        :py:func:`odk_to_spss_syntax.xlsform.iter_import_xlsform`.
+        
+        :param odk_xls_file: The path of the ".xlsx" or ".xls" workbook or a readable, seekable file-like object containing it.
+        :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+        :param str language: The language whose "label::<language>" columns to take labels from; by default, the untranslated "label" columns.
+        :returns: :py:class:`VariableMetadata` objects that correspond to the form's questions.
+        :rtype: generator(:py:class:`VariableMetadata`)
+        '''
+        
+        import xlsform
+        return xlsform.iter_import_xlsform(odk_xls_file, value_order, language, cls)
 
 
     @classmethod
     def _import(cls, odk_form_dict):
         '''
-        Where the actual importing work occurs. Takes an ODK form pre-parsed 
-        into :py:class:`dict` and generates the appropriate metadata.
-        returns the appropriate :py:class:`VariableMetadata` objects.
+        List-returning equivalent of :py:meth:`iter_import`, retained for 
+        compatibility.
         
         :param dict odk_form_dict: The ODK form parsed into a :py:class:`dict`.
         :returns: :py:class:`VariableMetadata` objects that correspond to the form's questions.
         :rtype: list(:py:class:`VariableMetadata`)
         '''
         
-        form_variables= odk_form_dict['children']
+        return list(cls.iter_import(odk_form_dict))
+
+
+    @classmethod
+    def iter_import(cls, odk_form_dict, value_order=DEFAULT_VALUE_ORDER, choice_index=None, metrics=None
+                    , language=None):
+        '''
+        Where the actual importing work occurs. Takes an ODK form pre-parsed 
+        into :py:class:`dict` and yields the appropriate 
+        :py:class:`VariableMetadata` objects in form order.
+        
+        :param dict odk_form_dict: The ODK form parsed into a :py:class:`dict`.
+        :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+        :param choice_index: The form's shared choice lists; by default, indexed from the form's "choices".
+        :type choice_index: :py:class:`ChoiceIndex`
+        :param metrics: If supplied, count the groups and choices walked and time the "calculate" scans.
+        :type metrics: :py:class:`odk_to_spss_syntax.profiling.ConversionMetrics`
+        :param str language: The language to take translated labels from; by default, the form's default language.
+        :returns: :py:class:`VariableMetadata` objects that correspond to the form's questions.
+        :rtype: generator(:py:class:`VariableMetadata`)
+        '''
+        
+        default_language= odk_form_dict.get('default_language')
+        if choice_index == None:
+            choice_index= ChoiceIndex(odk_form_dict.get('choices'), value_order, default_language=default_language)
+        if metrics == None:
+            metrics= NULL_METRICS
+        
+        for form_var in _iter_form_vars(odk_form_dict, metrics):
+            for variable_metadata in cls._iter_from_form_var(form_var, value_order, choice_index, metrics, language
+                                                             , default_language):
+                yield variable_metadata
+
+
+    @classmethod
+    def import_translations(cls, odk_form_dict, languages=None, value_order=DEFAULT_VALUE_ORDER, metrics=None):
+        '''
+        Import a multilingual form's metadata in each of several languages. 
+        The form's groups are walked only once, gathering its questions and 
+        the languages their labels are translated into; each language's 
+        metadata is then built from the gathered questions, with each shared 
+        choice list converted only once per language.
+        
+        :param dict odk_form_dict: The ODK form parsed into a :py:class:`dict`.
+        :param languages: The languages to import; by default, every language the form's labels are translated into (or just ``None``, the default language, if there are no translations).
+        :type languages: list(str)
+        :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+        :param metrics: If supplied, count the groups and choices walked and time the "calculate" scans.
+        :type metrics: :py:class:`odk_to_spss_syntax.profiling.ConversionMetrics`
+        :returns: The :py:class:`VariableMetadata` objects of each language, in the order of ``languages``.
+        :rtype: :py:class:`collections.OrderedDict`
+        '''
+        
+        default_language= odk_form_dict.get('default_language')
+        choice_index= ChoiceIndex(odk_form_dict.get('choices'), value_order, default_language=default_language)
+        if metrics == None:
+            metrics= NULL_METRICS
+        
+        form_vars= list()
+        form_languages= set()
+        for form_var in _iter_form_vars(odk_form_dict, metrics):
+            form_vars.append(form_var)
+            if languages == None:
+                form_languages.update(_label_languages(form_var.get('label')))
+                for choice in form_var.get('children') or ():
+                    form_languages.update(_label_languages(choice.get('label')))
+        if languages == None:
+            form_languages.update(choice_index.languages())
+            languages= sorted(form_languages) or [None]
+        
+        translations= OrderedDict()
+        for language in languages:
+            translations[language]= [variable_metadata for form_var in form_vars
+                                     for variable_metadata in cls._iter_from_form_var(form_var, value_order, choice_index
+                                                                                      , metrics, language
+                                                                                      , default_language)]
+        return translations
+
+
+    @classmethod
+    def import_repeat_tables(cls, odk_form_dict, value_order=DEFAULT_VALUE_ORDER, language=None, metrics=None):
+        '''
+        Import a form's metadata partitioned the way ODK exports its data: 
+        one table for the questions outside any repeat and one for the 
+        questions of each repeat (those of nested repeats going to the 
+        nested repeat's table). Variables are named after their group path, 
+        as are the columns of ODK's exports, but as legal SPSS names (e.g. 
+        "household_member_age" for "household/member/age"), truncated if 
+        need be and unique within their table.
+        
+        :param dict odk_form_dict: The ODK form parsed into a :py:class:`dict`.
+        :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+        :param str language: The language to take translated labels from; by default, the form's default language.
+        :param metrics: If supplied, count the groups, repeats and choices walked and time the "calculate" scans.
+        :type metrics: :py:class:`odk_to_spss_syntax.profiling.ConversionMetrics`
+        :returns: The :py:class:`VariableMetadata` objects of each table in form order, keyed by the repeat's path (e.g. "household/member"); the table of questions outside any repeat comes first, keyed by ``None``.
+        :rtype: :py:class:`collections.OrderedDict`
+        '''
+        
+        default_language= odk_form_dict.get('default_language')
+        choice_index= ChoiceIndex(odk_form_dict.get('choices'), value_order, default_language=default_language)
+        if metrics == None:
+            metrics= NULL_METRICS
+        
+        tables= OrderedDict([(None, list())])
+        # Table name -> the (upper-cased) names its variables use.
+        used_names_by_table= {None: set()}
+        last_group_path= last_repeat_path= None
+        for form_var, group_path, repeat_path in _iter_scoped_form_vars(odk_form_dict, metrics):
+            # Paths are shared by the questions of a group, so the name 
+            #   prefix and table are only looked up once per group.
+            if group_path is not last_group_path:
+                name_prefix= ''.join(name.encode('utf-8') + GROUP_PATH_SEPARATOR for name in group_path)
+                last_group_path= group_path
+            if repeat_path is not last_repeat_path:
+                if len(repeat_path) == 0:
+                    table_name= None
+                else:
+                    table_name= GROUP_PATH_SEPARATOR.join(repeat_path).encode('utf-8')
+                table= tables.setdefault(table_name, list())
+                used_names= used_names_by_table.setdefault(table_name, set())
+                last_repeat_path= repeat_path
+            for variable_metadata in cls._iter_from_form_var(form_var, value_order, choice_index, metrics, language
+                                                             , default_language, name_prefix):
+                legal_name= unique_variable_name(spss_variable_name(variable_metadata.name), used_names)
+                if legal_name != variable_metadata.name:
+                    variable_metadata= variable_metadata._replace(name=legal_name)
+                table.append(variable_metadata)
+        return tables
+
+
+    @classmethod
+    def import_form_metadata(cls, odk_form_dict, value_order=DEFAULT_VALUE_ORDER, language=None, metrics=None):
+        '''
+        Like :py:meth:`iter_import`, but return the metadata in a 
+        :py:class:`odk_to_spss_syntax.form_metadata.FormMetadata`, indexed by 
+        variable name and by the path of the groups enclosing each variable.
+        
+        :param dict odk_form_dict: The ODK form parsed into a :py:class:`dict`.
+        :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+        :param str language: The language to take translated labels from; by default, the form's default language.
+        :param metrics: If supplied, count the groups, repeats and choices walked and time the "calculate" scans.
+        :type metrics: :py:class:`odk_to_spss_syntax.profiling.ConversionMetrics`
+        :rtype: :py:class:`odk_to_spss_syntax.form_metadata.FormMetadata`
+        '''
+        
+        from form_metadata import FormMetadata
+        
+        default_language= odk_form_dict.get('default_language')
+        choice_index= ChoiceIndex(odk_form_dict.get('choices'), value_order, default_language=default_language)
+        if metrics == None:
+            metrics= NULL_METRICS
+        
         variable_metadata_list= list()
-        for form_var in form_variables:
-            if form_var['type'] == 'group':
-                # Recursively import groups.
-                group_variable_metadata_list= cls._import(form_var)
-                variable_metadata_list.extend(group_variable_metadata_list)
-                continue
+        group_paths= list()
+        last_group_path= None
+        for form_var, group_path, _repeat_path in _iter_scoped_form_vars(odk_form_dict, metrics):
+            # Paths are shared by the questions of a group, so each is only 
+            #   joined once.
+            if group_path is not last_group_path:
+                group_path_string= GROUP_PATH_SEPARATOR.join(group_path).encode('utf-8')
+                last_group_path= group_path
+            for variable_metadata in cls._iter_from_form_var(form_var, value_order, choice_index, metrics, language
+                                                             , default_language):
+                variable_metadata_list.append(variable_metadata)
+                group_paths.append(group_path_string)
+        return FormMetadata(variable_metadata_list, group_paths)
+
+
+    @classmethod
+    def _iter_from_form_var(cls, form_var, value_order, choice_index, metrics, language, default_language
+                            , name_prefix=''):
+        '''
+        Yield the metadata of a single question: the question's own and that 
+        of any variables it calculates.
         
-            var_name= form_var['name'].encode('utf-8')
-            if 'label' not in form_var.keys():
-                var_label= None
-            else:
-                var_label= form_var['label'].encode('utf-8')
-            
-            # TODO: Find out multi-select "type" (e.g. "select multiple")
-            if form_var['type'] in ['select one']:
-                value_mappings_list= form_var['children']
-                value_mappings= dict()
-                for mapping in value_mappings_list:
-                    val_name= mapping['name'].encode('utf-8')
-                    val_label= mapping['label'].encode('utf-8')
-                    value_mappings[val_name]= val_label
-            else:
-                value_mappings= None
-            
-            variable_metadata= cls(var_name, var_label, value_mappings)
-            variable_metadata_list.append(variable_metadata)
-            
-            # TODO: Not really knowing the "calculate" syntax, this is likely very brittle.
-            if form_var['type'] == 'calculate':
-                calculation_string= form_var['bind']['calculate']
-                # Find the first substring of the form "'matched substring:"
-                calculated_var_name= re.match(r'''^.+'(.+):''', calculation_string).groups()[0].encode('utf-8')
-                calculated_variable_metadata= cls(calculated_var_name, calculated_var_name, None)
-                variable_metadata_list.append(calculated_variable_metadata)
+        :param dict form_var: The question, from :py:func:`_iter_form_vars`.
+        :param str name_prefix: Prepended to the names of the question's variables (but not to those of the variables it calculates).
+        :rtype: generator(:py:class:`VariableMetadata`)
+        '''
+        
+        var_name= name_prefix + form_var['name'].encode('utf-8')
+        var_label= _translate_label(form_var.get('label'), language, default_language)
+        
+        if form_var['type'] == 'select one':
+            # Prefer a shared choice list, which needn't be walked again.
+            list_name= form_var.get('itemset', form_var.get('list_name'))
+            value_mappings= None
+            if list_name != None:
+                value_mappings= choice_index.get(list_name, language)
+            if value_mappings == None and form_var.get('children'):
+                # Share one object (sorted only once) between all questions 
+                #   with this choice list.
+                value_mappings= ValueMapping.intern(_choice_value_pairs(form_var['children'], language
+                                                                        , default_language)
+                                                    , value_order)
+            if value_mappings != None:
+                metrics.count('choices', len(value_mappings))
+        else:
+            value_mappings= None
+        
+        yield cls(var_name, var_label, value_mappings)
+        
+        if form_var['type'] == 'select all that apply':
+            # The selected options' names, space-separated, are left 
+            #   unlabelled; each option also gets its own 0/1 variable.
+            list_name= form_var.get('itemset', form_var.get('list_name'))
+            options= None
+            if list_name != None:
+                options= choice_index.options(list_name, language)
+            if options == None and form_var.get('children'):
+                options= option_name_suffixes(_choice_value_pairs(form_var['children'], language, default_language))
+            if options != None:
+                metrics.count('choices', len(options))
+                for option_variable_metadata in cls._iter_option_variables(var_name, var_label, options
+                                                                           , choice_index.selected_value_mappings):
+                    yield option_variable_metadata
+        
+        if form_var['type'] == 'calculate':
+            with metrics.timer('calculate'):
+                calculation_string= form_var.get('bind', dict()).get('calculate', '')
+                calculated_variable_metadata_list= list(cls._iter_calculated_variables(calculation_string))
+            for calculated_variable_metadata in calculated_variable_metadata_list:
+                yield calculated_variable_metadata
 
-        return variable_metadata_list
+
+    @classmethod
+    def _iter_option_variables(cls, var_name, var_label, options, selected_value_mappings):
+        '''
+        Yield metadata for the 0/1 variables of a "select multiple" 
+        question's options, named and labelled after the question and the 
+        option (e.g. "colours_red", "Colours: Red"). The names are made legal 
+        SPSS names by :py:func:`~odk_to_spss_syntax.spss_labels.spss_variable_name`.
+        
+        :param str var_name: The question's name.
+        :param str var_label: The question's label, or ``None``.
+        :param options: The options' variable name suffixes and labels, from :py:func:`option_name_suffixes`.
+        :param selected_value_mappings: The 0/1 value labels that all the variables share.
+        :type selected_value_mappings: :py:class:`ValueMapping`
+        :rtype: generator(:py:class:`VariableMetadata`)
+        '''
+        
+        label_prefix= (var_label if var_label != None else var_name) + ': '
+        for name_suffix, option_label in options:
+            yield cls(spss_variable_name(var_name + name_suffix), label_prefix + option_label, selected_value_mappings)
+
+
+    @classmethod
+    def _iter_calculated_variables(cls, calculation_string):
+        '''
+        Yield metadata for the variables derived by a "calculate" question: 
+        every distinct name that appears quoted and followed by a colon (e.g. 
+        "uuid" in "concat('uuid:', uuid())"), in order of appearance. 
+        Expressions that derive no such variables yield nothing.
+        
+        :param str calculation_string: The question's "calculate" expression.
+        :rtype: generator(:py:class:`VariableMetadata`)
+        '''
+        
+        seen_var_names= set()
+        for calculated_var_name in _CALCULATED_VAR_NAME_RE.findall(calculation_string):
+            if isinstance(calculated_var_name, unicode):
+                calculated_var_name= calculated_var_name.encode('utf-8')
+            if calculated_var_name in seen_var_names:
+                continue
+            seen_var_names.add(calculated_var_name)
+            yield cls(calculated_var_name, calculated_var_name, None)
@@ -0,0 +1,412 @@
+'''
+Created on Oct 18, 2026
+
+Imports variable metadata from XForm (XML-formatted ODK form) documents in a
+single streaming pass, discarding each part of the document as soon as it has
+been processed.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import re
+from xml.etree import cElementTree as ElementTree
+
+from variable_metadata import VariableMetadata, ValueMapping, DEFAULT_VALUE_ORDER
+from variable_metadata import SELECTED_VALUE_PAIRS, option_name_suffixes
+
+
+__all__= ['iter_import_xml']
+
+# Body elements that collect the value of an instance node.
+CONTROL_TAGS= frozenset(['input', 'select1', 'select', 'upload', 'trigger', 'range', 'rank'])
+
+_ITEXT_REF_RE= re.compile(r'''^\s*jr:itext\(\s*['"]?([^'")]+)['"]?\s*\)\s*$''')
+_INSTANCE_REF_RE= re.compile(r'''instance\(\s*['"]([^'"]+)['"]\s*\)''')
+
+
+def _local_name(tag):
+    '''Strip the namespace (e.g. "{http://www.w3.org/2002/xforms}") from a tag.'''
+    return tag.rsplit('}', 1)[-1]
+
+
+def _to_utf8(text):
+    if isinstance(text, unicode):
+        return text.encode('utf-8')
+    return text
+
+
+def _element_text(elem):
+    '''All the text inside an element, including that of any children (e.g. "output").'''
+    return ''.join(elem.itertext()).strip()
+
+
+class _Control(object):
+    '''The parts of a body control gathered while it is being parsed.'''
+
+    def __init__(self, tag, ref):
+        self.tag= tag
+        self.ref= ref
+        self.label= None
+        self.value_pairs= list()
+        self.itemset= None
+
+
+class _XFormParser(object):
+    '''
+    Consumes the events of :py:func:`xml.etree.ElementTree.iterparse`,
+    keeping only what is needed to build the variable metadata: the itext
+    translations, the primary instance's leaf nodes, the "calculate" binds,
+    secondary instance items (for itemsets) and the labels and items of the
+    body controls.
+    '''
+
+    def __init__(self, language, value_order):
+        self.language= language
+        self.value_order= value_order
+
+        # Language -> itext ID -> text.
+        self.translations= dict()
+        self.default_language= None
+        # The nodesets of the primary instance's leaves, in document order.
+        self.leaf_nodesets= list()
+        self.seen_leaf_nodesets= set()
+        # Nodeset -> "calculate" expression.
+        self.calculations= dict()
+        # Secondary instance ID -> list of item dictionaries.
+        self.secondary_instances= dict()
+        # Nodeset -> :py:class:`_Control`.
+        self.controls= dict()
+        # Itemset description -> (value name, value label) pairs.
+        self.itemset_value_pairs= dict()
+        # Itemset description -> :py:class:`ValueMapping`.
+        self.itemset_value_mappings= dict()
+        # Itemset description -> :py:func:`option_name_suffixes`.
+        self.itemset_options= dict()
+
+        self.primary_instance_seen= False
+        # State of the element currently being parsed.
+        self.translation_language= None
+        self.text_id= None
+        self.text_values= list()
+        self.instance_id= None
+        self.instance_depth= None
+        self.control_stack= list()
+        self.group_ref_stack= list()
+
+    def parse(self, xml_file):
+        '''
+        :param xml_file: The path of an XForm document or a readable file-like object containing one.
+        '''
+
+        # Stack of [element, whether it has any child elements].
+        stack= list()
+        for event, elem in ElementTree.iterparse(xml_file, events=('start', 'end')):
+            if event == 'start':
+                if len(stack) != 0:
+                    stack[-1][1]= True
+                stack.append([elem, False])
+                self._start(elem, stack)
+            else:
+                has_children= stack.pop()[1]
+                if self._end(elem, stack, has_children) and len(stack) != 0:
+                    # Done with this element; drop it from the (partial) tree.
+                    parent= stack[-1][0]
+                    if len(parent) != 0 and parent[-1] is elem:
+                        del parent[-1]
+
+    def _path(self, stack):
+        return [_local_name(entry[0].tag) for entry in stack]
+
+    def _start(self, elem, stack):
+        tag= _local_name(elem.tag)
+        path= self._path(stack)
+
+        if tag == 'translation' and 'itext' in path:
+            self.translation_language= elem.get('lang')
+            # Fall back on the first translation if none is marked as the default.
+            if self.default_language == None or 'true' in elem.get('default', ''):
+                self.default_language= self.translation_language
+            self.translations.setdefault(self.translation_language, dict())
+        elif tag == 'text' and self.translation_language != None:
+            self.text_id= elem.get('id')
+            self.text_values= list()
+        elif tag == 'instance' and 'model' in path:
+            self.instance_id= elem.get('id')
+            if self.instance_id == None and self.primary_instance_seen:
+                # Only the first ID-less instance is the primary one.
+                self.instance_id= ''
+            self.instance_depth= len(stack)
+        elif tag in CONTROL_TAGS and 'body' in path:
+            self.control_stack.append(_Control(tag, self._absolute_ref(elem.get('ref'))))
+        elif tag in ('group', 'repeat') and 'body' in path:
+            self.group_ref_stack.append(self._absolute_ref(elem.get('ref', elem.get('nodeset'))))
+
+    def _absolute_ref(self, ref):
+        '''Resolve a body reference relative to any enclosing group.'''
+        if ref == None or ref.startswith('/'):
+            return ref
+        for group_ref in reversed(self.group_ref_stack):
+            if group_ref != None:
+                return group_ref.rstrip('/') + '/' + ref
+        return ref
+
+    def _end(self, elem, stack, has_children):
+        '''
+        Process an element that has been completely parsed.
+
+        :returns: Whether the element can now be discarded.
+        :rtype: bool
+        '''
+
+        tag= _local_name(elem.tag)
+        parent_tag= _local_name(stack[-1][0].tag) if len(stack) != 0 else None
+
+        # Itext translations.
+        if tag == 'value' and self.text_id != None and parent_tag == 'text':
+            # Prefer the plain (long) form over e.g. image or audio forms.
+            if elem.get('form') in (None, 'long'):
+                self.text_values.insert(0, _element_text(elem))
+            else:
+                self.text_values.append(_element_text(elem))
+            return False
+        if tag == 'text' and self.text_id != None:
+            if len(self.text_values) != 0:
+                self.translations[self.translation_language][self.text_id]= _to_utf8(self.text_values[0])
+            self.text_id= None
+            return True
+        if tag == 'translation':
+            self.translation_language= None
+            return True
+
+        # Instances.
+        if tag == 'instance' and self.instance_depth == len(stack) + 1:
+            if self.instance_id == None:
+                self.primary_instance_seen= True
+            self.instance_id= None
+            self.instance_depth= None
+            return True
+        if self.instance_depth != None:
+            return self._end_instance_node(elem, stack, has_children)
+
+        # Binds.
+        if tag == 'bind':
+            calculation_string= elem.get('calculate')
+            if calculation_string != None:
+                self.calculations[elem.get('nodeset')]= calculation_string
+            return True
+
+        # Body.
+        if len(self.control_stack) != 0:
+            control= self.control_stack[-1]
+            if tag == 'label' and parent_tag in CONTROL_TAGS:
+                control.label= self._label_text(elem)
+                return False
+            if tag == 'item' and parent_tag in CONTROL_TAGS:
+                value_pair= self._item_value_pair(elem)
+                if value_pair != None:
+                    control.value_pairs.append(value_pair)
+                return True
+            if tag == 'itemset' and parent_tag in CONTROL_TAGS:
+                control.itemset= self._itemset_description(elem)
+                return True
+            if tag in CONTROL_TAGS and parent_tag != 'item':
+                self.control_stack.pop()
+                if control.ref != None:
+                    self.controls[control.ref]= control
+                return True
+            return False
+        if tag in ('group', 'repeat') and 'body' in self._path(stack):
+            self.group_ref_stack.pop()
+            return True
+
+        return False
+
+    def _end_instance_node(self, elem, stack, has_children):
+        # The instance element itself is at depth 0, its root element at 1.
+        depth_in_instance= len(stack) + 1 - self.instance_depth
+
+        if self.instance_id == None:
+            # The primary instance: record the leaves' nodesets.
+            if has_children or depth_in_instance < 2:
+                return True
+            nodeset= '/' + '/'.join(self._path(stack)[self.instance_depth:] + [_local_name(elem.tag)])
+            # Repeats may appear twice (as a "jr:template" and as a first 
+            #   instance).
+            if nodeset not in self.seen_leaf_nodesets:
+                self.seen_leaf_nodesets.add(nodeset)
+                self.leaf_nodesets.append(nodeset)
+            return True
+
+        if self.instance_id == '':
+            return True
+
+        # A secondary instance (e.g. "<instance id="yes_no"><root><item>..."):
+        #   keep its items' fields for itemsets.
+        if depth_in_instance == 2:
+            item= dict((_local_name(child.tag), _to_utf8((child.text or '').strip())) for child in elem)
+            self.secondary_instances.setdefault(self.instance_id, list()).append(item)
+            return True
+        # Keep an item's fields until the item itself is complete.
+        return depth_in_instance < 2
+
+    def _translate(self, itext_id):
+        '''Look up an itext ID in the selected (or default) language.'''
+        language= self.language
+        if language == None:
+            language= self.default_language
+        translation= self.translations.get(language, dict())
+        return translation.get(itext_id)
+
+    def _label_text(self, label_elem):
+        itext_match= _ITEXT_REF_RE.match(label_elem.get('ref', ''))
+        if itext_match:
+            return self._translate(itext_match.group(1))
+        label_text= _element_text(label_elem)
+        if label_text == '':
+            return None
+        return _to_utf8(label_text)
+
+    def _item_value_pair(self, item_elem):
+        value_name= None
+        value_label= None
+        for child in item_elem:
+            child_tag= _local_name(child.tag)
+            if child_tag == 'value':
+                value_name= _to_utf8(_element_text(child))
+            elif child_tag == 'label':
+                value_label= self._label_text(child)
+        if value_name == None:
+            return None
+        if value_label == None:
+            value_label= value_name
+        return value_name, value_label
+
+    def _itemset_description(self, itemset_elem):
+        '''
+        :returns: (instance ID, value field, label field, whether the label field holds itext IDs), or ``None`` for itemsets that can't be resolved statically.
+        '''
+
+        instance_match= _INSTANCE_REF_RE.search(itemset_elem.get('nodeset', ''))
+        if not instance_match:
+            return None
+        value_field= None
+        label_field= None
+        label_is_itext= False
+        for child in itemset_elem:
+            child_tag= _local_name(child.tag)
+            if child_tag == 'value':
+                value_field= child.get('ref')
+            elif child_tag == 'label':
+                label_ref= child.get('ref', '')
+                itext_match= _ITEXT_REF_RE.match(label_ref)
+                if itext_match:
+                    label_field= itext_match.group(1)
+                    label_is_itext= True
+                else:
+                    label_field= label_ref
+        if value_field == None or label_field == None:
+            return None
+        return instance_match.group(1), value_field, label_field, label_is_itext
+
+    def _itemset_value_pairs(self, itemset):
+        '''Gather (once per distinct itemset) the value pairs of a secondary instance, in form order.'''
+        value_pairs= self.itemset_value_pairs.get(itemset)
+        if value_pairs != None:
+            return value_pairs
+
+        instance_id, value_field, label_field, label_is_itext= itemset
+        value_pairs= list()
+        for item in self.secondary_instances.get(instance_id, []):
+            value_name= item.get(value_field)
+            if value_name == None:
+                continue
+            value_label= item.get(label_field)
+            if label_is_itext and value_label != None:
+                value_label= self._translate(value_label)
+            if value_label == None:
+                value_label= value_name
+            value_pairs.append((value_name, value_label))
+
+        self.itemset_value_pairs[itemset]= value_pairs
+        return value_pairs
+
+    def _itemset_value_mappings(self, itemset):
+        '''Build (once per distinct itemset) the value mappings of a secondary instance.'''
+        value_mappings= self.itemset_value_mappings.get(itemset)
+        if value_mappings != None:
+            return value_mappings
+
+        value_pairs= self._itemset_value_pairs(itemset)
+        if len(value_pairs) == 0:
+            return None
+
+        value_mappings= ValueMapping.intern(value_pairs, self.value_order)
+        self.itemset_value_mappings[itemset]= value_mappings
+        return value_mappings
+
+    def _itemset_options(self, itemset):
+        '''Name (once per distinct itemset) the option variables of a secondary instance.'''
+        options= self.itemset_options.get(itemset)
+        if options == None:
+            options= option_name_suffixes(self._itemset_value_pairs(itemset))
+            self.itemset_options[itemset]= options
+        return options
+
+    def iter_variable_metadata(self, variable_metadata_class):
+        '''
+        :returns: Metadata for each leaf of the primary instance, in document order.
+        :rtype: generator(:py:class:`VariableMetadata`)
+        '''
+
+        selected_value_mappings= ValueMapping.intern(SELECTED_VALUE_PAIRS, self.value_order)
+        for nodeset in self.leaf_nodesets:
+            var_name= _to_utf8(nodeset.rsplit('/', 1)[-1])
+            control= self.controls.get(nodeset)
+
+            var_label= None
+            value_mappings= None
+            options= ()
+            if control != None:
+                var_label= control.label
+                if control.tag == 'select1':
+                    if control.itemset != None:
+                        value_mappings= self._itemset_value_mappings(control.itemset)
+                    elif len(control.value_pairs) != 0:
+                        value_mappings= ValueMapping.intern(control.value_pairs, self.value_order)
+                elif control.tag == 'select':
+                    if control.itemset != None:
+                        options= self._itemset_options(control.itemset)
+                    else:
+                        options= option_name_suffixes(control.value_pairs)
+
+            yield variable_metadata_class(var_name, var_label, value_mappings)
+
+            for option_variable_metadata in variable_metadata_class._iter_option_variables(var_name, var_label, options
+                                                                                           , selected_value_mappings):
+                yield option_variable_metadata
+
+            calculation_string= self.calculations.get(nodeset)
+            if calculation_string != None:
+                for calculated_variable_metadata in variable_metadata_class._iter_calculated_variables(calculation_string):
+                    yield calculated_variable_metadata
+
+
+def iter_import_xml(xml_file, value_order=DEFAULT_VALUE_ORDER, language=None
+                    , variable_metadata_class=VariableMetadata):
+    '''
+    Parse question metadata from an XForm document. The document is read in a
+    single pass with :py:func:`xml.etree.ElementTree.iterparse`, discarding
+    each element once it has been processed, so memory use is bounded by the
+    metadata being gathered rather than by the size of the document.
+
+    :param xml_file: The path of an XForm document or a readable file-like object containing one.
+    :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+    :param str language: The itext language to take labels from; by default, the form's default language.
+    :param variable_metadata_class: The class of metadata objects to create.
+    :returns: Metadata for each of the form's variables (the leaves of its primary instance), in form order.
+    :rtype: generator(:py:class:`VariableMetadata`)
+    '''
+
+    parser= _XFormParser(language, value_order)
+    parser.parse(xml_file)
+    return parser.iter_variable_metadata(variable_metadata_class)
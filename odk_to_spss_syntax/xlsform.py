@@ -0,0 +1,280 @@
+'''
+Created on Oct 18, 2026
+
+Imports variable metadata from XLSForms (the spreadsheet form definitions
+that ODK forms are usually written as), reading the "survey" and "choices"
+sheets a row at a time.
+
+Reading ".xlsx" workbooks requires the ``openpyxl`` package and reading
+".xls" workbooks the ``xlrd`` package; neither is needed to import
+already-extracted rows with :py:func:`iter_import_xlsform_rows`.
+
+.. moduleauthor:: Esmail Fadae <efadae@hotmail.com>
+'''
+
+import re
+
+from variable_metadata import VariableMetadata, ChoiceIndex, DEFAULT_VALUE_ORDER
+
+
+__all__= ['iter_import_xlsform', 'iter_import_xlsform_rows', 'iter_sheet_rows']
+
+SURVEY_SHEET_NAME= 'survey'
+CHOICES_SHEET_NAME= 'choices'
+
+# Signatures that tell the two workbook formats apart.
+_XLSX_SIGNATURE= 'PK\x03\x04'
+_XLS_SIGNATURE= '\xd0\xcf\x11\xe0'
+
+# Survey rows that only structure the form and so aren't variables.
+_STRUCTURE_TYPES= frozenset(['begin group', 'end group', 'begin repeat', 'end repeat'])
+_SELECT_ONE_RE= re.compile(r'^select[_ ]one\s+(\S+)')
+_SELECT_MULTIPLE_RE= re.compile(r'^select[_ ]multiple\s+(\S+)')
+
+
+def _cell_text(cell_value):
+    '''
+    Normalise a cell's value to stripped :py:class:`unicode`, or ``None`` if
+    the cell is empty. Spreadsheets store numeric choice names (e.g. "1") as
+    floats, which are converted back to integer text.
+    '''
+
+    if cell_value == None:
+        return None
+    if isinstance(cell_value, float) and cell_value.is_integer():
+        cell_value= int(cell_value)
+    if isinstance(cell_value, str):
+        cell_value= cell_value.decode('utf-8')
+    elif not isinstance(cell_value, unicode):
+        cell_value= unicode(cell_value)
+    cell_value= cell_value.strip()
+    if cell_value == u'':
+        return None
+    return cell_value
+
+
+def _iter_row_dicts(rows):
+    '''
+    :param rows: A sheet's rows as sequences of cell values, headers first.
+    :returns: Each non-empty row after the headers as a :py:class:`dict` from every lower-cased header to cell text (or ``None`` if empty).
+    :rtype: generator(dict)
+    '''
+
+    rows= iter(rows)
+    headers= None
+    for row in rows:
+        headers= [(_cell_text(header) or u'').lower() for header in row]
+        if any(headers):
+            break
+    if headers == None:
+        return
+
+    for row in rows:
+        row_dict= dict.fromkeys(header for header in headers if header)
+        is_empty= True
+        for header, cell_value in zip(headers, row):
+            cell_text= _cell_text(cell_value)
+            if header and cell_text != None:
+                row_dict[header]= cell_text
+                is_empty= False
+        if not is_empty:
+            yield row_dict
+
+
+def _label_header(row_dict, language):
+    '''
+    :returns: The header of the label column to use: "label::<language>" if a language was requested, otherwise "label" or else the first translated label column.
+    :rtype: unicode
+    '''
+
+    if language != None:
+        return u'label::' + _cell_text(language).lower()
+    if u'label' in row_dict:
+        return u'label'
+    translated_headers= sorted(header for header in row_dict if header.startswith(u'label::'))
+    if len(translated_headers) != 0:
+        return translated_headers[0]
+    return u'label'
+
+
+def _choice_tables(choice_rows, language):
+    '''
+    Index the rows of the "choices" sheet by list name as they are read, 
+    building the choice dictionaries of :py:class:`ChoiceIndex` directly (and 
+    so holding each choice only once).
+    
+    :returns: A mapping from list name to the list's choices, in sheet order.
+    :rtype: dict(unicode, list(dict))
+    '''
+
+    choice_tables= dict()
+    label_header= None
+    for row_dict in _iter_row_dicts(choice_rows):
+        if row_dict.get(u'list_name') == None or row_dict.get(u'name') == None:
+            continue
+        if label_header == None:
+            label_header= _label_header(row_dict, language)
+        choice_tables.setdefault(row_dict[u'list_name'], list()).append(
+            {'name': row_dict[u'name'], 'label': row_dict.get(label_header) or row_dict[u'name']})
+    return choice_tables
+
+
+def iter_import_xlsform_rows(survey_rows, choice_rows=(), value_order=DEFAULT_VALUE_ORDER, language=None
+                             , variable_metadata_class=VariableMetadata):
+    '''
+    Yield the variable metadata of an XLSForm given the rows of its sheets.
+    Survey rows are consumed one at a time; the choice rows are indexed by
+    list name (in a single pass) the first time a question refers to a
+    choice list, and each list is then converted to a shared
+    :py:class:`ValueMapping` only once.
+
+    :param survey_rows: The rows of the "survey" sheet as sequences of cell values, headers first.
+    :param choice_rows: The rows of the "choices" sheet, likewise.
+    :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+    :param str language: The language whose "label::<language>" columns to take labels from; by default, the untranslated "label" columns.
+    :param variable_metadata_class: The class of metadata objects to create.
+    :returns: Metadata for each of the form's variables, in form order.
+    :rtype: generator(:py:class:`VariableMetadata`)
+    '''
+
+    # The loader (and with it the rows) is dropped once the tables are built.
+    choice_index= ChoiceIndex(value_order=value_order, load_choice_tables=lambda: _choice_tables(choice_rows, language))
+    return _iter_import_survey_rows(survey_rows, choice_index, language, variable_metadata_class)
+
+
+def _iter_import_survey_rows(survey_rows, choice_index, language, variable_metadata_class):
+    '''The workhorse of :py:func:`iter_import_xlsform_rows`, taking an already set up :py:class:`ChoiceIndex`.'''
+
+    label_header= None
+    for row_dict in _iter_row_dicts(survey_rows):
+        var_type= row_dict.get(u'type') or u''
+        var_name= row_dict.get(u'name')
+        if var_name == None or var_type.lower().replace(u'_', u' ') in _STRUCTURE_TYPES:
+            continue
+        if label_header == None:
+            label_header= _label_header(row_dict, language)
+
+        var_label= row_dict.get(label_header)
+        if var_label != None:
+            var_label= var_label.encode('utf-8')
+
+        var_name= var_name.encode('utf-8')
+        value_mappings= None
+        select_one_match= _SELECT_ONE_RE.match(var_type)
+        if select_one_match:
+            value_mappings= choice_index.get(select_one_match.group(1))
+
+        yield variable_metadata_class(var_name, var_label, value_mappings)
+
+        select_multiple_match= _SELECT_MULTIPLE_RE.match(var_type)
+        if select_multiple_match:
+            options= choice_index.options(select_multiple_match.group(1))
+            if options != None:
+                for option_variable_metadata in variable_metadata_class._iter_option_variables(
+                        var_name, var_label, options, choice_index.selected_value_mappings):
+                    yield option_variable_metadata
+
+        if var_type == u'calculate' and row_dict.get(u'calculation') != None:
+            for calculated_variable_metadata in variable_metadata_class._iter_calculated_variables(row_dict[u'calculation']):
+                yield calculated_variable_metadata
+
+
+def iter_sheet_rows(xlsform_file, sheet_name):
+    '''
+    Read a workbook sheet's rows lazily: ".xlsx" workbooks through
+    ``openpyxl``'s read-only mode, which parses the sheet as it is iterated,
+    and ".xls" workbooks through ``xlrd``, which loads only the requested
+    sheet.
+
+    :param xlsform_file: The path of the workbook or a readable, seekable file-like object containing it.
+    :param str sheet_name: The name of the sheet.
+    :returns: The sheet's rows as tuples of cell values; nothing if the workbook has no such sheet.
+    :rtype: generator(tuple)
+    '''
+
+    if isinstance(xlsform_file, basestring):
+        with open(xlsform_file, 'rb') as f:
+            signature= f.read(len(_XLSX_SIGNATURE))
+    else:
+        xlsform_file.seek(0)
+        signature= xlsform_file.read(len(_XLSX_SIGNATURE))
+        xlsform_file.seek(0)
+
+    if signature == _XLSX_SIGNATURE:
+        rows_iter= _iter_xlsx_sheet_rows(xlsform_file, sheet_name)
+    elif signature == _XLS_SIGNATURE:
+        rows_iter= _iter_xls_sheet_rows(xlsform_file, sheet_name)
+    else:
+        raise ValueError('Not an ".xlsx" or ".xls" workbook.')
+    for row in rows_iter:
+        yield row
+
+
+def _iter_xlsx_sheet_rows(xlsform_file, sheet_name):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ImportError('Reading ".xlsx" XLSForms requires the "openpyxl" package.')
+
+    workbook= openpyxl.load_workbook(xlsform_file, read_only=True, data_only=True)
+    try:
+        sheet= _find_sheet(workbook.sheetnames, sheet_name)
+        if sheet == None:
+            return
+        for row in workbook[sheet].iter_rows(values_only=True):
+            yield row
+    finally:
+        workbook.close()
+
+
+def _iter_xls_sheet_rows(xlsform_file, sheet_name):
+    try:
+        import xlrd
+    except ImportError:
+        raise ImportError('Reading ".xls" XLSForms requires the "xlrd" package.')
+
+    if isinstance(xlsform_file, basestring):
+        workbook= xlrd.open_workbook(xlsform_file, on_demand=True)
+    else:
+        workbook= xlrd.open_workbook(file_contents=xlsform_file.read(), on_demand=True)
+    try:
+        sheet= _find_sheet(workbook.sheet_names(), sheet_name)
+        if sheet == None:
+            return
+        for row in workbook.sheet_by_name(sheet).get_rows():
+            yield tuple(cell.value for cell in row)
+    finally:
+        workbook.release_resources()
+
+
+def _find_sheet(sheet_names, sheet_name):
+    '''Sheet names are matched case-insensitively, as pyxform does.'''
+    for candidate_name in sheet_names:
+        if candidate_name.strip().lower() == sheet_name:
+            return candidate_name
+    return None
+
+
+def iter_import_xlsform(xlsform_file, value_order=DEFAULT_VALUE_ORDER, language=None
+                        , variable_metadata_class=VariableMetadata):
+    '''
+    Parse question metadata from an XLSForm workbook without loading the
+    whole workbook: the "choices" sheet is read first (so its list index
+    can be built in one pass) and the "survey" sheet is then read a row at
+    a time. See :py:func:`iter_import_xlsform_rows`.
+
+    :param xlsform_file: The path of the workbook or a readable, seekable file-like object containing it.
+    :param str value_order: The order in which to export value labels; one of :py:data:`VALUE_ORDERS`.
+    :param str language: The language whose "label::<language>" columns to take labels from; by default, the untranslated "label" columns.
+    :param variable_metadata_class: The class of metadata objects to create.
+    :returns: Metadata for each of the form's variables, in form order.
+    :rtype: generator(:py:class:`VariableMetadata`)
+    '''
+
+    # The sheets can't be read in an interleaved fashion from one file-like 
+    #   object, so finish with the choices before starting on the survey; 
+    #   their rows are indexed as they are read, never held as rows.
+    choice_tables= _choice_tables(iter_sheet_rows(xlsform_file, CHOICES_SHEET_NAME), language)
+    choice_index= ChoiceIndex(choice_tables, value_order)
+    survey_rows= iter_sheet_rows(xlsform_file, SURVEY_SHEET_NAME)
+    return _iter_import_survey_rows(survey_rows, choice_index, language, variable_metadata_class)
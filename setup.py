@@ -93,6 +93,7 @@ setup(
     entry_points={
         'console_scripts': [
             'odk_to_spss_syntax=odk_to_spss_syntax:main.main',
+            'odk_to_spss_syntax_service=odk_to_spss_syntax.service:main',
         ],
     },
 )